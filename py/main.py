@@ -6,10 +6,162 @@ vectorización (SVG) y generación de miniaturas.
 
 import os
 import argparse
-from src import generators
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src import config, generators
+from src.admission import AdmissionController
+from src.pipeline import (
+    StagedPipeline,
+    image_deadline,
+    missing_outputs,
+    output_paths,
+    record_stage_report,
+    vector_tasks,
+)
+from src.dedup import find_duplicates, link_duplicates, write_report
+from src.distributed import DistributedWorker
+from src.job_config import JobConfig, resolve_config
+from src.process_pipeline import ProcessPipeline
+from src.sequence import SequenceProcessor
 
 # Xxxx
 
+
+def process_serial(input_path, output_dir, encoder=None, job_config=None):
+    """
+    Procesa una imagen con todas las etapas en serie, en el hilo actual.
+    Con `encoder` (un executor), el PNG alpha se codifica en segundo plano.
+    Devuelve cuántas etapas terminaron degradadas o sin salida por tiempo,
+    o None si no hubo PNG alpha que vectorizar.
+    """
+    job = resolve_config(job_config)
+    file = os.path.basename(input_path)
+    paths = output_paths(output_dir, file, job)
+    deadline_at = image_deadline(job)
+
+    print(f"\n📦 Processing: {file}...")
+
+    # 1. Generate the AI-processed Alpha PNG first
+    img = generators.generate_alpha_png(
+        input_path, paths["alpha"], executor=encoder, job_config=job
+    )
+
+    # 2. Use the processed Alpha image as source for everything else
+    if img is not None or os.path.exists(paths["alpha"]):
+        source = img if img is not None else paths["alpha"]
+        tasks = vector_tasks(source, paths, deadline_at, job_config=job)
+        results = [task() for task in tasks]
+        return record_stage_report(output_dir, file, results)
+
+    print(
+        f"⚠️ Skipping vectorization for {file} because Alpha PNG was not created."
+    )
+    return None
+
+
+def _cpu_seconds():
+    """CPU de este proceso y de sus hijos ya terminados (workers, potrace)."""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def run_batch(args, input_paths, output_dir):
+    """
+    Procesa `input_paths` con el modo elegido en la CLI.
+    Devuelve cuántas imágenes se procesaron (sin contar las ya existentes).
+    """
+    # Una sola copia de la configuración para todo el lote
+    job = JobConfig()
+    if args.distributed:
+        worker = DistributedWorker(output_dir, node_id=args.node_id, job_config=job)
+        # Sin encoder en segundo plano: al volver de process_serial el alpha
+        # debe estar escrito, o el nodo marcaría la imagen como fallida
+        stats = worker.run(
+            input_paths,
+            lambda path: process_serial(path, output_dir, None, job),
+        )
+        print(
+            f"\n📊 Nodo {worker.node_id}: {stats['done']} procesadas, "
+            f"{stats['skipped']} ya existentes, {stats['failed']} errores "
+            f"en {stats['seconds']:.1f}s"
+        )
+        return stats["done"]
+
+    if args.sequence:
+        processor = SequenceProcessor(output_dir, job_config=job)
+        stats = processor.run_all(input_paths)
+        print(
+            f"\n📊 {stats['frames']} fotogramas en {stats['seconds']:.1f}s: "
+            f"{stats['inferred']} con el modelo, {stats['reused']} con la máscara "
+            f"reutilizada, {stats['warped']} desplazada; {stats['skipped']} ya "
+            f"existentes, {stats['failed']} errores"
+        )
+        print(
+            f"🧩 Capas de color: {stats['layers_traced']} trazadas, "
+            f"{stats['layers_reused']} reutilizadas sin cambios"
+        )
+        if stats["degraded"]:
+            print(
+                f"⏱ {stats['degraded']} salidas degradadas o sin generar por tiempo "
+                f"(ver {config.STAGE_REPORT})"
+            )
+        return stats["frames"]
+
+    if args.serial:
+        processed = degraded = 0
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            encoder = None if args.sync_alpha else pool
+            for input_path in input_paths:
+                paths = output_paths(output_dir, os.path.basename(input_path), job)
+                if not missing_outputs(paths, job):
+                    continue
+                result = process_serial(input_path, output_dir, encoder, job)
+                if result is not None:
+                    processed += 1
+                    degraded += result
+        if degraded:
+            print(
+                f"\n⏱ {degraded} salidas degradadas o sin generar por tiempo "
+                f"(ver {config.STAGE_REPORT})"
+            )
+        return processed
+
+    if args.processes > 0:
+        pipeline = ProcessPipeline(
+            output_dir,
+            inference_processes=args.inference_processes,
+            vector_processes=args.processes,
+            queue_size=args.queue_size,
+            job_config=job,
+        )
+    else:
+        admission = None
+        if config.MEMORY_ADMISSION and args.memory_budget >= 0:
+            admission = AdmissionController(
+                budget=args.memory_budget * 1024 * 1024 if args.memory_budget else None
+            )
+        pipeline = StagedPipeline(
+            output_dir,
+            queue_size=args.queue_size,
+            cpu_workers=args.workers,
+            admission=admission,
+            job_config=job,
+        )
+    stats = pipeline.run(input_paths)
+    print(
+        f"\n📊 {stats['done']} procesadas, {stats['skipped']} ya existentes, "
+        f"{stats['failed']} errores en {stats['seconds']:.1f}s"
+    )
+    if getattr(pipeline, "admission", None) is not None:
+        print(pipeline.admission.summary())
+    if stats["degraded"]:
+        print(
+            f"⏱ {stats['degraded']} salidas degradadas o sin generar por tiempo "
+            f"(ver {config.STAGE_REPORT})"
+        )
+    return stats["done"]
+
+
 def main():
     """
     Punto de entrada principal para la CLI.
@@ -28,6 +180,88 @@ def main():
         help="Carpeta donde se guardarán los resultados",
         required=True,
     )
+    parser.add_argument(
+        "--serial",
+        action="store_true",
+        help="Procesar las imágenes una a una, sin el pipeline por etapas",
+    )
+    parser.add_argument(
+        "--sync-alpha",
+        action="store_true",
+        help="Con --serial, codificar el PNG alpha antes de vectorizar y no en "
+        "segundo plano (tiempos por etapa sin solaparse)",
+    )
+    parser.add_argument(
+        "--sequence",
+        action="store_true",
+        help=(
+            "Fotogramas numerados (nombre0001.png...): misma paleta en toda la "
+            "secuencia y sin inferencia en los fotogramas que apenas cambian"
+        ),
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=0,
+        help=(
+            "Workers de vectorización en procesos separados; el modelo solo se "
+            "carga en los procesos de inferencia (0 = pipeline con hilos)"
+        ),
+    )
+    parser.add_argument(
+        "--inference-processes",
+        type=int,
+        default=config.INFERENCE_PROCESSES,
+        help="Procesos que cargan el modelo de IA (con --processes)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=config.PIPELINE_CPU_WORKERS,
+        help="Hilos para las etapas de CPU del pipeline",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=config.PIPELINE_QUEUE_SIZE,
+        help="Imágenes en espera entre dos etapas del pipeline",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        default=config.MEMORY_BUDGET_MB,
+        help=(
+            "MB de RAM para las imágenes en marcha del pipeline con hilos "
+            "(0 = según la memoria disponible, -1 = sin control de admisión)"
+        ),
+    )
+    parser.add_argument(
+        "--distributed",
+        action="store_true",
+        help=(
+            "Modo distribuido: varios nodos con la misma carpeta de salida se "
+            "reparten las imágenes mediante leases en <output>/.leases"
+        ),
+    )
+    parser.add_argument(
+        "--node-id",
+        default=None,
+        help="Identificador de este nodo en modo distribuido (por defecto host-pid)",
+    )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help=(
+            "Detectar duplicados (copia exacta o pHash cercano) y procesar solo "
+            "una imagen de cada grupo; el resto enlaza sus salidas"
+        ),
+    )
+    parser.add_argument(
+        "--dedup-threshold",
+        type=int,
+        default=config.DEDUP_THRESHOLD,
+        help="Bits distintos (de 64) para considerar dos imágenes iguales (-1 = solo exactas)",
+    )
 
     args = parser.parse_args()
 
@@ -53,42 +287,33 @@ def main():
         print(f"ℹ️ No image files found in {input_dir}")
         return
 
-    print(f"🚀 Processing {len(files)} images modularly...")
-
-    for file in files:
-        input_path = os.path.join(input_dir, file)
-        base_name = os.path.splitext(file)[0] + "_alpha"
-
-        # Define paths
-        alpha_path = os.path.join(output_dir, base_name + ".png")
-        gray_path = os.path.join(output_dir, base_name + "_gray.svg")
-        halftone_path = os.path.join(output_dir, base_name + "_halftone.svg")
-        lineart_path = os.path.join(output_dir, base_name + "_lineart.svg")
-        color_logo_path = os.path.join(output_dir, base_name + "_color_logo.svg")
-        color_illus_path = os.path.join(output_dir, base_name + "_color_illus.svg")
-        thumb_path = os.path.join(output_dir, base_name + "_thumb.png")
-
-        print(f"\n📦 Processing: {file}...")
-
-        # 1. Generate the AI-processed Alpha PNG first
-        generators.generate_alpha_png(input_path, alpha_path)
-
-        # 2. Use the processed Alpha PNG as source for everything else
-        if os.path.exists(alpha_path):
-            generators.generate_grayscale_svg(alpha_path, gray_path)
-            generators.generate_halftone_svg(alpha_path, halftone_path)
-            generators.generate_lineart_svg(alpha_path, lineart_path)
-            generators.generate_color_svg(
-                alpha_path, color_logo_path, num_colors=16, blur_radius=0.5
-            )
-            generators.generate_color_svg(
-                alpha_path, color_illus_path, num_colors=48, blur_radius=1
-            )
-            generators.generate_thumbnail(alpha_path, thumb_path)
-        else:
-            print(
-                f"⚠️ Skipping vectorization for {file} because Alpha PNG was not created."
-            )
+    input_paths = [os.path.join(input_dir, file) for file in files]
+    duplicates = {}
+    if args.dedup:
+        start = time.perf_counter()
+        input_paths, duplicates = find_duplicates(input_paths, threshold=args.dedup_threshold)
+        hash_seconds = time.perf_counter() - start
+        print(
+            f"🔎 {len(duplicates)} duplicados detectados en {hash_seconds:.1f}s; "
+            f"se procesan {len(input_paths)} imágenes"
+        )
+
+    print(f"🚀 Processing {len(input_paths)} images modularly...")
+
+    cpu_start = _cpu_seconds()
+    processed = run_batch(args, input_paths, output_dir)
+
+    if duplicates:
+        orphans = link_duplicates(output_dir, duplicates)
+        if orphans:
+            # Su canónica falló: se procesan por su cuenta
+            print(f"⚠️ {len(orphans)} duplicados sin salidas de su canónica; procesándolos")
+            processed += run_batch(args, orphans, output_dir)
+            for path in orphans:
+                duplicates.pop(path)
+            link_duplicates(output_dir, duplicates)
+        cpu_per_image = (_cpu_seconds() - cpu_start) / processed if processed else 0.0
+        print(write_report(output_dir, duplicates, cpu_per_image, hash_seconds))
 
     print("\n✅ All image processing complete.")
 
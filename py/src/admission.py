@@ -0,0 +1,251 @@
+"""
+Control de admisión por memoria para los lotes concurrentes.
+
+El pico de memoria de una imagen depende sobre todo de sus píxeles: el
+recorte RGBA, la copia float32 de `clean_white_halo`, las etiquetas de
+KMeans a tamaño completo, las máscaras por bloques... La sesión del modelo
+es un coste fijo del proceso que ya está cargado antes de admitir trabajos.
+
+En vez de fijar cuántas imágenes van a la vez, cada trabajo se admite solo
+si su pico estimado cabe en el presupuesto de RAM (MEMORY_BUDGET_MB):
+
+    estimado = MEMORY_JOB_OVERHEAD_MB + bytes_por_píxel * ancho * alto
+
+Las dimensiones salen de la cabecera del archivo, sin decodificarlo. Los
+bytes por píxel empiezan en MEMORY_BYTES_PER_PIXEL y se aprenden midiendo
+el RSS del proceso mientras hay trabajos en marcha; el valor aprendido se
+guarda en CACHE_DIR para los lotes siguientes. Sin /proc (macOS, Windows)
+no se mide el RSS y se usa siempre la estimación inicial.
+
+Un trabajo que no cabe ni con el presupuesto vacío se admite igualmente,
+pero solo (nunca se queda bloqueado para siempre).
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+from PIL import Image
+
+from src import config
+from src.generators.encode import write_atomic
+
+_MB = 1024 * 1024
+
+
+# ----------------------------
+# Medidas
+# ----------------------------
+
+
+def image_pixels(path):
+    """Píxeles de la imagen leídos de la cabecera (PIL no decodifica hasta load())."""
+    with Image.open(path) as img:
+        width, height = img.size
+    return width * height
+
+
+def current_rss():
+    """RSS actual del proceso en bytes, o None si no se puede leer."""
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def available_memory():
+    """Memoria disponible del sistema en bytes (total si no hay /proc), o None."""
+    try:
+        with open("/proc/meminfo", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def default_budget():
+    """Presupuesto en bytes según la configuración (None = sin límite)."""
+    if config.MEMORY_BUDGET_MB > 0:
+        return config.MEMORY_BUDGET_MB * _MB
+    available = available_memory()
+    if available is None:
+        return None
+    return int(available * config.MEMORY_BUDGET_FRACTION)
+
+
+# ----------------------------
+# Modelo de memoria
+# ----------------------------
+
+
+class MemoryModel:
+    """Estimación del pico por trabajo, con los bytes por píxel aprendidos."""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(config.CACHE_DIR, config.MEMORY_MODEL_FILE)
+        self.bytes_per_pixel = float(config.MEMORY_BYTES_PER_PIXEL)
+        self.samples = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            self.bytes_per_pixel = float(saved["bytes_per_pixel"])
+            self.samples = int(saved.get("samples", 0))
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def estimate(self, pixels):
+        """Pico estimado (bytes) de un trabajo con `pixels` píxeles."""
+        return int(config.MEMORY_JOB_OVERHEAD_MB * _MB + self.bytes_per_pixel * pixels)
+
+    def update(self, observed):
+        """Acerca los bytes por píxel a `observed` (media móvil exponencial)."""
+        # Acotado alrededor del valor inicial: una medida rara (otro hilo
+        # reservando memoria, el allocator sin devolverla) no lo dispara
+        low = config.MEMORY_BYTES_PER_PIXEL / 4
+        high = config.MEMORY_BYTES_PER_PIXEL * 8
+        observed = min(max(observed, low), high)
+        rate = max(config.MEMORY_LEARN_RATE, 1.0 / (self.samples + 1))
+        self.bytes_per_pixel += rate * (observed - self.bytes_per_pixel)
+        self.samples += 1
+
+    def save(self):
+        """Guarda el valor aprendido (se ignoran los errores de escritura)."""
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            saved = {"bytes_per_pixel": round(self.bytes_per_pixel, 2), "samples": self.samples}
+            write_atomic(self.path, json.dumps(saved).encode("utf-8"))
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el modelo de memoria: {e}")
+
+
+# ----------------------------
+# Control de admisión
+# ----------------------------
+
+
+class AdmissionController:
+    """
+    Admite trabajos mientras la suma de sus picos estimados quepa en
+    `budget` bytes (None = sin límite). Seguro entre hilos.
+
+        with admission.admit(path):
+            procesar(path)
+
+    o, desde asyncio, `ticket = await asyncio.to_thread(admission.acquire, path)`
+    y `admission.release(ticket)` al terminar.
+    """
+
+    def __init__(self, budget=None, model=None):
+        self.budget = default_budget() if budget is None else budget
+        self.model = model or MemoryModel()
+        self.in_use = 0  # Bytes estimados de los trabajos admitidos
+        self.peak_in_use = 0
+        self.waits = 0  # Trabajos que tuvieron que esperar memoria
+        self._cond = threading.Condition()
+        self._jobs = {}  # ticket -> [píxeles, estimado, mayor bytes/píxel medido o None]
+        self._next_ticket = 0
+        self._baseline = None
+        self._sampler = None
+        self._stop = threading.Event()
+
+    # --- Muestreo del RSS ---
+
+    def start(self):
+        """
+        Toma el RSS base (con la sesión del modelo ya cargada) y arranca el
+        muestreo. Sin /proc no hace nada: se usa la estimación inicial.
+        """
+        self._baseline = current_rss()
+        if self._baseline is None or self._sampler is not None:
+            return
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        """Detiene el muestreo y guarda lo aprendido."""
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+            self.model.save()
+
+    def _sample_loop(self):
+        while not self._stop.wait(config.MEMORY_SAMPLE_SECONDS):
+            rss = current_rss()
+            if rss is None:
+                continue
+            with self._cond:
+                if not self._jobs:
+                    # Sin trabajos en marcha el RSS es la nueva base (el
+                    # allocator puede quedarse con memoria ya liberada)
+                    self._baseline = rss
+                    continue
+                pixels = sum(job[0] for job in self._jobs.values())
+                overhead = len(self._jobs) * config.MEMORY_JOB_OVERHEAD_MB * _MB
+                if pixels <= 0:
+                    continue
+                # Lo que crece el proceso se reparte entre los trabajos en
+                # marcha en proporción a sus píxeles
+                per_pixel = max(0, rss - self._baseline - overhead) / pixels
+                for job in self._jobs.values():
+                    job[2] = per_pixel if job[2] is None else max(job[2], per_pixel)
+
+    # --- Admisión ---
+
+    def acquire(self, path):
+        """Espera hasta que el trabajo de `path` quepa. Devuelve su ticket."""
+        try:
+            pixels = image_pixels(path)
+        except Exception:  # pylint: disable=broad-exception-caught
+            # Cabecera ilegible: se admite con la estimación mínima y ya
+            # fallará la etapa que lo decodifique
+            pixels = 0
+        cost = self.model.estimate(pixels)
+        with self._cond:
+            if self.budget is not None and self.in_use and self.in_use + cost > self.budget:
+                self.waits += 1
+                self._cond.wait_for(
+                    lambda: not self.in_use or self.in_use + cost <= self.budget
+                )
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._jobs[ticket] = [pixels, cost, None]
+            self.in_use += cost
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+        return ticket
+
+    def release(self, ticket):
+        """Libera la memoria reservada por `ticket` y aprende de lo medido."""
+        with self._cond:
+            pixels, cost, observed = self._jobs.pop(ticket)
+            self.in_use -= cost
+            if observed is not None and pixels > 0:
+                self.model.update(observed)
+            self._cond.notify_all()
+
+    @contextmanager
+    def admit(self, path):
+        """Context manager: `acquire` al entrar y `release` al salir."""
+        ticket = self.acquire(path)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def summary(self):
+        """Texto con el presupuesto, el pico reservado y lo aprendido."""
+        budget = "sin límite" if self.budget is None else f"{self.budget / _MB:.0f}MB"
+        return (
+            f"🧮 Memoria: presupuesto {budget}, pico reservado "
+            f"{self.peak_in_use / _MB:.0f}MB, {self.waits} esperas, "
+            f"{self.model.bytes_per_pixel:.1f} bytes/píxel"
+        )
+
@@ -4,10 +4,153 @@ CONSTANTS
  ------------------------------
 """
 
+import os
+
 TRANSPARENT_COLOR = (255, 255, 255)
 TOLERANCE = 15
 THUMB_WIDTH = 150
+THUMB_WIDTHS = (150, 300, 600)  # Web y retina; THUMB_WIDTH mantiene el nombre _thumb.png
+THUMB_WEBP = False  # True = además un .webp con alpha por tamaño
+THUMB_WEBP_QUALITY = 85
 ALPHA_FEATHER = 2
 ALPHA_BLUR = 1
+ALPHA_REFINE_TILE = 64  # Bloques de la franja del borde que se refina (0 = imagen completa)
 DESPILL_STRENGTH = 0.6
 MIN_ALPHA = 8
+
+# ------------------------------
+# Codificación del PNG alpha
+# ------------------------------
+
+ALPHA_FORMAT = "png"  # "png" | "png8" (paleta, logos) | "webp" (sin pérdidas)
+ALPHA_PNG_COMPRESS_LEVEL = 6  # 0-9 (zlib); 1-3 codifica mucho más rápido
+ALPHA_PNG_STRATEGY = "default"  # "default" | "filtered" | "huffman" | "rle" | "fixed"
+ALPHA_PALETTE_COLORS = 256
+ALPHA_WEBP_METHOD = 4  # 0 (rápido) - 6 (más pequeño)
+
+# ------------------------------
+# ONNX Runtime (modelo de IA)
+# ------------------------------
+
+AI_MODEL = "isnet-general-use"
+# "fp32" (original) o una variante cuantizada generada con tools.quantize_models
+AI_MODEL_VARIANT = os.environ.get("TRANSPARENTE_MODEL_VARIANT", "fp32")
+# Hilos por sesión (0 = núcleos / procesos de inferencia, ver
+# session.default_intra_op_threads): procesos * hilos no debe pasar de núcleos.
+ORT_INTRA_OP_THREADS = 0
+ORT_INTER_OP_THREADS = 0
+ORT_EXECUTION_MODE = "sequential"  # "sequential" | "parallel"
+ORT_ENABLE_MEM_ARENA = True
+ORT_PROVIDERS = ("CPUExecutionProvider",)
+# Caché del modelo ya optimizado para no repetir la optimización del grafo
+ORT_CACHE_OPTIMIZED = True
+# Sesiones cargadas a la vez por proceso (la menos usada se descarta)
+ORT_MAX_SESSIONS = 3
+CACHE_DIR = os.environ.get(
+    "TRANSPARENTE_CACHE", os.path.join(os.path.expanduser("~"), ".transparente")
+)
+
+# ------------------------------
+# Pipeline por lotes (main.py)
+# ------------------------------
+
+PIPELINE_QUEUE_SIZE = 4  # Imágenes en espera entre dos etapas
+PIPELINE_CPU_WORKERS = os.cpu_count() or 4
+PIPELINE_IO_WORKERS = 4
+
+# ------------------------------
+# Procesos de inferencia + workers de vectorización
+# ------------------------------
+
+INFERENCE_PROCESSES = 1  # Cada uno carga su propia sesión del modelo
+VECTOR_PROCESSES = os.cpu_count() or 4
+
+# ------------------------------
+# Control de admisión por memoria (src/admission.py)
+# ------------------------------
+
+MEMORY_ADMISSION = True  # False = solo el número fijo de workers limita el lote
+MEMORY_BUDGET_MB = 0  # RAM para los trabajos en marcha (0 = fracción de la disponible)
+MEMORY_BUDGET_FRACTION = 0.6  # De la memoria disponible al empezar el lote
+MEMORY_JOB_OVERHEAD_MB = 64  # Fijo por imagen (tensores del modelo a 1024px, buffers)
+MEMORY_BYTES_PER_PIXEL = 64  # Estimación inicial; después se aprende del RSS medido
+MEMORY_LEARN_RATE = 0.2  # Peso de cada medida nueva en la media móvil
+MEMORY_SAMPLE_SECONDS = 0.2  # Cada cuánto se mide el RSS del proceso
+MEMORY_MODEL_FILE = "memory_model.json"  # En CACHE_DIR
+
+# ------------------------------
+# Plan de etapas según el contenido (src/planner.py)
+# ------------------------------
+
+PLAN_STAGES = True  # False = ejecutar siempre todos los generadores
+ANALYSIS_SIZE = 256  # Lado máximo de la copia reducida que se analiza
+ANALYSIS_COLOR_COVERAGE = 0.95  # Colores contados: los que cubren este % de la figura
+PLAN_MIN_FOREGROUND = 0.001  # Menos figura visible = no vectorizar
+PLAN_BW_SATURATION = 15  # Mismo umbral que generate_color_svg
+PLAN_LINEART_MIDTONES = 0.05  # Menos medios tonos = line art
+PLAN_NOISY_EDGES = 0.3  # Densidad de bordes a partir de la cual hay ruido
+PLAN_NOISY_TURDSIZE = 6  # turdsize mínimo de los presets de color con ruido
+
+# ------------------------------
+# Modo secuencia: fotogramas numerados (src/sequence.py, main.py --sequence)
+# ------------------------------
+
+SEQUENCE_ANALYSIS_SIZE = 128  # Lado de la copia en grises que se compara
+SEQUENCE_PIXEL_DELTA = 8  # Niveles de gris a partir de los que un píxel "cambia"
+SEQUENCE_REUSE_CHANGED = 0.002  # Fracción cambiada hasta la que se reutiliza la máscara
+SEQUENCE_WARP = True  # Probar a desplazar la máscara antes de inferir
+SEQUENCE_WARP_CHANGED = 0.004  # Fracción cambiada tras el desplazamiento (vecindario 3x3)
+SEQUENCE_KEYFRAME_INTERVAL = 10  # Inferencia forzada cada N fotogramas
+
+# ------------------------------
+# Plazos por imagen y por etapa (segundos; 0 = sin límite)
+# ------------------------------
+
+IMAGE_TIMEOUT = 600  # Toda la imagen, desde que empieza (la inferencia cuenta pero no se corta)
+STAGE_TIMEOUT = 120  # Cada generador vectorial
+STAGE_TIMEOUT_DEGRADED = 120  # Reintento con los ajustes degradados
+STAGE_REPORT = "stage_report.jsonl"  # En la carpeta de salida
+
+# ------------------------------
+# GUI
+# ------------------------------
+
+PREVIEW_AI_MODEL = "u2netp"  # Modelo ligero (~5MB) para la vista previa
+PREVIEW_SIZE = 384  # Lado máximo de la copia reducida
+PREVIEW_COLORS = 8
+GUI_POLL_MS = 50  # Cada cuánto atiende la GUI los eventos de los hilos
+GUI_WORKERS = 2  # Imágenes a la vez en el modo lote (cada una usa varios núcleos)
+
+# ------------------------------
+# Modo distribuido (varios nodos sobre una carpeta compartida)
+# ------------------------------
+
+LEASE_DIR_NAME = ".leases"  # Dentro de la carpeta de salida
+LEASE_TTL = 120  # Segundos sin latido para dar por caído a un nodo
+LEASE_HEARTBEAT = 15  # Cada cuánto renueva un nodo sus leases
+LEASE_POLL = 5  # Espera entre vueltas cuando quedan imágenes en otros nodos
+LEASE_MAX_ATTEMPTS = 3  # Intentos fallidos tras los que una imagen deja de reintentarse
+LEASE_FAILED_TTL = 24 * 3600  # Segundos tras los que un marcador .failed se ignora
+
+# ------------------------------
+# Deduplicación de entradas (main.py --dedup)
+# ------------------------------
+
+DEDUP_THRESHOLD = 6  # Distancia de Hamming máxima entre pHash de 64 bits
+DEDUP_REPORT = "dedup_report.json"  # En la carpeta de salida
+
+# ------------------------------
+# Salida SVG
+# ------------------------------
+
+SVG_PRECISION = 1  # Decimales de las coordenadas (en píxeles); potrace usa 0.1px
+SVG_COMPRESS = False  # True = salidas .svgz (gzip)
+# Simplificación de paths: desviación máxima en píxeles (0 = desactivada)
+SVG_SIMPLIFY_TOLERANCE = 0.25
+SVG_MIN_SEGMENT = 0.5  # Segmentos más cortos (en píxeles) se eliminan
+
+# ------------------------------
+# Limpieza de máscaras (color / grayscale)
+# ------------------------------
+
+MASK_BATCH = 8  # Etiquetas procesadas a la vez como canales de un mismo array
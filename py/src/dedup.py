@@ -0,0 +1,208 @@
+"""
+Deduplicación de las imágenes de entrada antes del lote.
+
+Cada entrada recibe dos huellas:
+- exacta: SHA-256 del archivo (re-subidas idénticas),
+- perceptual: pHash de 64 bits (DCT de la imagen en gris a 32x32), que
+  apenas cambia al re-exportar, recomprimir o redimensionar.
+
+Las huellas perceptuales se guardan en un BK-tree, que permite buscar las
+que están a distancia de Hamming <= `threshold` sin comparar con todas.
+La primera imagen de cada grupo (por nombre) es la canónica: solo ella se
+procesa y sus salidas se enlazan (hard link, o copia si no se puede) con
+los nombres de los duplicados.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from src import config
+from src.pipeline import output_files, output_paths
+
+_PHASH_SIZE = 32  # Lado de la imagen de la que se calcula la DCT
+_PHASH_BITS = 8  # Se usan las 8x8 frecuencias más bajas
+
+
+# ----------------------------
+# Huellas
+# ----------------------------
+
+
+def exact_hash(path):
+    """SHA-256 del contenido del archivo."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def perceptual_hash(path):
+    """pHash de 64 bits como entero."""
+    with Image.open(path) as img:
+        # En JPEG, draft decodifica ya reducida (mucho más rápido)
+        img.draft("L", (_PHASH_SIZE * 4, _PHASH_SIZE * 4))
+        if img.mode in ("RGBA", "LA", "P"):
+            # La transparencia cuenta como fondo blanco, igual que en los generadores
+            rgba = img.convert("RGBA")
+            img = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+            img.alpha_composite(rgba)
+        small = img.convert("L").resize((_PHASH_SIZE, _PHASH_SIZE), Image.Resampling.BOX)
+    dct = cv2.dct(np.asarray(small, dtype=np.float32))[:_PHASH_BITS, :_PHASH_BITS]
+    low = dct.ravel()
+    # El término DC (brillo medio) no entra en la mediana
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a, b):
+    """Bits distintos entre dos huellas."""
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """Árbol BK sobre la distancia de Hamming."""
+
+    def __init__(self):
+        self.root = None  # [huella, valor, {distancia: hijo}]
+
+    def add(self, key, value):
+        """Inserta `key` con su `value` asociado."""
+        if self.root is None:
+            self.root = [key, value, {}]
+            return
+        node = self.root
+        while True:
+            d = hamming(key, node[0])
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [key, value, {}]
+                return
+            node = child
+
+    def nearest(self, key, threshold):
+        """(distancia, valor) más cercano con distancia <= threshold, o None."""
+        best = None
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            d = hamming(key, node[0])
+            if d <= threshold and (best is None or d < best[0]):
+                best = (d, node[1])
+            # Desigualdad triangular: solo pueden estar cerca los hijos en [d-t, d+t]
+            for edge, child in node[2].items():
+                if d - threshold <= edge <= d + threshold:
+                    stack.append(child)
+        return best
+
+
+# ----------------------------
+# Agrupación
+# ----------------------------
+
+
+def _fingerprint(path):
+    try:
+        return path, exact_hash(path), perceptual_hash(path), None
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        return path, None, None, str(e)
+
+
+def find_duplicates(input_paths, threshold=config.DEDUP_THRESHOLD, workers=config.PIPELINE_IO_WORKERS):
+    """
+    Agrupa `input_paths`. Devuelve (canónicas, duplicados) donde
+    duplicados = {ruta: {"canonical": ruta, "distance": bits, "exact": bool}}.
+    Con threshold < 0 solo se detectan copias exactas.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        prints = list(pool.map(_fingerprint, sorted(input_paths)))
+
+    canonicals = []
+    duplicates = {}
+    by_content = {}
+    tree = BKTree()
+    for path, digest, phash, error in prints:
+        if error is not None:
+            # Sin huella no se puede comparar: se procesa como única
+            print(f"⚠️ No se pudo calcular la huella de {os.path.basename(path)}: {error}")
+            canonicals.append(path)
+            continue
+        if digest in by_content:
+            duplicates[path] = {"canonical": by_content[digest], "distance": 0, "exact": True}
+            continue
+        match = tree.nearest(phash, threshold) if threshold >= 0 else None
+        if match is not None:
+            distance, canonical = match
+            duplicates[path] = {"canonical": canonical, "distance": distance, "exact": False}
+            by_content[digest] = canonical
+            continue
+        canonicals.append(path)
+        by_content[digest] = path
+        tree.add(phash, path)
+    return canonicals, duplicates
+
+
+# ----------------------------
+# Salidas
+# ----------------------------
+
+
+def _link(source, target):
+    try:
+        os.link(source, target)
+    except OSError:
+        # Otro sistema de archivos o sin soporte de hard links
+        shutil.copy2(source, target)
+
+
+def link_duplicates(output_dir, duplicates):
+    """
+    Enlaza las salidas de cada canónica con los nombres del duplicado.
+    Devuelve la lista de duplicados cuya canónica no tiene salidas (hay que
+    procesarlos aparte).
+    """
+    orphans = []
+    for path, info in duplicates.items():
+        source = output_paths(output_dir, info["canonical"])
+        target = output_paths(output_dir, path)
+        if not os.path.exists(source["alpha"]):
+            orphans.append(path)
+            continue
+        target_files = output_files(target)
+        for key, source_files in output_files(source).items():
+            for source_path, target_path in zip(source_files, target_files[key]):
+                if os.path.exists(source_path) and not os.path.exists(target_path):
+                    _link(source_path, target_path)
+    return orphans
+
+
+def write_report(output_dir, duplicates, cpu_per_image, hash_seconds):
+    """
+    Guarda <output>/DEDUP_REPORT y devuelve el texto del resumen con el
+    tiempo de CPU ahorrado (estimado con la media de CPU por imagen del lote).
+    """
+    saved = cpu_per_image * len(duplicates)
+    report = {
+        "duplicates": {
+            os.path.basename(path): {**info, "canonical": os.path.basename(info["canonical"])}
+            for path, info in sorted(duplicates.items())
+        },
+        "cpu_seconds_per_image": round(cpu_per_image, 3),
+        "cpu_seconds_saved": round(saved, 1),
+        "hash_seconds": round(hash_seconds, 2),
+    }
+    with open(os.path.join(output_dir, config.DEDUP_REPORT), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    exact = sum(info["exact"] for info in duplicates.values())
+    return (
+        f"♻️ {len(duplicates)} duplicados ({exact} exactos, {len(duplicates) - exact} "
+        f"similares): ~{saved:.1f}s de CPU ahorrados, {hash_seconds:.1f}s en huellas"
+    )
@@ -0,0 +1,302 @@
+"""
+Procesamiento distribuido sin coordinador sobre una carpeta compartida.
+
+Varios nodos (máquinas con la misma carpeta NFS, o procesos locales) apuntan
+al mismo `--input`/`--output`. Cada imagen se reclama con un archivo de
+concesión (lease) en `<output>/.leases/`:
+
+- Reclamar: crear `<imagen>.lease` con O_CREAT | O_EXCL (atómico también en
+  NFSv3+). Solo un nodo lo consigue.
+- Latido: mientras procesa, el nodo actualiza el mtime de sus leases cada
+  LEASE_HEARTBEAT segundos.
+- Caducidad: un lease sin latido durante LEASE_TTL segundos es de un nodo
+  caído. Otro nodo lo aparta con rename() (atómico: solo uno gana) y lo
+  vuelve a reclamar.
+- Fin: la imagen está hecha cuando existen todas sus salidas; el lease se
+  sustituye por `<imagen>.done`. Si el nodo no consigue generarlas deja
+  `<imagen>.failed` con el número de intentos.
+
+Lo que decide si una imagen se procesa son sus salidas (`missing_outputs`),
+como en el modo en serie: si se borra una salida, la siguiente ejecución la
+regenera aunque exista `.done`. Los marcadores son solo una pista: una
+imagen con `.failed` se reintenta hasta LEASE_MAX_ATTEMPTS veces, y de
+nuevo cuando el último fallo tiene más de LEASE_FAILED_TTL segundos.
+
+Se usan archivos y no SQLite porque el bloqueo de SQLite sobre NFS no es
+fiable.
+"""
+
+import json
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+
+from src import config
+from src.generators.encode import write_atomic
+from src.job_config import resolve_config
+from src.pipeline import missing_outputs, output_paths
+
+
+def default_node_id():
+    """Identificador del nodo: host y pid."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class LeaseDir:
+    """Operaciones atómicas sobre los archivos de concesión de una carpeta."""
+
+    def __init__(
+        self,
+        output_dir,
+        ttl=config.LEASE_TTL,
+        max_attempts=config.LEASE_MAX_ATTEMPTS,
+        failed_ttl=config.LEASE_FAILED_TTL,
+    ):
+        self.path = os.path.join(output_dir, config.LEASE_DIR_NAME)
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.failed_ttl = failed_ttl
+        os.makedirs(self.path, exist_ok=True)
+
+    def _file(self, key, suffix):
+        return os.path.join(self.path, f"{key}.{suffix}")
+
+    def _read(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def claim(self, key, node_id):
+        """
+        Intenta reclamar `key`. Devuelve el token del lease o None si otro
+        nodo lo tiene vivo.
+        """
+        token = uuid.uuid4().hex
+        lease = self._file(key, "lease")
+        payload = json.dumps({"node": node_id, "token": token, "claimed": time.time()})
+        for _ in range(2):
+            try:
+                fd = os.open(lease, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                if not self._break_stale(lease):
+                    return None
+                continue
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(payload)
+            # Si otro nodo apartó este lease por error entre la creación y
+            # ahora, ya no es nuestro: no se procesa
+            return token if self.owns(key, token) else None
+        return None
+
+    def _break_stale(self, lease):
+        """
+        Aparta un lease caducado. Devuelve True si lo apartó este nodo.
+        """
+        try:
+            age = time.time() - os.stat(lease).st_mtime
+        except FileNotFoundError:
+            return True  # Ya se liberó: se puede volver a intentar
+        if age < self.ttl:
+            return False
+
+        stale = self._read(lease)
+        tomb = f"{lease}.{uuid.uuid4().hex}.stale"
+        try:
+            os.rename(lease, tomb)
+        except FileNotFoundError:
+            return False  # Otro nodo se adelantó
+        moved = self._read(tomb)
+        # rename conserva el mtime: si lo apartado tiene latido reciente o
+        # es de otro token, entre la lectura y el rename otro nodo lo había
+        # reclamado de nuevo
+        fresh = time.time() - os.stat(tomb).st_mtime < self.ttl
+        if fresh or (moved or {}).get("token") != (stale or {}).get("token"):
+            # Devolverlo a su sitio (link falla si ya hay uno nuevo) y
+            # comprobar que el que queda es el suyo
+            try:
+                os.link(tomb, lease)
+            except OSError:
+                pass
+            restored = self._read(lease)
+            if moved is not None and (restored or {}).get("token") != moved.get("token"):
+                # Su dueño lo verá en el próximo latido (heartbeat → False)
+                print(
+                    f"⚠️ No se pudo devolver el lease de {moved.get('node')}: "
+                    f"{os.path.basename(lease)}"
+                )
+            os.remove(tomb)
+            return False
+        os.remove(tomb)
+        print(f"♻️ Lease caducado recuperado: {os.path.basename(lease)} ({stale})")
+        return True
+
+    def owns(self, key, token):
+        """True si el lease de `key` sigue siendo el de `token`."""
+        data = self._read(self._file(key, "lease"))
+        return data is not None and data.get("token") == token
+
+    def heartbeat(self, key, token):
+        """Renueva el lease; devuelve False si ya no es de este nodo."""
+        if not self.owns(key, token):
+            return False
+        try:
+            os.utime(self._file(key, "lease"))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def failures(self, key):
+        """
+        Intentos fallidos recientes de `key`: los del marcador `.failed`, o
+        0 si no lo hay o tiene más de `failed_ttl` segundos.
+        """
+        record = self._read(self._file(key, "failed"))
+        if record is None or time.time() - record.get("time", 0) >= self.failed_ttl:
+            return 0
+        return record.get("attempts", 1)
+
+    def should_retry(self, key):
+        """True si `key` no ha agotado sus `max_attempts` intentos."""
+        return self.failures(key) < self.max_attempts
+
+    def release(self, key, token, state=None, detail=None):
+        """
+        Libera el lease. Con `state` ("done" | "failed") deja el marcador
+        correspondiente con el nodo y el detalle (y los intentos, si falló)
+        y borra el contrario.
+        """
+        if state is not None:
+            record = {"token": token, "time": time.time(), "detail": detail}
+            if state == "failed":
+                record["attempts"] = self.failures(key) + 1
+            write_atomic(self._file(key, state), json.dumps(record).encode("utf-8"))
+            other = self._file(key, "failed" if state == "done" else "done")
+            try:
+                os.remove(other)
+            except FileNotFoundError:
+                pass
+        if self.owns(key, token):
+            try:
+                os.remove(self._file(key, "lease"))
+            except FileNotFoundError:
+                pass
+
+    def state(self, key):
+        """"done", "failed", "leased" o None (libre)."""
+        for state in ("done", "failed", "lease"):
+            if os.path.exists(self._file(key, state)):
+                return "leased" if state == "lease" else state
+        return None
+
+
+class DistributedWorker:
+    """
+    Un nodo del lote distribuido. Recorre las imágenes en un orden propio
+    (para que los nodos no compitan por las mismas), reclama las libres y
+    repite hasta que no queda ninguna pendiente, recuperando las de nodos
+    caídos cuando sus leases caducan.
+    """
+
+    def __init__(
+        self,
+        output_dir,
+        node_id=None,
+        ttl=config.LEASE_TTL,
+        heartbeat=config.LEASE_HEARTBEAT,
+        poll=config.LEASE_POLL,
+        job_config=None,
+    ):
+        self.output_dir = output_dir
+        self.job_config = resolve_config(job_config)
+        self.node_id = node_id or default_node_id()
+        self.leases = LeaseDir(output_dir, ttl)
+        self.heartbeat_interval = heartbeat
+        self.poll = poll
+        self.stats = {"done": 0, "skipped": 0, "failed": 0}
+        self._held = {}  # key → token
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            with self._lock:
+                held = list(self._held.items())
+            for key, token in held:
+                if not self.leases.heartbeat(key, token):
+                    print(f"⚠️ [{self.node_id}] Lease perdido: {key}")
+
+    def _complete(self, input_path):
+        paths = output_paths(self.output_dir, input_path, self.job_config)
+        return not missing_outputs(paths, self.job_config)
+
+    def _try(self, input_path, process):
+        """Procesa una imagen si está libre. Devuelve True si queda pendiente en otro nodo."""
+        key = os.path.basename(input_path)
+        if self._complete(input_path):
+            self.stats["skipped"] += 1
+            return False
+        if not self.leases.should_retry(key):
+            self.stats["failed"] += 1
+            print(
+                f"⚠️ [{self.node_id}] {key} ya falló {self.leases.failures(key)} veces; "
+                f"no se reintenta (borra {config.LEASE_DIR_NAME}/{key}.failed para forzarlo)"
+            )
+            return False
+
+        token = self.leases.claim(key, self.node_id)
+        if token is None:
+            return True
+        with self._lock:
+            self._held[key] = token
+        try:
+            if self._complete(input_path):
+                # Otro nodo terminó justo antes de que reclamáramos
+                self.leases.release(key, token, "done", "existente")
+                self.stats["skipped"] += 1
+                return False
+            error = None
+            try:
+                process(input_path)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                error = str(e)
+            if error is None and self._complete(input_path):
+                self.leases.release(key, token, "done", self.node_id)
+                self.stats["done"] += 1
+            else:
+                detail = error or "faltan salidas"
+                self.leases.release(key, token, "failed", f"{self.node_id}: {detail}")
+                self.stats["failed"] += 1
+                print(f"❌ [{self.node_id}] Error procesando {key}: {detail}")
+        finally:
+            with self._lock:
+                self._held.pop(key, None)
+        return False
+
+    def run(self, input_paths, process):
+        """
+        Procesa `input_paths` llamando a `process(input_path)` en las que
+        reclame este nodo. Devuelve las estadísticas del nodo.
+        """
+        start = time.perf_counter()
+        pending = list(input_paths)
+        random.Random(self.node_id).shuffle(pending)
+
+        beat = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        beat.start()
+        try:
+            while pending:
+                # Las que tienen lease de otro nodo se revisan en la siguiente vuelta
+                pending = [p for p in pending if self._try(p, process)]
+                if pending:
+                    time.sleep(self.poll)
+        finally:
+            self._stop.set()
+            beat.join()
+
+        self.stats["seconds"] = time.perf_counter() - start
+        return self.stats
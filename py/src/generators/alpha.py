@@ -9,7 +9,7 @@ import traceback
 try:
     import numpy as np
     import cv2
-    from rembg import remove, new_session
+    from rembg import remove
 except ImportError:
     print("\n❌ Error: Faltan dependencias críticas.")
     print("Por favor, ejecuta: pip install rembg opencv-python numpy\n")
@@ -18,30 +18,41 @@ except ImportError:
 from io import BytesIO
 from PIL import Image
 from src import config
+from src.job_config import resolve_config
+from .encode import save_alpha
+from .session import cached_session, get_session, session_options
 
-# Inicializar sesión global de IA
-SESSION = None
 
-
-def get_ai_session():
-    """Lazily initializes or returns the AI session with feedback."""
-    global SESSION
-    if SESSION is None:
-        print("\nDEBUG: [AI_INIT] Iniciando get_ai_session...")
-        print("[AI] Cargando modelo de Inteligencia Artificial (rembg)...")
+def get_ai_session(job_config=None):
+    """
+    Lazily initializes or returns the AI session with feedback.
+    La sesión sale del registro compartido (una por modelo y opciones de
+    ONNX Runtime del trabajo); devuelve None si no se puede cargar.
+    """
+    job = resolve_config(job_config)
+    options = session_options(job)
+    session = cached_session(**options)
+    if session is not None:
+        return session
+
+    print("\nDEBUG: [AI_INIT] Iniciando get_ai_session...")
+    print("[AI] Cargando modelo de Inteligencia Artificial (rembg)...")
+    print(
+        "[INFO] Si es la primera vez, esto puede tardar unos minutos (descargando ~150MB)."
+    )
+    try:
         print(
-            "[INFO] Si es la primera vez, esto puede tardar unos minutos (descargando ~150MB)."
+            f"DEBUG: [AI_INIT] Llamando a create_ai_session("
+            f"'{job.AI_MODEL}', '{job.AI_MODEL_VARIANT}')..."
         )
-        try:
-            print("DEBUG: [AI_INIT] Llamando a new_session('isnet-general-use')...")
-            SESSION = new_session("isnet-general-use")
-            print("DEBUG: [AI_INIT] new_session completado con éxito.")
-            print("[AI] Modelo cargado correctamente.\n")
-        except Exception as e:
-            print(f"[ERROR] No se pudo cargar el modelo de IA: {e}")
-            print(f"DEBUG: [AI_INIT] Traceback: {traceback.format_exc()}")
-            SESSION = None
-    return SESSION
+        session = get_session(**options)
+        print("DEBUG: [AI_INIT] create_ai_session completado con éxito.")
+        print("[AI] Modelo cargado correctamente.\n")
+    except Exception as e:
+        print(f"[ERROR] No se pudo cargar el modelo de IA: {e}")
+        print(f"DEBUG: [AI_INIT] Traceback: {traceback.format_exc()}")
+        session = None
+    return session
 
 
 # ----------------------------
@@ -49,13 +60,13 @@ def get_ai_session():
 # ----------------------------
 
 
-def refine_alpha(img, feather=2, blur=1):
+def _refine_plane(alpha, feather, blur):
     """
-    Refina el alpha de una imagen.
+    Blur + cierre morfológico de un plano alpha uint8 (o de un recorte).
+    Todo en uint8: el blur gaussiano de OpenCV para 8 bits es de punto fijo
+    y el cierre es min/max, así que el valor de cada píxel depende solo de
+    su vecindario (`_refine_reach`) y no de su posición en el plano.
     """
-    data = np.array(img)
-    alpha = data[..., 3].astype(np.float32)
-
     # Blur suave
     if blur > 0:
         alpha = cv2.GaussianBlur(alpha, (0, 0), blur)
@@ -65,46 +76,133 @@ def refine_alpha(img, feather=2, blur=1):
         kernel = np.ones((feather, feather), np.uint8)
         alpha = cv2.morphologyEx(alpha, cv2.MORPH_CLOSE, kernel)
 
-    # Normalización
-    alpha = np.clip(alpha, 0, 255).astype(np.uint8)
+    return alpha
+
+
+def _refine_reach(feather, blur):
+    """
+    Distancia (px) a la que llega el efecto de `_refine_plane`: radio del
+    kernel gaussiano que OpenCV elige para uint8 (cvRound(sigma*6+1)|1)
+    más ida y vuelta del cierre.
+    """
+    reach = 0
+    if blur > 0:
+        reach += (int(np.rint(blur * 6 + 1)) | 1) // 2
+    if feather > 0:
+        reach += 2 * feather
+    return reach
+
 
-    data[..., 3] = alpha
+def refine_band_mask(alpha, feather, blur, tile):
+    """
+    Bloques de la franja que procesa `_refine_band`. Devuelve (band, low,
+    tile): la máscara booleana por bloque (filas x columnas), el mínimo del
+    vecindario de 3x3 bloques de cada uno y el tamaño de bloque efectivo.
+    """
+    reach = _refine_reach(feather, blur)
+    height, width = alpha.shape
+    tile = max(tile, reach)  # El vecindario de 3x3 bloques debe cubrir `reach`
+    rows, cols = -(-height // tile), -(-width // tile)
+
+    # Mínimo y máximo por bloque y luego en su vecindario de 3x3 bloques
+    padded = alpha
+    if (rows * tile, cols * tile) != alpha.shape:
+        padded = np.pad(alpha, ((0, rows * tile - height), (0, cols * tile - width)), mode="edge")
+    # Primero por filas de bloques (memoria contigua) y luego por columnas
+    strips = padded.reshape(rows, tile, cols * tile)
+    ring = np.ones((3, 3), np.uint8)
+    low = cv2.erode(strips.min(axis=1).reshape(rows, cols, tile).min(axis=2), ring)
+    high = cv2.dilate(strips.max(axis=1).reshape(rows, cols, tile).max(axis=2), ring)
+    return low != high, low, tile
+
+
+def _refine_band(alpha, feather, blur, tile):
+    """
+    `_refine_plane` solo en la franja incierta del borde, con el mismo
+    resultado que sobre el plano completo.
+
+    El plano se divide en bloques de `tile` px. Si el vecindario de 3x3
+    bloques de uno es constante (v), su salida es la de un plano constante
+    de valor v. El resto forman la franja (ver `refine_band_mask`) y se
+    procesan por tramos de bloques contiguos con un margen de
+    `_refine_reach` px, fuera del cual nada influye en el tramo. El coste
+    crece con el perímetro de la figura, no con su área.
+    """
+    reach = _refine_reach(feather, blur)
+    height, width = alpha.shape
+    band, low, tile = refine_band_mask(alpha, feather, blur, tile)
+    rows, cols = band.shape
+
+    # Valor de cada bloque constante: el de un plano constante
+    fill = np.zeros_like(low)
+    for value in np.unique(low[~band]):
+        flat = np.full((2 * reach + 1, 2 * reach + 1), value, np.uint8)
+        fill[~band & (low == value)] = _refine_plane(flat, feather, blur)[reach, reach]
+    out = np.empty((rows * tile, cols * tile), np.uint8)
+    out.reshape(rows, tile, cols, tile)[:] = fill[:, None, :, None]
+    out = out[:height, :width]
+
+    for row in range(rows):
+        y0, y1 = row * tile, min(height, (row + 1) * tile)
+        cy0, cy1 = max(0, y0 - reach), min(height, y1 + reach)
+        col = 0
+        while col < cols:
+            if not band[row, col]:
+                col += 1
+                continue
+            # Tramo de bloques de la franja contiguos en la fila: un recorte
+            first = col
+            while col < cols and band[row, col]:
+                col += 1
+            x0, x1 = first * tile, min(width, col * tile)
+            cx0, cx1 = max(0, x0 - reach), min(width, x1 + reach)
+            refined = _refine_plane(alpha[cy0:cy1, cx0:cx1], feather, blur)
+            out[y0:y1, x0:x1] = refined[y0 - cy0 : y1 - cy0, x0 - cx0 : x1 - cx0]
+    return out
+
+
+def refine_alpha(img, feather=2, blur=1, tile=config.ALPHA_REFINE_TILE):
+    """
+    Refina el alpha de una imagen.
+    Con `tile` > 0 solo se procesa la franja del borde (ver `_refine_band`);
+    con 0, el plano completo. El resultado es el mismo.
+    """
+    data = np.array(img)
+    if blur > 0 or feather > 0:
+        if tile > 0:
+            data[..., 3] = _refine_band(data[..., 3], feather, blur, tile)
+        else:
+            data[..., 3] = _refine_plane(data[..., 3], feather, blur)
     return Image.fromarray(data)
 
 
-def clean_white_halo(img):
+def clean_white_halo(img, job_config=None):
     """
     Elimina el halo blanco de una imagen.
+    Los candidatos (casi blancos y con alpha > 0) salen de una sola pasada de
+    cv2.inRange sobre el RGBA uint8; solo esos píxeles pasan a float32.
     """
-    data = np.array(img).astype(np.float32)
+    job = resolve_config(job_config)
+    data = np.array(img)
 
-    r = data[:, :, 0]
-    g = data[:, :, 1]
-    b = data[:, :, 2]
-    a = data[:, :, 3]
+    tolerance = job.TOLERANCE
+    low = [max(0, int(np.ceil(c - tolerance))) for c in job.TRANSPARENT_COLOR] + [1]
+    high = [min(255, int(np.floor(c + tolerance))) for c in job.TRANSPARENT_COLOR] + [255]
+    rows, cols = np.nonzero(cv2.inRange(data, np.array(low), np.array(high)))
+    if rows.size == 0:
+        return Image.fromarray(data)
 
-    mask = (
-        (np.abs(r - config.TRANSPARENT_COLOR[0]) <= config.TOLERANCE)
-        & (np.abs(g - config.TRANSPARENT_COLOR[1]) <= config.TOLERANCE)
-        & (np.abs(b - config.TRANSPARENT_COLOR[2]) <= config.TOLERANCE)
-        & (a > 0)
-    )
+    pixels = data[rows, cols]
 
     # Eliminación directa
-    a[mask] = 0
-
-    # Descontaminación de color (despill)
-    strength = config.DESPILL_STRENGTH
-    r[mask] *= strength
-    g[mask] *= strength
-    b[mask] *= strength
+    pixels[:, 3] = 0
 
-    data[:, :, 0] = r
-    data[:, :, 1] = g
-    data[:, :, 2] = b
-    data[:, :, 3] = np.clip(a, 0, 255)
+    # Descontaminación de color (despill), en float32 como antes
+    strength = np.float32(job.DESPILL_STRENGTH)
+    pixels[:, :3] = (pixels[:, :3].astype(np.float32) * strength).astype(np.uint8)
 
-    return Image.fromarray(data.astype(np.uint8))
+    data[rows, cols] = pixels
+    return Image.fromarray(data)
 
 
 def remove_tiny_alpha(img, min_alpha=8):
@@ -125,34 +223,71 @@ def remove_tiny_alpha(img, min_alpha=8):
 # ----------------------------
 
 
-def generate_alpha_png(input_path, output_path):
+def remove_background(source, session=None, job_config=None):
+    """
+    Ejecuta el modelo de IA sobre `source` (bytes del archivo o imagen PIL)
+    y devuelve el recorte RGBA sin refinar.
+    Sin `session` se usa la del registro para el modelo de `job_config`.
+    """
+    if session is None:
+        session = get_ai_session(job_config)
+    if session is None:
+        raise RuntimeError(
+            "La sesión de IA no está disponible (error al cargar el modelo)."
+        )
+
+    result = remove(source, session=session)
+    if isinstance(result, bytes):
+        result = Image.open(BytesIO(result))
+    return result.convert("RGBA")
+
+
+def refine_cutout(img, job_config=None):
+    """
+    Aplica el refinado avanzado (halo, alpha residual y suavizado) al recorte.
+    """
+    job = resolve_config(job_config)
+    img = clean_white_halo(img, job)
+    img = remove_tiny_alpha(img, min_alpha=job.MIN_ALPHA)
+    img = refine_alpha(
+        img, feather=job.ALPHA_FEATHER, blur=job.ALPHA_BLUR, tile=job.ALPHA_REFINE_TILE
+    )
+    return img
+
+
+def generate_alpha_png(input_path, output_path, executor=None, job_config=None):
     """
     Genera un archivo PNG con el alpha de una imagen.
+    Devuelve la imagen refinada (None si ya existía o si falla) para que los
+    generadores la usen sin volver a leerla. Con `executor`, la codificación
+    y escritura del archivo se hacen en segundo plano.
     """
     if os.path.exists(output_path):
-        return
+        return None
 
+    job = resolve_config(job_config)
     try:
         # --- IA ---
-        session = get_ai_session()
-        if session is None:
-            raise RuntimeError(
-                "La sesión de IA no está disponible (error al cargar el modelo)."
-            )
-
         with open(input_path, "rb") as i:
-            result = remove(i.read(), session=session)
-
-        img = Image.open(BytesIO(result)).convert("RGBA")
+            img = remove_background(i.read(), job_config=job)
 
         # --- Refinado avanzado ---
-        img = clean_white_halo(img)
-        img = remove_tiny_alpha(img, min_alpha=config.MIN_ALPHA)
-        img = refine_alpha(img, feather=config.ALPHA_FEATHER, blur=config.ALPHA_BLUR)
-
-        img.save(output_path, "PNG")
+        img = refine_cutout(img, job)
 
-        print(f"🖼 PNG Alpha OK (PRO): {os.path.basename(output_path)}")
+        if executor is None:
+            _save_alpha(img, output_path, job)
+        else:
+            executor.submit(_save_alpha, img, output_path, job)
+        return img
 
     except Exception as e:
         print(f"❌ Error generating Alpha PNG for {os.path.basename(input_path)}: {e}")
+        return None
+
+
+def _save_alpha(img, output_path, job_config=None):
+    try:
+        save_alpha(img, output_path, job_config)
+        print(f"🖼 PNG Alpha OK (PRO): {os.path.basename(output_path)}")
+    except Exception as e:
+        print(f"❌ Error saving Alpha PNG {os.path.basename(output_path)}: {e}")
@@ -0,0 +1,77 @@
+"""
+Análisis rápido del contenido de una imagen RGBA sobre una copia reducida.
+
+Sirve para decidir qué generadores merece la pena ejecutar (ver
+src/planner.py) antes de gastar tiempo en KMeans y potrace.
+"""
+
+import math
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from src.job_config import resolve_config
+from .common import open_rgba
+
+
+def _reduced_size(image_size, size):
+    """El tamaño que daría Image.thumbnail((size, size)) a `image_size`."""
+    width, height = image_size
+    aspect = width / height
+    if aspect <= 1:
+        number, key = size * aspect, lambda n: abs(aspect - n / size)
+    else:
+        number, key = size / aspect, lambda n: 0 if n == 0 else abs(aspect - size / n)
+    side = max(min(math.floor(number), math.ceil(number), key=key), 1)
+    return (side, size) if aspect <= 1 else (size, side)
+
+
+def analyze_image(source, size=None, job_config=None):
+    """
+    Devuelve un dict con:
+    - foreground: fracción de píxeles visibles (alpha > 20)
+    - saturation: desviación media entre canales de los visibles (el mismo
+      criterio que usa generate_color_svg para detectar B/N)
+    - colors: colores (RGB a 4 bits por canal) necesarios para cubrir
+      ANALYSIS_COLOR_COVERAGE de los píxeles visibles
+    - midtones: fracción de visibles con gris entre 40 y 215 (casi 0 en
+      line art en blanco y negro)
+    - edges: densidad de bordes (Canny) dentro de la figura
+    Sin `size`, el ANALYSIS_SIZE del trabajo.
+    """
+    job = resolve_config(job_config)
+    size = job.ANALYSIS_SIZE if size is None else size
+    img = open_rgba(source)
+    if max(img.size) > size:
+        # NEAREST: no inventa colores intermedios al reducir. resize devuelve
+        # una imagen nueva, sin copiar antes la de resolución completa
+        img = img.resize(_reduced_size(img.size, size), Image.Resampling.NEAREST)
+    rgba = np.asarray(img)
+    visible = rgba[..., 3] > 20
+    count = int(visible.sum())
+    if count == 0:
+        return {"foreground": 0.0, "saturation": 0.0, "colors": 0, "midtones": 0.0, "edges": 0.0}
+
+    pixels = rgba[..., :3][visible]
+    saturation = float(pixels.std(axis=1).mean())
+
+    bins = (pixels >> 4).astype(np.int32)
+    bins = (bins[:, 0] << 8) | (bins[:, 1] << 4) | bins[:, 2]
+    shares = np.sort(np.bincount(bins, minlength=4096))[::-1] / count
+    colors = int(np.searchsorted(np.cumsum(shares), job.ANALYSIS_COLOR_COVERAGE) + 1)
+
+    # Gris sobre fondo blanco, como lo ven los generadores monocromos
+    alpha = rgba[..., 3:4].astype(np.float32) / 255.0
+    composite = rgba[..., :3] * alpha + 255.0 * (1.0 - alpha)
+    gray = cv2.cvtColor(composite.astype(np.uint8), cv2.COLOR_RGB2GRAY)
+    midtones = float(((gray[visible] > 40) & (gray[visible] < 215)).mean())
+    edges = float((cv2.Canny(gray, 100, 200)[visible] > 0).mean())
+
+    return {
+        "foreground": count / visible.size,
+        "saturation": saturation,
+        "colors": colors,
+        "midtones": midtones,
+        "edges": edges,
+    }
@@ -3,14 +3,92 @@ Xxxx
 xxxx
 """
 
+import hashlib
 import os
 import re
-import subprocess
+import time
 import traceback
 
 import numpy as np
-from PIL import Image, ImageFilter
+from PIL import Image
 from sklearn.cluster import KMeans
+from sklearn.metrics import pairwise_distances_argmin
+
+from src.job_config import resolve_config
+from .common import open_rgba, source_name
+from .deadline import StageTimeout, check_deadline, iterations_within, remaining, run_potrace
+from .masks import blur_mask, iter_label_masks
+from .svg import SvgWriter, writer_options
+
+
+def _is_bw(rgb_arr, visible_mask):
+    """Imagen en B/N: poca desviación entre canales en los píxeles visibles."""
+    if visible_mask.sum() > 0:
+        visible_pixels = rgb_arr[visible_mask]
+        saturation = np.std(visible_pixels, axis=1).mean()
+        return saturation < 15
+    return True
+
+
+# Iteraciones de Lloyd de KMeans (el valor por defecto de scikit-learn)
+_KMEANS_MAX_ITER = 300
+
+
+def _kmeans_max_iter(pixels, n_clusters, n_init, sample=50000):
+    """
+    max_iter de KMeans para que el ajuste quepa en el plazo actual aunque
+    no converja antes. El coste de una iteración se acota por arriba con
+    una asignación de hasta `sample` píxeles a `n_clusters` centros
+    (escalada al total; en la práctica tarda más que una iteración de
+    Lloyd), y la inicialización k-means++ cuenta como dos iteraciones por
+    intento. Sin plazo no se mide nada.
+    """
+    if remaining() is None:
+        return _KMEANS_MAX_ITER
+    probe = pixels[:: max(1, len(pixels) // sample)]
+    start = time.perf_counter()
+    pairwise_distances_argmin(probe, probe[:n_clusters].astype(np.float64))
+    per_iteration = (time.perf_counter() - start) * len(pixels) / len(probe) * n_init
+    return iterations_within(per_iteration, _KMEANS_MAX_ITER, reserve=2)
+
+
+def _trace_layer(mask, t_bmp, t_svg, potrace_args, trace_cache=None, key=None):
+    """
+    Traza la máscara con potrace y devuelve (paths, transform) o None.
+    Con `trace_cache` (dict), si la máscara de `key` es idéntica a la de la
+    última llamada se reutiliza su trazado sin ejecutar potrace.
+    """
+    digest = None
+    if trace_cache is not None:
+        digest = hashlib.blake2b(mask.tobytes(), digest_size=16)
+        digest.update(repr((mask.size, potrace_args)).encode())
+        digest = digest.hexdigest()
+        cached = trace_cache.get(key)
+        if cached is not None and cached[0] == digest:
+            trace_cache["hits"] = trace_cache.get("hits", 0) + 1
+            return cached[1]
+
+    mask.save(t_bmp)
+    run_potrace([t_bmp, "-s", "-o", t_svg, "--flat", *potrace_args])
+
+    with open(t_svg, "r", encoding="utf-8") as f:
+        content = f.read()
+
+    path_match = re.search(r'<path d="([^"]+)"', content)
+    transform_match = re.search(r'<g transform="([^"]+)"', content)
+
+    traced = None
+    if path_match:
+        d = path_match.group(1)
+        transform = transform_match.group(1) if transform_match else ""
+        traced = (d, transform)
+
+    os.remove(t_bmp)
+    os.remove(t_svg)
+    if trace_cache is not None:
+        trace_cache[key] = (digest, traced)
+        trace_cache["misses"] = trace_cache.get("misses", 0) + 1
+    return traced
 
 
 def generate_color_svg(
@@ -21,16 +99,29 @@ def generate_color_svg(
     # min_area=10,  # Área mínima de región
     turdsize=2,  # Detalles finos
     blur_radius=1,  # Suavizado previo
+    n_init=10,  # Inicializaciones de KMeans (1 = modo degradado, mucho más rápido)
+    job_config=None,  # Ajustes del trabajo (src/job_config.py)
+    palette=None,  # Centros fijos (RGB): sin KMeans, color más cercano
+    trace_cache=None,  # dict: reutiliza paleta y trazado entre llamadas
 ):
     """
     Genera SVG de alta calidad desde PNG con alpha, preservando colores y formas.
+    Con `trace_cache` (modo secuencia, src/sequence.py) la primera llamada en
+    color guarda sus centros de KMeans como paleta de las siguientes, así que
+    todos los fotogramas comparten colores, y solo se vuelven a trazar las
+    capas cuya máscara ha cambiado respecto al fotograma anterior.
     """
     if os.path.exists(output_path):
         return
 
+    job = resolve_config(job_config)
+    if palette is None and trace_cache is not None:
+        palette = trace_cache.get("palette")
+    temp_files = []
+
     try:
         # --- Cargar y preparar imagen ---
-        img = Image.open(input_path).convert("RGBA")
+        img = open_rgba(input_path)
         width, height = img.size
         rgba = np.array(img)
         rgb_arr = rgba[..., :3]
@@ -39,13 +130,11 @@ def generate_color_svg(
         # Crear máscara de píxeles visibles
         visible_mask = alpha_arr > 20
 
-        # --- Detectar si es B/N ---
-        if visible_mask.sum() > 0:
-            visible_pixels = rgb_arr[visible_mask]
-            saturation = np.std(visible_pixels, axis=1).mean()
-            is_bw = saturation < 15
+        # --- Detectar si es B/N (con paleta fija manda la paleta) ---
+        if palette is None:
+            is_bw = _is_bw(rgb_arr, visible_mask)
         else:
-            is_bw = True
+            is_bw = not visible_mask.any()
 
         svg_layers = []
 
@@ -58,68 +147,57 @@ def generate_color_svg(
                 np.uint8
             )
 
-            mask = Image.fromarray(mask_arr, mode="L")
-
             # Suavizado opcional
-            if blur_radius > 0:
-                mask = mask.filter(ImageFilter.GaussianBlur(blur_radius))
+            mask = Image.fromarray(blur_mask(mask_arr, blur_radius), mode="L")
 
             t_bmp = f"{output_path}.temp.bmp"
             t_svg = f"{output_path}.temp.svg"
 
-            mask.save(t_bmp)
-
-            subprocess.run(
-                [
-                    "potrace",
-                    t_bmp,
-                    "-s",
-                    "-o",
-                    t_svg,
-                    "--flat",
-                    "--turdsize",
-                    str(turdsize),
-                    "--alphamax",
-                    "0.5",  # Suavizar curvas
-                ],
-                check=True,
-                capture_output=True,
+            temp_files.extend([t_bmp, t_svg])
+            traced = _trace_layer(
+                mask,
+                t_bmp,
+                t_svg,
+                ["--turdsize", str(turdsize), "--alphamax", "0.5"],  # Suavizar curvas
+                trace_cache,
+                "bw",
             )
-
-            with open(t_svg, "r", encoding="utf-8") as f:
-                content = f.read()
-
-            path_match = re.search(r'<path d="([^"]+)"', content)
-            transform_match = re.search(r'<g transform="([^"]+)"', content)
-
-            if path_match:
-                d = path_match.group(1)
-                transform = transform_match.group(1) if transform_match else ""
-                svg_layers.append(
-                    f'<g transform="{transform}"><path d="{d}" fill="#000000" stroke="none" /></g>'
-                )
-
-            os.remove(t_bmp)
-            os.remove(t_svg)
+            if traced:
+                d, transform = traced
+                svg_layers.append((d, "#000000", transform))
 
         else:
             # --- Modo Color: Clustering K-means mejorado ---
             visible_pixels = rgb_arr[visible_mask]
 
-            # Clustering con K-means para colores reales
-            kmeans = KMeans(
-                n_clusters=min(num_colors, len(visible_pixels)),
-                random_state=42,
-                n_init=10,
-            )
-            kmeans.fit(visible_pixels)
+            check_deadline()
+            if palette is None:
+                # Clustering con K-means para colores reales. Un fit no se
+                # puede interrumpir: sus iteraciones se limitan al plazo
+                n_clusters = min(num_colors, len(visible_pixels))
+                kmeans = KMeans(
+                    n_clusters=n_clusters,
+                    random_state=42,
+                    n_init=n_init,
+                    max_iter=_kmeans_max_iter(visible_pixels, n_clusters, n_init),
+                )
+                kmeans.fit(visible_pixels)
+                centers, labels = kmeans.cluster_centers_, kmeans.labels_
+                if trace_cache is not None:
+                    trace_cache["palette"] = centers
+            else:
+                # Paleta fija: cada píxel al centro más cercano
+                centers = np.asarray(palette, dtype=np.float64)
+                labels = pairwise_distances_argmin(visible_pixels, centers)
+            # Sin check_deadline aquí: un KMeans ya terminado no se tira; el
+            # plazo se vuelve a comprobar antes de cada potrace
 
             # Obtener colores centrales y contar píxeles
-            colors = kmeans.cluster_centers_.astype(int)
-            labels = kmeans.labels_
+            colors = centers.astype(int)
 
-            # Mapear labels de vuelta a la imagen completa
-            full_labels = np.full((height, width), -1, dtype=int)
+            # Mapear labels de vuelta a la imagen completa (int16: num_colors
+            # nunca pasa de unas decenas y ocupa 4 veces menos que int64)
+            full_labels = np.full((height, width), -1, dtype=np.int16)
             full_labels[visible_mask] = labels
 
             # Calcular área de cada color
@@ -128,41 +206,30 @@ def generate_color_svg(
             # Ordenar por área (colores más grandes primero, como fondo)
             sorted_indices = np.argsort(-counts)
 
-            for idx in sorted_indices:
-                label = unique_labels[idx]
+            # Filtrar colores casi blancos (fondo)
+            layer_labels = [
+                unique_labels[idx]
+                for idx in sorted_indices
+                if sum(colors[unique_labels[idx]]) <= 740
+            ]
+
+            # Máscaras de todas las capas: cierre de huecos + suavizado,
+            # varias etiquetas por llamada de OpenCV
+            for label, mask_arr in iter_label_masks(
+                full_labels, layer_labels, blur_radius=blur_radius, batch=job.MASK_BATCH
+            ):
                 color = tuple(colors[label])
-
-                # Filtrar colores casi blancos (fondo)
-                if sum(color) > 740:
-                    continue
-
-                # Crear máscara para este color
-                color_mask = full_labels == label
-                mask_arr = np.where(color_mask, 0, 255).astype(np.uint8)
-
                 mask = Image.fromarray(mask_arr, mode="L")
 
-                # Cerrar pequeños huecos
-                mask = mask.filter(ImageFilter.MinFilter(3))
-                mask = mask.filter(ImageFilter.MaxFilter(3))
-
-                # Suavizado
-                if blur_radius > 0:
-                    mask = mask.filter(ImageFilter.GaussianBlur(blur_radius))
-
                 t_bmp = f"{output_path}.layer{label}.bmp"
                 t_svg = f"{output_path}.layer{label}.svg"
 
-                mask.save(t_bmp)
-
-                subprocess.run(
+                temp_files.extend([t_bmp, t_svg])
+                traced = _trace_layer(
+                    mask,
+                    t_bmp,
+                    t_svg,
                     [
-                        "potrace",
-                        t_bmp,
-                        "-s",
-                        "-o",
-                        t_svg,
-                        "--flat",
                         "--turdsize",
                         str(turdsize),
                         "--alphamax",
@@ -170,48 +237,34 @@ def generate_color_svg(
                         "--opttolerance",
                         "0.2",
                     ],
-                    check=True,
-                    capture_output=True,
+                    trace_cache,
+                    int(label),
                 )
-
-                with open(t_svg, "r", encoding="utf-8") as f:
-                    content = f.read()
-
-                path_match = re.search(r'<path d="([^"]+)"', content)
-                transform_match = re.search(r'<g transform="([^"]+)"', content)
-
-                if path_match:
-                    d = path_match.group(1)
-                    transform = transform_match.group(1) if transform_match else ""
+                if traced:
+                    d, transform = traced
                     hex_color = f"#{color[0]:02x}{color[1]:02x}{color[2]:02x}"
-                    svg_layers.append(
-                        f'<g transform="{transform}">'
-                        f'<path d="{d}" fill="{hex_color}" stroke="none" />'
-                        "</g>"
-                    )
-
-                os.remove(t_bmp)
-                os.remove(t_svg)
+                    svg_layers.append((d, hex_color, transform))
 
         # --- Guardar SVG final ---
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write('<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n')
-            f.write(
-                f'<svg version="1.1" xmlns="http://www.w3.org/2000/svg" '
-                f'width="{width}" height="{height}" '
-                f'viewBox="0 0 {width} {height}">\n'
-            )
-            for layer in svg_layers:
-                f.write(f"  {layer}\n")
-            f.write("</svg>\n")
+        writer = SvgWriter(width, height, **writer_options(job))
+        for d, fill, transform in svg_layers:
+            writer.add_path(d, fill, transform)
+        writer.save(output_path)
 
         print(
-            f"🎨 SVG generado: {os.path.basename(output_path)} ({len(svg_layers)} capas)"
+            f"🎨 SVG generado: {os.path.basename(output_path)} "
+            f"({len(svg_layers)} capas, {writer.report()})"
         )
 
+    except StageTimeout:
+        raise
     except Exception as e:
-        print(f"❌ Error: {os.path.basename(input_path)}: {e}")
+        print(f"❌ Error: {source_name(input_path)}: {e}")
         traceback.print_exc()
+    finally:
+        for temp_file in temp_files:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
 
 
 # === EJEMPLO DE USO ===
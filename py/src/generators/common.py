@@ -0,0 +1,26 @@
+"""
+Utilidades compartidas por los generadores.
+"""
+
+import os
+
+from PIL import Image
+
+
+def open_rgba(source):
+    """
+    Devuelve `source` como imagen RGBA.
+    Acepta una ruta o una imagen PIL ya decodificada (así el pipeline puede
+    reutilizar la imagen en memoria sin volver a leer el PNG).
+    """
+    if isinstance(source, Image.Image):
+        return source if source.mode == "RGBA" else source.convert("RGBA")
+    return Image.open(source).convert("RGBA")
+
+
+def source_name(source):
+    """Nombre legible de `source` para los mensajes."""
+    if isinstance(source, Image.Image):
+        filename = getattr(source, "filename", "")
+        return os.path.basename(filename) if filename else "<memoria>"
+    return os.path.basename(source)
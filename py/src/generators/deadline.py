@@ -0,0 +1,97 @@
+"""
+Plazos de tiempo para los generadores.
+
+El planificador abre un plazo con `deadline(segundos)` alrededor de cada
+generador; los plazos anidados (imagen → etapa) se quedan con el más
+estricto. El plazo es por hilo, así que funciona igual en serie que en el
+pool de hilos del pipeline.
+
+- Potrace se lanza con `run_potrace`, que mata el subproceso al vencer el
+  plazo.
+- El trabajo en Python (bucles de capas) no se puede interrumpir desde
+  fuera: los generadores llaman a `check_deadline()` entre pasos.
+- KMeans tampoco, y un solo `fit` puede durar más que la etapa: su número
+  de iteraciones se limita a las que caben en el plazo
+  (`iterations_within`).
+- La inferencia y el PNG alpha no tienen plazo propio: su tiempo cuenta
+  para el de la imagen, pero no se cortan.
+
+Al vencer se lanza `StageTimeout`, que los generadores no deben tragarse.
+"""
+
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+class StageTimeout(Exception):
+    """Se agotó el tiempo de la etapa o de la imagen."""
+
+
+@contextmanager
+def deadline(seconds):
+    """
+    Limita a `seconds` el bloque (None o <= 0 = sin límite propio; sigue
+    valiendo el plazo exterior si lo hay).
+    """
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    outer = stack[-1] if stack else None
+    limit = time.monotonic() + seconds if seconds and seconds > 0 else None
+    if outer is not None and (limit is None or outer < limit):
+        limit = outer
+    stack.append(limit)
+    try:
+        yield
+    finally:
+        stack.pop()
+
+
+def remaining():
+    """Segundos que quedan del plazo actual (None = sin plazo)."""
+    stack = getattr(_local, "stack", None)
+    if not stack or stack[-1] is None:
+        return None
+    return stack[-1] - time.monotonic()
+
+
+def check_deadline():
+    """Lanza StageTimeout si el plazo actual ya venció."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise StageTimeout("plazo agotado")
+
+
+def iterations_within(seconds_per_iteration, limit, reserve=0):
+    """
+    Iteraciones de `seconds_per_iteration` segundos que caben en lo que
+    queda del plazo, descontando `reserve` iteraciones de trabajo fijo, con
+    `limit` como máximo (sin plazo, `limit`). Lanza StageTimeout si no cabe
+    ninguna.
+    """
+    left = remaining()
+    if left is None or seconds_per_iteration <= 0:
+        return limit
+    fits = int(left / seconds_per_iteration) - reserve
+    if fits < 1:
+        raise StageTimeout(f"no cabe ninguna iteración en {max(left, 0):.1f}s")
+    return min(limit, fits)
+
+
+def run_potrace(args):
+    """
+    Ejecuta potrace (`args` sin el nombre del programa) dentro del plazo
+    actual. Si vence, el subproceso se mata y se lanza StageTimeout.
+    """
+    check_deadline()
+    try:
+        return subprocess.run(
+            ["potrace", *args], check=True, capture_output=True, timeout=remaining()
+        )
+    except subprocess.TimeoutExpired as e:
+        # subprocess.run ya ha matado y recogido el proceso
+        raise StageTimeout(f"potrace superó el plazo ({e.timeout:.1f}s)") from e
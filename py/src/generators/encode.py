@@ -0,0 +1,89 @@
+"""
+Codificación configurable del PNG alpha y formatos alternativos.
+
+- "png":  PNG RGBA con nivel y estrategia de zlib configurables.
+- "png8": PNG con paleta (cuantizado a N colores con transparencia), útil
+          para logos con pocos colores.
+- "webp": WebP sin pérdidas con alpha.
+"""
+
+import os
+from io import BytesIO
+
+from PIL import Image
+
+from src import config
+from src.job_config import resolve_config
+
+# Estrategias de zlib (valor de `compress_type` en el plugin PNG de PIL)
+PNG_STRATEGIES = {
+    "default": 0,
+    "filtered": 1,
+    "huffman": 2,
+    "rle": 3,
+    "fixed": 4,
+}
+
+ALPHA_EXTENSIONS = {"png": ".png", "png8": ".png", "webp": ".webp"}
+
+
+def alpha_extension(fmt=config.ALPHA_FORMAT):
+    """Extensión del archivo alpha según el formato."""
+    if fmt not in ALPHA_EXTENSIONS:
+        raise ValueError(
+            f"Formato alpha desconocido: {fmt!r} (usa {', '.join(ALPHA_EXTENSIONS)})"
+        )
+    return ALPHA_EXTENSIONS[fmt]
+
+
+def encode_alpha(
+    img,
+    fmt=config.ALPHA_FORMAT,
+    compress_level=config.ALPHA_PNG_COMPRESS_LEVEL,
+    strategy=config.ALPHA_PNG_STRATEGY,
+    palette_colors=config.ALPHA_PALETTE_COLORS,
+    webp_method=config.ALPHA_WEBP_METHOD,
+):
+    """Codifica la imagen RGBA en memoria y devuelve los bytes."""
+    alpha_extension(fmt)
+    buffer = BytesIO()
+    if fmt == "webp":
+        img.save(buffer, "WEBP", lossless=True, quality=100, method=webp_method, exact=False)
+    else:
+        if fmt == "png8":
+            # FASTOCTREE es el único método de PIL que conserva el canal alpha
+            img = img.quantize(palette_colors, method=Image.Quantize.FASTOCTREE)
+        img.save(
+            buffer,
+            "PNG",
+            compress_level=compress_level,
+            compress_type=PNG_STRATEGIES[strategy],
+        )
+    return buffer.getvalue()
+
+
+def encode_options(job_config=None):
+    """Argumentos de encode_alpha según la configuración del trabajo."""
+    job = resolve_config(job_config)
+    return {
+        "fmt": job.ALPHA_FORMAT,
+        "compress_level": job.ALPHA_PNG_COMPRESS_LEVEL,
+        "strategy": job.ALPHA_PNG_STRATEGY,
+        "palette_colors": job.ALPHA_PALETTE_COLORS,
+        "webp_method": job.ALPHA_WEBP_METHOD,
+    }
+
+
+def write_atomic(path, data):
+    """Escritura atómica: un archivo a medias nunca parece una salida válida."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def save_alpha(img, output_path, job_config=None):
+    """Codifica y guarda la imagen alpha; devuelve los bytes escritos."""
+    data = encode_alpha(img, **encode_options(job_config))
+    write_atomic(output_path, data)
+    return len(data)
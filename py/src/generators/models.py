@@ -0,0 +1,52 @@
+"""
+Registro de modelos de IA y de sus variantes reducidas.
+
+La variante "fp32" es el modelo original que descarga rembg. Las variantes
+cuantizadas (p. ej. "int8") se generan con `python -m tools.quantize_models`
+y se guardan en la caché del proyecto; una variante está registrada cuando
+su archivo existe.
+"""
+
+import os
+
+from src import config
+
+SUPPORTED_MODELS = (
+    "isnet-general-use",
+    "isnet-anime",
+    "u2net",
+    "u2netp",
+    "silueta",
+)
+
+VARIANTS = ("fp32", "int8")
+
+
+def check_model(model_name, variant="fp32"):
+    """Valida el par modelo/variante."""
+    if model_name not in SUPPORTED_MODELS:
+        raise ValueError(
+            f"Modelo no soportado: {model_name!r} (usa {', '.join(SUPPORTED_MODELS)})"
+        )
+    if variant not in VARIANTS:
+        raise ValueError(f"Variante desconocida: {variant!r} (usa {', '.join(VARIANTS)})")
+
+
+def variant_path(model_name, variant):
+    """
+    Ruta del archivo ONNX de una variante reducida.
+    Devuelve None para "fp32", cuya descarga y ubicación gestiona rembg.
+    """
+    check_model(model_name, variant)
+    if variant == "fp32":
+        return None
+    return os.path.join(config.CACHE_DIR, "models", f"{model_name}.{variant}.onnx")
+
+
+def available_variants(model_name):
+    """Variantes utilizables de un modelo ("fp32" siempre lo está)."""
+    return [
+        variant
+        for variant in VARIANTS
+        if variant == "fp32" or os.path.exists(variant_path(model_name, variant))
+    ]
@@ -12,6 +12,12 @@ import numpy as np
 
 from PIL import Image, ImageFilter
 
+from src.job_config import resolve_config
+from .common import open_rgba
+from .deadline import StageTimeout, check_deadline, run_potrace
+from .masks import iter_label_masks
+from .svg import SvgWriter, writer_options
+
 
 def generate_grayscale_svg(
     input_path,
@@ -21,6 +27,7 @@ def generate_grayscale_svg(
     turdsize=8,  # Tamaño mínimo de detalles
     alphamax=1.0,  # Suavidad de curvas
     contrast_boost=1.2,  # Aumentar contraste (1.0-1.5)
+    job_config=None,  # Ajustes del trabajo (src/job_config.py)
 ):
     """
     Genera SVG con múltiples tonos de gris, creando efecto de profundidad y sombras.
@@ -36,11 +43,12 @@ def generate_grayscale_svg(
     if os.path.exists(output_path):
         return
 
+    job = resolve_config(job_config)
     temp_files = []
 
     try:
         # --- Cargar y preparar imagen ---
-        img = Image.open(input_path).convert("RGBA")
+        img = open_rgba(input_path)
         width, height = img.size
 
         # Crear fondo blanco y componer
@@ -67,36 +75,29 @@ def generate_grayscale_svg(
 
         svg_layers = []
 
-        # Procesar cada tono de gris (del más oscuro al más claro)
-        for i in range(num_tones):
-            min_val = tone_levels[i]
-            max_val = tone_levels[i + 1]
-
-            # Color de este tono (más oscuro = menor valor)
-            tone_value = int((min_val + max_val) / 2)
-
-            # Crear máscara para este rango tonal
-            # Los píxeles en este rango serán NEGROS (0), el resto BLANCOS (255)
-            mask_array = np.where(
-                (gray_array >= min_val) & (gray_array < max_val),
-                0,  # Negro = área a rellenar
-                255,  # Blanco = transparente
-            ).astype(np.uint8)
-
-            # Saltar tonos casi blancos (fondo)
-            if tone_value > 245:
-                continue
-
-            # Contar píxeles de este tono
-            pixel_count = np.sum(mask_array == 0)
-            if pixel_count < 50:  # Saltar tonos con muy pocos píxeles
-                continue
-
-            mask = Image.fromarray(mask_array, mode="L").convert("1")
-
-            # Limpiar ruido pequeño
-            mask = mask.filter(ImageFilter.MinFilter(3))
-            mask = mask.filter(ImageFilter.MaxFilter(3))
+        # Índice de tono de cada píxel: tone_levels[i] <= gris < tone_levels[i + 1]
+        # (el blanco puro, 255, queda fuera de todos los tonos)
+        tone_index = np.digitize(gray_array, tone_levels) - 1
+        pixel_counts = np.bincount(tone_index.ravel(), minlength=num_tones + 1)
+
+        # Color de cada tono (más oscuro = menor valor)
+        tone_values = [
+            int((tone_levels[i] + tone_levels[i + 1]) / 2) for i in range(num_tones)
+        ]
+
+        # Saltar tonos casi blancos (fondo) y tonos con muy pocos píxeles
+        tones = [
+            i
+            for i in range(num_tones)
+            if tone_values[i] <= 245 and pixel_counts[i] >= 50
+        ]
+
+        # Procesar cada tono de gris (del más oscuro al más claro).
+        # Los píxeles del tono quedan NEGROS (0), el resto BLANCOS (255), y se
+        # limpia el ruido pequeño de todos los tonos a la vez.
+        for i, mask_array in iter_label_masks(tone_index, tones, batch=job.MASK_BATCH):
+            tone_value = tone_values[i]
+            mask = Image.fromarray(mask_array >= 128)  # Modo "1"
 
             # Guardar máscara temporal
             temp_bmp = f"{output_path}.tone{i}.bmp"
@@ -106,9 +107,8 @@ def generate_grayscale_svg(
             mask.save(temp_bmp)
 
             # --- Ejecutar Potrace ---
-            subprocess.run(
+            run_potrace(
                 [
-                    "potrace",
                     temp_bmp,
                     "-s",
                     "-o",
@@ -120,9 +120,7 @@ def generate_grayscale_svg(
                     str(alphamax),
                     "--opttolerance",
                     "0.2",
-                ],
-                check=True,
-                capture_output=True,
+                ]
             )
 
             # --- Extraer paths del SVG ---
@@ -135,46 +133,33 @@ def generate_grayscale_svg(
             transform = transform_match.group(1) if transform_match else ""
 
             if paths:
-                # Color en escala de grises
-                hex_color = f"#{tone_value:02x}{tone_value:02x}{tone_value:02x}"
-
-                # Agregar todos los paths de este tono
-                for path_d in paths:
-                    svg_layers.append(
-                        {
-                            "tone": tone_value,
-                            "svg": f'<path d="{path_d}" fill="{hex_color}" stroke="none" />',
-                        }
-                    )
+                svg_layers.append({"tone": tone_value, "paths": paths, "transform": transform})
 
         # --- Ordenar capas de claro a oscuro (fondo primero) ---
         svg_layers.sort(key=lambda x: -x["tone"])
 
         # --- Generar SVG final ---
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write('<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n')
-            f.write('<svg version="1.1" xmlns="http://www.w3.org/2000/svg" ')
-            f.write(
-                f'width="{width}" height="{height}" viewBox="0 0 {width} {height}">\n'
-            )
-            f.write(f"  <desc>Generated with {num_tones} gray tones</desc>\n")
-
-            # Agrupar por tono si hay transform
-            if transform:
-                f.write(f'  <g transform="{transform}">\n')
-                for layer in svg_layers:
-                    f.write(f'    {layer["svg"]}\n')
-                f.write("  </g>\n")
-            else:
-                for layer in svg_layers:
-                    f.write(f'  {layer["svg"]}\n')
-
-            f.write("</svg>\n")
+        writer = SvgWriter(
+            width,
+            height,
+            description=f"Generated with {num_tones} gray tones",
+            **writer_options(job),
+        )
+        for layer in svg_layers:
+            # Color en escala de grises
+            tone = layer["tone"]
+            hex_color = f"#{tone:02x}{tone:02x}{tone:02x}"
+            for path_d in layer["paths"]:
+                writer.add_path(path_d, hex_color, layer["transform"])
+        writer.save(output_path)
 
         print(
-            f"🎨 SVG Grayscale OK: {os.path.basename(output_path)} ({len(svg_layers)} tonos)"
+            f"🎨 SVG Grayscale OK: {os.path.basename(output_path)} "
+            f"({len(svg_layers)} tonos, {writer.report()})"
         )
 
+    except StageTimeout:
+        raise
     except subprocess.CalledProcessError as e:
         print(f"\u274c Error Potrace: {e.stderr}")
         raise
@@ -195,6 +180,7 @@ def generate_halftone_svg(
     dot_size=3,  # Tamaño máximo del punto
     spacing=5,  # Distancia entre centros de puntos
     angle=45,  # Ángulo de la trama (ej. 15, 45, 75)
+    job_config=None,  # Ajustes del trabajo (src/job_config.py)
 ):
     """
     Genera SVG con efecto de medio tono (halftone) como impresión tradicional.
@@ -203,7 +189,7 @@ def generate_halftone_svg(
         return
 
     try:
-        img = Image.open(input_path).convert("RGBA")
+        img = open_rgba(input_path)
         width, height = img.size
         bg = Image.new("RGBA", img.size, (255, 255, 255, 255))
         composite = Image.alpha_composite(bg, img).convert("L")
@@ -220,6 +206,7 @@ def generate_halftone_svg(
         # La diagonal de la imagen asegura que no queden huecos blancos
         diagonal = int(math.sqrt(width**2 + height**2))
         for y in range(-diagonal, diagonal, spacing):
+            check_deadline()
             for x in range(-diagonal, diagonal, spacing):
 
                 # Rotamos las coordenadas del grid hacia atrás para muestrear la imagen
@@ -235,31 +222,27 @@ def generate_halftone_svg(
                     if radius > 0.5:
                         # Dibujamos el círculo en su posición original del grid rotado
                         # pero centrado en la imagen
-                        circles.append(
-                            f'<circle cx="{orig_x}" cy="{orig_y}" r="{radius:.2f}" fill="#000" />'
-                        )
-
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-            f.write(
-                f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" '
-                f'height="{height}" viewBox="0 0 {width} {height}">\n'
-            )
-            f.write('  <rect width="100%" height="100%" fill="white"/>\n')
-            for circle in circles:
-                f.write(f"  {circle}\n")
-            f.write("</svg>\n")
+                        circles.append((orig_x, orig_y, radius))
+
+        writer = SvgWriter(
+            width, height, background="white", **writer_options(job_config)
+        )
+        writer.add_circles(circles, "#000")
+        writer.save(output_path)
 
         print(
-            f"🎨 SVG Halftone OK: {os.path.basename(output_path)} ({len(circles)} puntos, {angle}º)"
+            f"🎨 SVG Halftone OK: {os.path.basename(output_path)} ({len(circles)} puntos, "
+            f"{angle}º, {writer.report()})"
         )
 
+    except StageTimeout:
+        raise
     except Exception as e:
         print(f"\u274c Error: {e}")
 
 
 def generate_lineart_svg(
-    input_path, output_path, threshold=140, turdsize=10, alphamax=1.0
+    input_path, output_path, threshold=140, turdsize=10, alphamax=1.0, job_config=None
 ):
     """
     Genera SVG con efecto de lineart como impresión tradicional.
@@ -268,8 +251,10 @@ def generate_lineart_svg(
         return
 
     temp_bmp = output_path + ".temp.bmp"
+    temp_svg = output_path + ".temp.svg"
     try:
-        img = Image.open(input_path).convert("RGBA")
+        img = open_rgba(input_path)
+        width, height = img.size
         bg = Image.new("RGBA", img.size, (255, 255, 255, 255))
         composite = Image.alpha_composite(bg, img).convert("L")
 
@@ -277,13 +262,12 @@ def generate_lineart_svg(
         mask = composite.point(lambda p: 0 if p < threshold else 255, "1")
         mask.save(temp_bmp)
 
-        subprocess.run(
+        run_potrace(
             [
-                "potrace",
                 temp_bmp,
                 "-s",
                 "-o",
-                output_path,
+                temp_svg,
                 "--flat",
                 "--turdsize",
                 str(turdsize),
@@ -291,17 +275,31 @@ def generate_lineart_svg(
                 str(alphamax),
                 "--opttolerance",
                 "0.2",
-            ],
-            check=True,
-            capture_output=True,
+            ]
         )
 
-        print(f"✏️ SVG Lineart OK: {os.path.basename(output_path)}")
+        with open(temp_svg, "r", encoding="utf-8") as f:
+            content = f.read()
+
+        transform_match = re.search(r'<g transform="([^"]+)"', content)
+        transform = transform_match.group(1) if transform_match else ""
+
+        writer = SvgWriter(width, height, **writer_options(job_config))
+        for path_d in re.findall(r'<path d="([^"]+)"', content):
+            writer.add_path(path_d, "#000000", transform)
+        writer.save(output_path)
+
+        print(
+            f"✏️ SVG Lineart OK: {os.path.basename(output_path)} ({writer.report()})"
+        )
+    except StageTimeout:
+        raise
     except Exception as e:
         print(f"\u274c Error generando Lineart SVG: {e}")
     finally:
-        if os.path.exists(temp_bmp):
-            os.remove(temp_bmp)
+        for temp_file in (temp_bmp, temp_svg):
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
 
 
 # === EJEMPLOS DE USO ===
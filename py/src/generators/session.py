@@ -0,0 +1,276 @@
+"""
+Creación y ajuste de sesiones de ONNX Runtime para el modelo de IA (rembg).
+
+Permite controlar los hilos por sesión, el modo de ejecución y el arena de
+memoria, y guarda en disco el modelo ya optimizado para que los arranques
+siguientes se salten la optimización del grafo.
+
+`get_session` mantiene un registro de sesiones por modelo y opciones: cada
+combinación se carga una sola vez por proceso y se comparte entre hilos
+(InferenceSession.run es seguro entre hilos). Cargas de claves distintas
+pueden ir en paralelo. El registro guarda como mucho ORT_MAX_SESSIONS
+sesiones: la menos usada se descarta.
+"""
+
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+try:
+    import onnxruntime as ort
+    from rembg.sessions import sessions_class
+except ImportError:
+    print("\n❌ Error: Faltan dependencias críticas.")
+    print("Por favor, ejecuta: pip install rembg onnxruntime\n")
+    raise
+
+from src import config
+from . import models
+
+EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+
+
+def build_session_options(
+    intra_op_threads=0,
+    inter_op_threads=0,
+    execution_mode="sequential",
+    enable_mem_arena=True,
+):
+    """
+    Construye las SessionOptions de ONNX Runtime.
+    Un valor de 0 hilos deja que ONNX Runtime elija.
+    """
+    if execution_mode not in EXECUTION_MODES:
+        raise ValueError(
+            f"Modo de ejecución desconocido: {execution_mode!r} "
+            f"(usa {', '.join(EXECUTION_MODES)})"
+        )
+
+    opts = ort.SessionOptions()
+    opts.intra_op_num_threads = int(intra_op_threads)
+    opts.inter_op_num_threads = int(inter_op_threads)
+    opts.execution_mode = EXECUTION_MODES[execution_mode]
+    opts.enable_cpu_mem_arena = bool(enable_mem_arena)
+    return opts
+
+
+def source_model_path(model_name, variant="fp32"):
+    """
+    Archivo ONNX del que parte la sesión: la variante reducida o el modelo
+    original en la carpeta de descargas de rembg (puede no existir aún).
+    """
+    source = models.variant_path(model_name, variant)
+    if source is not None:
+        return source
+    session_class = rembg_session_class(model_name)
+    fname = f"{model_name}.onnx"
+    if hasattr(session_class, "resolve_existing"):
+        existing = session_class.resolve_existing(fname)
+        if existing is not None:
+            return existing
+    # rembg reciente: una carpeta por modelo; versiones anteriores, ~/.u2net
+    folder = getattr(session_class, "model_dir", session_class.u2net_home)()
+    return os.path.join(folder, fname)
+
+
+def _source_stamp(source):
+    """Huella (tamaño y mtime) del modelo de origen, o None si no existe."""
+    try:
+        stat = os.stat(source)
+    except OSError:
+        return None
+    digest = hashlib.blake2b(f"{stat.st_size}:{stat.st_mtime_ns}".encode(), digest_size=4)
+    return digest.hexdigest()
+
+
+def default_intra_op_threads(inference_processes=1):
+    """Hilos por sesión para que `inference_processes` sesiones quepan en los núcleos."""
+    return max(1, (os.cpu_count() or 1) // max(1, inference_processes))
+
+
+def optimized_model_path(
+    model_name, variant="fp32", providers=config.ORT_PROVIDERS, source=None
+):
+    """
+    Ruta del modelo optimizado en caché. Incluye la versión de ONNX Runtime y
+    los providers porque el grafo optimizado depende de ambos, y la huella
+    del modelo de origen para no cargar un grafo de un modelo ya regenerado
+    (p. ej. tras tools.quantize_models). None si el origen aún no existe.
+    """
+    stamp = _source_stamp(source or source_model_path(model_name, variant))
+    if stamp is None:
+        return None
+    provider_tag = "-".join(p.replace("ExecutionProvider", "").lower() for p in providers)
+    return os.path.join(
+        config.CACHE_DIR,
+        "ort",
+        f"{model_name}.{variant}.ort{ort.__version__}.{provider_tag}.{stamp}.opt.onnx",
+    )
+
+
+def rembg_session_class(model_name):
+    """Clase de sesión de rembg para `model_name` (ValueError si no existe)."""
+    for session_class in sessions_class:
+        if session_class.name() == model_name:
+            return session_class
+    raise ValueError(f"Modelo de IA no soportado por rembg: {model_name!r}")
+
+
+def _wrap_session(session_class, model_name, inner_session, providers):
+    # rembg solo necesita `model_name` e `inner_session` para predecir;
+    # se evita __init__ porque cargaría (y optimizaría) el modelo original.
+    session = session_class.__new__(session_class)
+    session.model_name = model_name
+    session.providers = list(providers)
+    session.inner_session = inner_session
+    return session
+
+
+def create_ai_session(
+    model_name=config.AI_MODEL,
+    variant=config.AI_MODEL_VARIANT,
+    intra_op_threads=config.ORT_INTRA_OP_THREADS,
+    inter_op_threads=config.ORT_INTER_OP_THREADS,
+    execution_mode=config.ORT_EXECUTION_MODE,
+    enable_mem_arena=config.ORT_ENABLE_MEM_ARENA,
+    providers=config.ORT_PROVIDERS,
+    cache_optimized=config.ORT_CACHE_OPTIMIZED,
+):
+    """
+    Crea una sesión de rembg con las opciones de ONNX Runtime indicadas.
+
+    - Sin caché: se carga el modelo y ONNX Runtime lo optimiza.
+    - Primera vez con caché: además se guarda el grafo optimizado en disco.
+    - Con caché existente: se carga el grafo optimizado sin volver a optimizarlo.
+
+    `variant` elige entre el modelo original ("fp32") y una variante reducida
+    generada con tools.quantize_models (p. ej. "int8").
+    """
+    models.check_model(model_name, variant)
+    session_class = rembg_session_class(model_name)
+    opts = build_session_options(
+        intra_op_threads or default_intra_op_threads(),
+        inter_op_threads,
+        execution_mode,
+        enable_mem_arena,
+    )
+
+    cache_path = optimized_model_path(model_name, variant, providers)
+    if cache_optimized and cache_path is not None and os.path.exists(cache_path):
+        # El grafo ya está optimizado: no repetir el trabajo al arrancar.
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        inner = ort.InferenceSession(
+            cache_path, sess_options=opts, providers=list(providers)
+        )
+        return _wrap_session(session_class, model_name, inner, providers)
+
+    # Sin modelo de origen todavía (rembg lo descarga al crear la sesión),
+    # la ruta definitiva se calcula después de cargarlo. Un nombre por carga:
+    # sesiones que solo difieren en los hilos pueden cargarse a la vez
+    tmp_path = os.path.join(
+        config.CACHE_DIR, "ort", f"{model_name}.{variant}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    )
+    if cache_optimized:
+        # EXTENDED y no ALL: las optimizaciones de layout de ALL no siempre
+        # se pueden serializar.
+        os.makedirs(os.path.dirname(tmp_path), exist_ok=True)
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+        opts.optimized_model_filepath = tmp_path
+
+    source = models.variant_path(model_name, variant)
+    if source is None:
+        # Modelo original: rembg se encarga de descargarlo y cargarlo
+        session = session_class(model_name, opts, providers=list(providers))
+    else:
+        if not os.path.exists(source):
+            raise FileNotFoundError(
+                f"No existe la variante {variant} de {model_name} ({source}). "
+                "Genérala con: python -m tools.quantize_models"
+            )
+        inner = ort.InferenceSession(source, sess_options=opts, providers=list(providers))
+        session = _wrap_session(session_class, model_name, inner, providers)
+
+    if cache_optimized and os.path.exists(tmp_path):
+        cache_path = cache_path or optimized_model_path(model_name, variant, providers)
+        if cache_path is None:
+            os.remove(tmp_path)
+        else:
+            # Renombrado atómico: varios procesos pueden crear la caché a la vez.
+            os.replace(tmp_path, cache_path)
+    return session
+
+
+# ----------------------------
+# Registro de sesiones
+# ----------------------------
+
+_SESSIONS = OrderedDict()  # clave (argumentos de create_ai_session) -> sesión, LRU
+_LOAD_LOCKS = {}  # clave -> Lock: una sola carga por clave
+_REGISTRY_LOCK = threading.Lock()
+
+
+def session_options(job):
+    """Argumentos de create_ai_session según un JobConfig."""
+    return {
+        "model_name": job.AI_MODEL,
+        "variant": job.AI_MODEL_VARIANT,
+        "intra_op_threads": job.ORT_INTRA_OP_THREADS,
+        "inter_op_threads": job.ORT_INTER_OP_THREADS,
+        "execution_mode": job.ORT_EXECUTION_MODE,
+        "enable_mem_arena": job.ORT_ENABLE_MEM_ARENA,
+        "providers": job.ORT_PROVIDERS,
+        "cache_optimized": job.ORT_CACHE_OPTIMIZED,
+    }
+
+
+def _session_key(options):
+    key = dict(options)
+    key["providers"] = tuple(key["providers"])
+    return tuple(sorted(key.items()))
+
+
+def _lookup(key):
+    """Sesión registrada para `key` (marcada como recién usada), o None."""
+    session = _SESSIONS.get(key)
+    if session is not None:
+        _SESSIONS.move_to_end(key)
+    return session
+
+
+def cached_session(**options):
+    """La sesión ya cargada para `options` (ver session_options), o None."""
+    with _REGISTRY_LOCK:
+        return _lookup(_session_key(options))
+
+
+def get_session(**options):
+    """
+    Sesión compartida para `options` (los argumentos de create_ai_session).
+    La crea la primera vez; si falla, la excepción llega al llamador y la
+    siguiente petición lo vuelve a intentar. Con más de ORT_MAX_SESSIONS
+    cargadas, el registro olvida la menos usada (se libera cuando nadie más
+    la use).
+    """
+    key = _session_key(options)
+    with _REGISTRY_LOCK:
+        session = _lookup(key)
+        if session is not None:
+            return session
+        load_lock = _LOAD_LOCKS.setdefault(key, threading.Lock())
+
+    with load_lock:
+        with _REGISTRY_LOCK:
+            session = _lookup(key)
+        if session is None:
+            session = create_ai_session(**dict(key))
+            with _REGISTRY_LOCK:
+                _SESSIONS[key] = session
+                while len(_SESSIONS) > max(1, config.ORT_MAX_SESSIONS):
+                    evicted, _ = _SESSIONS.popitem(last=False)
+                    _LOAD_LOCKS.pop(evicted, None)
+    return session
@@ -0,0 +1,210 @@
+"""
+Simplificación de paths tras potrace.
+
+Reduce el número de nodos de los subpaths absolutos que produce
+`svg.parse_path`:
+
+1. Elimina segmentos sub-píxel (todos sus puntos a menos de `min_segment`
+   del punto actual).
+2. Une tramos consecutivos de rectas en una sola recta y de curvas en una
+   sola cúbica (ajuste por mínimos cuadrados conservando las tangentes de
+   los extremos).
+
+Cada unión solo se acepta si la distancia máxima (en ambos sentidos) entre
+el trazado original y el nuevo es <= `tolerance` píxeles, medida sobre el
+trazado original muestreado. El redondeo posterior de coordenadas se
+descuenta de la tolerancia, así el total sigue acotado por `tolerance`.
+"""
+
+import numpy as np
+
+from src import config
+
+# Muestras por segmento para medir desviaciones
+_SAMPLES = 12
+# Segmentos originales como máximo en una unión (limita el coste del ajuste)
+_MAX_RUN = 16
+
+
+def count_nodes(subpaths):
+    """Nodos de un trazado: un punto inicial por subpath más un nodo por segmento."""
+    return sum(1 + len(sp["segments"]) for sp in subpaths)
+
+
+# ----------------------------
+# Geometría
+# ----------------------------
+
+
+def _segment_samples(start, kind, points):
+    t = np.linspace(0.0, 1.0, _SAMPLES)[:, None]
+    p0 = np.asarray(start, dtype=np.float64)
+    if kind == "L":
+        return p0 + t * (np.asarray(points, dtype=np.float64) - p0)
+    p1, p2, p3 = (np.asarray(points[k : k + 2], dtype=np.float64) for k in (0, 2, 4))
+    mt = 1.0 - t
+    return mt**3 * p0 + 3 * mt**2 * t * p1 + 3 * mt * t**2 * p2 + t**3 * p3
+
+
+def _point_polyline_distance(points, polyline):
+    """Distancia de cada punto a la polilínea (máximo de todos)."""
+    a = polyline[:-1]
+    ab = polyline[1:] - a
+    length2 = (ab**2).sum(axis=1)
+    length2[length2 == 0] = 1.0
+    ap = points[:, None, :] - a[None, :, :]
+    u = np.clip((ap * ab[None]).sum(axis=2) / length2[None], 0.0, 1.0)
+    closest = a[None] + u[..., None] * ab[None]
+    return np.sqrt(((points[:, None, :] - closest) ** 2).sum(axis=2)).min(axis=1).max()
+
+
+def _deviation(original, candidate):
+    """Distancia de Hausdorff aproximada entre dos trazados muestreados."""
+    if len(original) < 2 or len(candidate) < 2:
+        return 0.0
+    return max(
+        _point_polyline_distance(original, candidate),
+        _point_polyline_distance(candidate, original),
+    )
+
+
+def _unit(vector):
+    norm = np.hypot(*vector)
+    return vector / norm if norm > 1e-12 else None
+
+
+def _fit_cubic(samples, start, end, tangent_start, tangent_end):
+    """
+    Cúbica de `start` a `end` con las tangentes dadas que mejor aproxima
+    `samples` (método de Schneider, parametrización por longitud de cuerda).
+    """
+    chord = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(samples, axis=0).T))))
+    if chord[-1] <= 0:
+        return None
+    u = (chord / chord[-1])[:, None]
+    mu = 1.0 - u
+    a1 = tangent_start[None] * (3 * mu**2 * u)
+    a2 = tangent_end[None] * (3 * mu * u**2)
+    base = (mu**3 + 3 * mu**2 * u) * start + (3 * mu * u**2 + u**3) * end
+    rest = samples - base
+
+    c00 = (a1 * a1).sum()
+    c01 = (a1 * a2).sum()
+    c11 = (a2 * a2).sum()
+    x0 = (a1 * rest).sum()
+    x1 = (a2 * rest).sum()
+    det = c00 * c11 - c01 * c01
+
+    span = np.hypot(*(end - start))
+    if abs(det) > 1e-12:
+        alpha1 = (x0 * c11 - x1 * c01) / det
+        alpha2 = (c00 * x1 - c01 * x0) / det
+    else:
+        alpha1 = alpha2 = span / 3.0
+    if alpha1 < 1e-6 * span or alpha2 < 1e-6 * span:
+        alpha1 = alpha2 = span / 3.0
+
+    c1 = start + alpha1 * tangent_start
+    c2 = end + alpha2 * tangent_end
+    return (c1[0], c1[1], c2[0], c2[1], end[0], end[1])
+
+
+def _merge(start, kind, run, samples, tolerance):
+    """Intenta sustituir `run` (mismo tipo) por un único segmento."""
+    end = np.asarray(run[-1][-2:], dtype=np.float64)
+    p0 = np.asarray(start, dtype=np.float64)
+    if kind == "L":
+        points = (end[0], end[1])
+    else:
+        tangent_start = _unit(np.asarray(run[0][0:2]) - p0)
+        if tangent_start is None:
+            tangent_start = _unit(np.asarray(run[0][2:4]) - p0)
+        tangent_end = _unit(np.asarray(run[-1][2:4]) - end)
+        if tangent_end is None:
+            tangent_end = _unit(np.asarray(run[-1][0:2]) - end)
+        if tangent_start is None or tangent_end is None:
+            return None
+        points = _fit_cubic(samples, p0, end, tangent_start, tangent_end)
+        if points is None:
+            return None
+
+    if _deviation(samples, _segment_samples(start, kind, points)) > tolerance:
+        return None
+    return points
+
+
+# ----------------------------
+# Simplificación
+# ----------------------------
+
+
+def _drop_subpixel(sp, min_segment):
+    """
+    Quita los segmentos cuyos puntos quedan todos a menos de `min_segment`
+    del punto actual. Devuelve [(tipo, puntos, muestras_originales)].
+    Las muestras describen siempre el trazado original: cada segmento se
+    muestrea desde su extremo anterior real (`prev_end`), aunque el
+    anterior se haya eliminado y el punto actual (`current`) sea otro.
+    """
+    result = []
+    current = sp["start"]
+    prev_end = sp["start"]
+    pending = []  # muestras de segmentos eliminados, se heredan
+    for kind, points in sp["segments"]:
+        samples = _segment_samples(prev_end, kind, points)
+        prev_end = points[-2:]
+        if min_segment > 0 and np.hypot(*(samples - np.asarray(current)).T).max() < min_segment:
+            pending.append(samples)
+            continue
+        if pending:
+            samples = np.vstack(pending + [samples])
+            pending = []
+        result.append((kind, points, samples))
+        current = points[-2:]
+    if pending and result:
+        kind, points, samples = result[-1]
+        result[-1] = (kind, points, np.vstack([samples] + pending))
+    return result
+
+
+def simplify_subpaths(
+    subpaths,
+    tolerance=config.SVG_SIMPLIFY_TOLERANCE,
+    precision=config.SVG_PRECISION,
+    min_segment=config.SVG_MIN_SEGMENT,
+):
+    """
+    Simplifica subpaths absolutos manteniendo la desviación máxima respecto
+    al original por debajo de `tolerance` píxeles (incluido el redondeo a
+    `precision` decimales que hará el escritor).
+    """
+    # El redondeo de cada coordenada puede mover un punto hasta medio paso en x e y
+    budget = tolerance - 0.5 * 10 ** (-max(precision, 0)) * np.sqrt(2)
+    if budget <= 0:
+        return subpaths
+
+    result = []
+    for sp in subpaths:
+        items = _drop_subpixel(sp, min(min_segment, budget))
+        segments = []
+        current = sp["start"]
+        i = 0
+        while i < len(items):
+            kind, points, samples = items[i]
+            j = i + 1
+            # Extender la unión mientras los segmentos sean del mismo tipo
+            while j < len(items) and items[j][0] == kind and j - i < _MAX_RUN:
+                run = [item[1] for item in items[i : j + 1]]
+                run_samples = np.vstack([item[2] for item in items[i : j + 1]])
+                merged = _merge(current, kind, run, run_samples, budget)
+                if merged is None:
+                    break
+                points = merged
+                j += 1
+            segments.append((kind, tuple(float(v) for v in points)))
+            current = points[-2:]
+            i = j
+
+        if segments or not sp["closed"]:
+            result.append({"start": sp["start"], "segments": segments, "closed": sp["closed"]})
+    return result
@@ -0,0 +1,436 @@
+"""
+Escritura compacta de SVG compartida por los generadores.
+
+- Agrupa todos los paths del mismo color de relleno en un único <path>.
+- Aplica la transformación de potrace directamente a las coordenadas, de
+  modo que no hace falta ningún <g transform=...>.
+- Redondea las coordenadas a `precision` decimales (en píxeles).
+- Simplifica los paths con una desviación máxima acotada (ver simplify.py).
+- Guarda comprimido con gzip cuando el destino termina en ".svgz".
+- Informa de los bytes antes (formato anterior) y después.
+"""
+
+import gzip
+import re
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from src import config
+from src.job_config import resolve_config
+from .encode import write_atomic
+from .simplify import count_nodes, simplify_subpaths
+
+PATH_TOKEN = re.compile(r"[A-Za-z]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_ARITY = {"M": 2, "L": 2, "H": 1, "V": 1, "C": 6, "Z": 0}
+_TRANSFORM = re.compile(
+    r"^\s*translate\(\s*([-+\d.eE]+)[\s,]+([-+\d.eE]+)\s*\)"
+    r"\s*scale\(\s*([-+\d.eE]+)(?:[\s,]+([-+\d.eE]+))?\s*\)\s*$"
+)
+
+
+# ----------------------------
+# Datos de path
+# ----------------------------
+
+
+def parse_path(d):
+    """
+    Convierte el atributo `d` en una lista de subpaths con coordenadas
+    absolutas: {"start": (x, y), "segments": [...], "closed": bool}.
+    Cada segmento es ("L", (x, y)) o ("C", (x1, y1, x2, y2, x, y)).
+    Soporta M, L, H, V, C y Z (lo que emite potrace); otro comando lanza
+    ValueError.
+    """
+    if PATH_TOKEN.sub("", d).strip(" \t\r\n,"):
+        raise ValueError("Caracteres no reconocidos en el path")
+
+    tokens = PATH_TOKEN.findall(d)
+    subpaths = []
+    current = None
+    x = y = 0.0
+    cmd = None
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token.isalpha():
+            if token.upper() not in _ARITY:
+                raise ValueError(f"Comando de path no soportado: {token}")
+            cmd = token
+            i += 1
+            if cmd in "Zz":
+                if current is not None:
+                    current["closed"] = True
+                    x, y = current["start"]
+                current = None
+                continue
+        elif cmd is None:
+            raise ValueError("El path no empieza por un comando")
+
+        upper = cmd.upper()
+        arity = _ARITY[upper]
+        args = tokens[i : i + arity]
+        if len(args) < arity or any(a.isalpha() for a in args):
+            raise ValueError(f"Faltan argumentos para '{cmd}'")
+        values = [float(a) for a in args]
+        i += arity
+        relative = cmd.islower()
+
+        if upper == "M":
+            x, y = (x + values[0], y + values[1]) if relative else values
+            current = {"start": (x, y), "segments": [], "closed": False}
+            subpaths.append(current)
+            # Los pares que siguen a un moveto son lineto implícitos
+            cmd = "l" if relative else "L"
+            continue
+
+        if current is None:
+            # Dibujar tras un cierre empieza un subpath en el punto actual
+            current = {"start": (x, y), "segments": [], "closed": False}
+            subpaths.append(current)
+
+        if upper == "C":
+            if relative:
+                values = [v + (x if k % 2 == 0 else y) for k, v in enumerate(values)]
+            current["segments"].append(("C", tuple(values)))
+            x, y = values[4], values[5]
+        else:
+            if upper == "L":
+                nx, ny = (x + values[0], y + values[1]) if relative else values
+            elif upper == "H":
+                nx, ny = (x + values[0] if relative else values[0]), y
+            else:
+                nx, ny = x, (y + values[0] if relative else values[0])
+            current["segments"].append(("L", (nx, ny)))
+            x, y = nx, ny
+
+    return subpaths
+
+
+def transform_subpaths(subpaths, transform):
+    """Aplica una transformación (sx, sy, tx, ty) a las coordenadas."""
+    sx, sy, tx, ty = transform
+
+    def apply(points):
+        return tuple(
+            (tx + sx * v) if k % 2 == 0 else (ty + sy * v) for k, v in enumerate(points)
+        )
+
+    return [
+        {
+            "start": apply(sp["start"]),
+            "segments": [(kind, apply(points)) for kind, points in sp["segments"]],
+            "closed": sp["closed"],
+        }
+        for sp in subpaths
+    ]
+
+
+def parse_transform(transform):
+    """
+    Interpreta el "translate(tx,ty) scale(sx[,sy])" que emite potrace.
+    Devuelve (sx, sy, tx, ty) o None si no tiene esa forma.
+    """
+    if not transform:
+        return (1.0, 1.0, 0.0, 0.0)
+    match = _TRANSFORM.match(transform)
+    if not match:
+        return None
+    tx, ty, sx, sy = match.groups()
+    sx = float(sx)
+    return (sx, float(sy) if sy is not None else sx, float(tx), float(ty))
+
+
+def format_number(value, precision):
+    """Entero en unidades de 10^-precision → texto SVG más corto."""
+    if precision <= 0:
+        return str(value)
+    sign = "-" if value < 0 else ""
+    integer, fraction = divmod(abs(value), 10**precision)
+    if fraction == 0:
+        return f"{sign}{integer}"
+    digits = f"{fraction:0{precision}d}".rstrip("0")
+    return f"{sign}{integer or ''}.{digits}"
+
+
+def _join(numbers, precision):
+    text = ""
+    for n in numbers:
+        item = format_number(n, precision)
+        text += item if not text or item[0] == "-" else f" {item}"
+    return text
+
+
+def format_path(subpaths, precision=config.SVG_PRECISION):
+    """
+    Serializa subpaths absolutos como `d` compacto: coordenadas redondeadas
+    y comandos relativos calculados sobre los valores ya redondeados, así
+    el redondeo no acumula error a lo largo del path.
+    """
+    scale = 10 ** max(precision, 0)
+    parts = []
+    px = py = 0
+    for sp in subpaths:
+        sx, sy = (int(round(v * scale)) for v in sp["start"])
+        parts.append(("m" if parts else "M") + _join(
+            [sx - px, sy - py] if parts else [sx, sy], precision
+        ))
+        px, py = sx, sy
+        last = None
+        for kind, points in sp["segments"]:
+            q = [int(round(v * scale)) for v in points]
+            deltas = [v - (px if k % 2 == 0 else py) for k, v in enumerate(q)]
+            cmd = "l" if kind == "L" else "c"
+            text = _join(deltas, precision)
+            if cmd == last:
+                parts.append(text if text[0] == "-" else f" {text}")
+            else:
+                parts.append(cmd + text)
+            last = cmd
+            px, py = q[-2], q[-1]
+        if sp["closed"]:
+            parts.append("z")
+            px, py = sx, sy
+    return "".join(parts)
+
+
+# ----------------------------
+# Documento
+# ----------------------------
+
+
+class SvgWriter:
+    """
+    Acumula capas de relleno y escribe el documento SVG final.
+
+        writer = SvgWriter(width, height)
+        writer.add_path(d, "#000000", transform)
+        writer.save(output_path)
+    """
+
+    def __init__(
+        self,
+        width,
+        height,
+        precision=config.SVG_PRECISION,
+        simplify=config.SVG_SIMPLIFY_TOLERANCE,
+        description=None,
+        background=None,
+        min_segment=config.SVG_MIN_SEGMENT,
+    ):
+        self.width = width
+        self.height = height
+        self.precision = precision
+        self.simplify = simplify
+        self.min_segment = min_segment
+        self.description = description
+        self.background = background
+        # Elementos en orden de inserción: [relleno, fragmentos de `d`] o
+        # [None, elemento sin compactar]. Solo se fusionan en un mismo path
+        # los fragmentos consecutivos del mismo relleno, para no cambiar el
+        # orden de pintado.
+        self.elements = []
+        self.bytes_before = 0  # tamaño equivalente en el formato anterior
+        self.bytes_after = 0
+        self.nodes_before = 0
+        self.nodes_after = 0
+
+    def add_path(self, d, fill, transform=""):
+        """Añade un path de potrace (con su transform) al color `fill`."""
+        self.bytes_before += len(
+            f'  <g transform="{transform}"><path d="{d}" fill="{fill}" stroke="none" /></g>\n'
+        )
+        matrix = parse_transform(transform)
+        try:
+            if matrix is None:
+                raise ValueError(f"Transform no soportado: {transform}")
+            subpaths = transform_subpaths(parse_path(d), matrix)
+        except ValueError:
+            group = f'<g transform="{transform}">' if transform else "<g>"
+            self.elements.append([None, f'{group}<path d="{d}" fill="{fill}"/></g>'])
+            return
+        self.add_subpaths(subpaths, fill)
+
+    def add_subpaths(self, subpaths, fill):
+        """Añade subpaths absolutos (en píxeles) al color `fill`."""
+        self.nodes_before += count_nodes(subpaths)
+        if self.simplify > 0:
+            subpaths = simplify_subpaths(
+                subpaths, self.simplify, self.precision, self.min_segment
+            )
+        self.nodes_after += count_nodes(subpaths)
+        if subpaths:
+            self._add_fragment(fill, format_path(subpaths, self.precision))
+
+    def add_circles(self, circles, fill):
+        """
+        Añade círculos (cx, cy, r) como un único path de arcos: un elemento
+        en vez de uno por punto, mucho más barato de parsear.
+        """
+        scale = 10 ** max(self.precision, 0)
+        parts = []
+        px = py = 0
+        for cx, cy, r in circles:
+            self.bytes_before += len(
+                f'  <circle cx="{cx}" cy="{cy}" r="{r:.2f}" fill="{fill}" />\n'
+            )
+            qr = int(round(r * scale))
+            sx, sy = int(round(cx * scale)) - qr, int(round(cy * scale))
+            rr = _join([qr, qr], self.precision)
+            move = _join([sx - px, sy - py], self.precision)
+            diameter = format_number(2 * qr, self.precision)
+            parts.append(
+                f"{'m' if parts else 'M'}{move}"
+                f"a{rr} 0 1 0 {diameter} 0a{rr} 0 1 0-{diameter} 0"
+            )
+            px, py = sx, sy
+        if parts:
+            self._add_fragment(fill, "".join(parts))
+
+    def _add_fragment(self, fill, fragment):
+        if self.elements and self.elements[-1][0] == fill:
+            self.elements[-1][1].append(fragment)
+        else:
+            self.elements.append([fill, [fragment]])
+
+    def render(self):
+        """Devuelve el documento SVG como texto."""
+        lines = [
+            '<?xml version="1.0" encoding="UTF-8" standalone="no"?>',
+            f'<svg version="1.1" xmlns="http://www.w3.org/2000/svg" '
+            f'width="{self.width}" height="{self.height}" '
+            f'viewBox="0 0 {self.width} {self.height}">',
+        ]
+        if self.description:
+            lines.append(f"<desc>{self.description}</desc>")
+        if self.background:
+            lines.append(f'<rect width="100%" height="100%" fill="{self.background}"/>')
+        for fill, content in self.elements:
+            if fill is None:
+                lines.append(content)
+            else:
+                # Cada fragmento empieza por un moveto absoluto: se pueden concatenar
+                lines.append(f'<path fill="{fill}" d="{"".join(content)}"/>')
+        lines.append("</svg>")
+        return "\n".join(lines) + "\n"
+
+    def save(self, output_path):
+        """
+        Escribe el SVG (gzip si la ruta termina en ".svgz").
+        Devuelve (bytes_antes, bytes_despues).
+        """
+        data = self.render().encode("utf-8")
+        if output_path.lower().endswith(".svgz"):
+            data = gzip.compress(data, compresslevel=9, mtime=0)
+        write_atomic(output_path, data)
+        self.bytes_after = len(data)
+        return self.bytes_before, self.bytes_after
+
+    def report(self):
+        """Resumen de bytes (y nodos, si hay paths) antes y después."""
+        text = size_report(self.bytes_before, self.bytes_after)
+        if self.nodes_before:
+            text += f", nodos {self.nodes_before} → {self.nodes_after}"
+        return text
+
+
+def size_report(before, after):
+    """Texto breve con la reducción de tamaño."""
+    saved = 100.0 * (1 - after / before) if before else 0.0
+    return f"{before / 1024:.1f} KB → {after / 1024:.1f} KB (-{saved:.0f}%)"
+
+
+def writer_options(job_config=None):
+    """Argumentos de SvgWriter según la configuración del trabajo."""
+    job = resolve_config(job_config)
+    return {
+        "precision": job.SVG_PRECISION,
+        "simplify": job.SVG_SIMPLIFY_TOLERANCE,
+        "min_segment": job.SVG_MIN_SEGMENT,
+    }
+
+
+def svg_extension(job_config=None):
+    """Extensión de las salidas vectoriales según SVG_COMPRESS."""
+    return ".svgz" if resolve_config(job_config).SVG_COMPRESS else ".svg"
+
+
+# ----------------------------
+# Vista previa
+# ----------------------------
+
+# SVG_ATTR, SVG_SIZE, parse_color y path_polygons (y PATH_TOKEN) también
+# los usa tools/bench_ports.py para rasterizar las salidas de los dos ports
+_ELEMENT = re.compile(r"<(rect|path)\b([^>]*)/?>")
+SVG_ATTR = re.compile(r'([\w:-]+)="([^"]*)"')
+SVG_SIZE = re.compile(r'<svg\b[^>]*\bwidth="([\d.]+)"[^>]*\bheight="([\d.]+)"')
+_NAMED_COLORS = {"white": (255, 255, 255), "black": (0, 0, 0)}
+
+
+def parse_color(fill):
+    """Color (r, g, b) de un atributo fill: #rgb, #rrggbb, white o black; si no, None."""
+    if fill in _NAMED_COLORS:
+        return _NAMED_COLORS[fill]
+    if fill.startswith("#") and len(fill) in (4, 7):
+        digits = fill[1:] if len(fill) == 7 else "".join(c * 2 for c in fill[1:])
+        return tuple(int(digits[k : k + 2], 16) for k in (0, 2, 4))
+    return None
+
+
+def path_polygons(subpaths, scale, steps=8):
+    """Aplana los subpaths (rectas y cúbicas) a polígonos en coordenadas fijas (x16)."""
+    t = np.linspace(0.0, 1.0, steps + 1)[1:, None]
+    polygons = []
+    for sp in subpaths:
+        points = [np.asarray([sp["start"]], dtype=np.float64)]
+        current = np.asarray(sp["start"], dtype=np.float64)
+        for kind, values in sp["segments"]:
+            if kind == "L":
+                end = np.asarray(values, dtype=np.float64)
+                points.append(end[None])
+            else:
+                p1, p2, end = (np.asarray(values[k : k + 2], dtype=np.float64) for k in (0, 2, 4))
+                mt = 1.0 - t
+                points.append(
+                    mt**3 * current + 3 * mt**2 * t * p1 + 3 * mt * t**2 * p2 + t**3 * end
+                )
+            current = end
+        polygon = np.vstack(points) * scale * 16
+        if len(polygon) >= 3:
+            polygons.append(np.round(polygon).astype(np.int32))
+    return polygons
+
+
+def rasterize_svg(path, max_side=None):
+    """
+    Dibujo aproximado de un SVG escrito por SvgWriter, como imagen RGBA,
+    para vistas previas (sin dependencias de renderizado SVG). Soporta el
+    fondo <rect> y los <path> de relleno; los arcos (halftone) y los
+    elementos sin compactar se omiten.
+    """
+    opener = gzip.open if path.lower().endswith(".svgz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        text = f.read()
+
+    size = SVG_SIZE.search(text)
+    width, height = (float(size.group(1)), float(size.group(2))) if size else (512.0, 512.0)
+    scale = min(1.0, max_side / max(width, height)) if max_side else 1.0
+    canvas = np.zeros((max(1, round(height * scale)), max(1, round(width * scale)), 4), np.uint8)
+
+    for tag, attrs in _ELEMENT.findall(text):
+        attrs = dict(SVG_ATTR.findall(attrs))
+        color = parse_color(attrs.get("fill", "#000000"))
+        if color is None:
+            continue
+        if tag == "rect":
+            canvas[:] = (*color, 255)
+            continue
+        try:
+            polygons = path_polygons(parse_path(attrs.get("d", "")), scale)
+        except ValueError:
+            continue
+        if polygons:
+            # Con varios contornos, fillPoly respeta los huecos
+            cv2.fillPoly(canvas, polygons, (*color, 255), lineType=cv2.LINE_AA, shift=4)
+    return Image.fromarray(canvas, mode="RGBA")
@@ -1,23 +1,74 @@
 """
 Generates high-quality thumbnails from the processed alpha PNG.
+
+All sizes come from a single decode: the image is box-reduced progressively
+(cheap integer reduce) to about twice each target width and only the last
+step uses LANCZOS. Optionally a WebP with alpha is written next to each PNG.
 """
 
 import os
 from PIL import Image
-from src import config
+from src.job_config import resolve_config
+from .common import open_rgba, source_name
+
+
+def thumbnail_paths(output_path, widths=None, webp=None, job_config=None):
+    """
+    Output files per width. THUMB_WIDTH keeps `output_path` itself and is
+    always included, even if it is not in `widths`; the other widths get a
+    "_<width>" suffix. Returns {width: [paths]}.
+    `widths` and `webp` default to the job's THUMB_WIDTHS and THUMB_WEBP.
+    """
+    job = resolve_config(job_config)
+    widths = job.THUMB_WIDTHS if widths is None else widths
+    widths = dict.fromkeys((*widths, job.THUMB_WIDTH))
+    webp = job.THUMB_WEBP if webp is None else webp
+    root, ext = os.path.splitext(output_path)
+    paths = {}
+    for width in widths:
+        base = root if width == job.THUMB_WIDTH else f"{root}_{width}"
+        paths[width] = [base + ext] + ([base + ".webp"] if webp else [])
+    return paths
 
-def generate_thumbnail(input_path, output_path):
-    """Generates high-quality thumbnails from the processed alpha PNG."""
-    if os.path.exists(output_path):
+
+def generate_thumbnail(input_path, output_path, widths=None, webp=None, job_config=None):
+    """
+    Generates high-quality thumbnails from the processed alpha PNG.
+    Only the missing files are written; existing sizes are kept.
+    """
+    job = resolve_config(job_config)
+    paths = thumbnail_paths(output_path, widths, webp, job)
+    missing = {
+        width: [p for p in files if not os.path.exists(p)] for width, files in paths.items()
+    }
+    missing = {width: files for width, files in missing.items() if files}
+    if not missing:
         return
+    widths = list(paths)
 
     try:
-        img = Image.open(input_path)
         # Use the already clear alpha image
-        w_p = config.THUMB_WIDTH / float(img.size[0])
-        h_s = int((float(img.size[1]) * float(w_p)))
-        img = img.resize((config.THUMB_WIDTH, h_s), Image.Resampling.LANCZOS)
-        img.save(output_path)
-        print(f"🔹 Thumbnail OK: {os.path.basename(output_path)}")
+        current = open_rgba(input_path)
+        src_w, src_h = current.size
+
+        # Largest first: each size is reduced from the previous intermediate
+        # (down to the smallest missing size; larger ones only as steps)
+        for width in sorted(widths, reverse=True):
+            if width < min(missing):
+                break
+            height = max(1, int(src_h * width / float(src_w)))
+            factor = current.size[0] // (2 * width)
+            if factor >= 2:
+                current = current.reduce(factor)
+            if width not in missing:
+                continue
+            thumb = current.resize((width, height), Image.Resampling.LANCZOS)
+
+            for path in missing[width]:
+                if path.endswith(".webp"):
+                    thumb.save(path, "WEBP", quality=job.THUMB_WEBP_QUALITY, method=4)
+                else:
+                    thumb.save(path)
+            print(f"🔹 Thumbnail OK: {os.path.basename(paths[width][0])} ({width}px)")
     except Exception as e:
-        print(f"❌ Error generating thumbnail for {os.path.basename(input_path)}: {e}")
+        print(f"❌ Error generating thumbnail for {source_name(input_path)}: {e}")
@@ -4,12 +4,52 @@ Xxx
 """
 
 import os
+import queue
 import threading
+import time
 import traceback
 import shutil
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
 from tkinter import filedialog, messagebox, ttk
-from src import generators
+
+from PIL import Image, ImageTk
+
+from src import config, generators
+from src.admission import AdmissionController
+from src.generators.alpha import get_ai_session
+from src.job_config import JobConfig, resolve_config
+from src.pipeline import VECTOR_STAGES, output_paths, run_stage
+from src.planner import plan_vectors
+from src.preview import make_preview
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+# Texto de estado de cada etapa vectorial
+STAGE_LABELS = {
+    "gray": "SVG Grayscale",
+    "halftone": "SVG Halftone",
+    "lineart": "SVG Lineart",
+    "color_logo": "SVG Color (Logo)",
+    "color_illus": "SVG Color (Ilustración)",
+    "thumb": "Miniatura",
+}
+PREVIEW_BOX = 220  # Lado máximo de cada imagen de la vista previa
+
+
+class _Cancelled(Exception):
+    """El usuario canceló, o eligió otros archivos: el trabajo ya no interesa."""
+
+
+def list_images(folder):
+    """Imágenes de entrada de una carpeta, en orden."""
+    return sorted(
+        os.path.join(folder, f)
+        for f in os.listdir(folder)
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+        and ".temp." not in f
+        and ".vtrace_temp." not in f
+    )
 
 
 class ImageProcessorGUI:
@@ -20,16 +60,28 @@ class ImageProcessorGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Image to Vector & Alpha - Python Tool")
-        self.root.geometry("600x450")
+        self.root.geometry("680x860")
         self.root.resizable(False, False)
 
         # Variables
         self.input_file = tk.StringVar()
+        self.input_files = []  # Selección de varios archivos (o de una carpeta)
         self.output_dir = tk.StringVar()
         self.status_var = tk.StringVar(value="Ready. Please select a file.")
+        self.progress_var = tk.StringVar()
+        self.preview_mode = tk.BooleanVar(value=True)
+
+        # Los hilos de trabajo no tocan Tk: publican eventos en esta cola y
+        # el bucle principal los atiende con `after`.
+        self.events = queue.Queue()
+        self.run_id = 0  # Los eventos de ejecuciones anteriores se descartan
+        self.cancel_event = None
+        self.batch = None  # Contadores del lote en curso
+        self._photos = {}  # Referencias a las PhotoImage (Tk no las retiene)
 
         # UI Layout
         self._setup_ui()
+        self.root.after(config.GUI_POLL_MS, self._poll_events)
 
     def _setup_ui(self):
         main_frame = ttk.Frame(self.root, padding="20")
@@ -43,17 +95,23 @@ class ImageProcessorGUI:
 
         # Input Selection Group
         input_group = ttk.LabelFrame(
-            main_frame, text=" 1. Imagen de entrada (.png, .jpg) ", padding="10"
+            main_frame,
+            text=" 1. Imágenes de entrada (.png, .jpg): archivos o carpeta ",
+            padding="10",
         )
         input_group.pack(fill=tk.X, pady=5)
 
         ttk.Entry(input_group, textvariable=self.input_file).pack(
             side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 10)
         )
+        btn_folder = ttk.Button(
+            input_group, text="Carpeta", command=self._browse_input_folder
+        )
+        btn_folder.pack(side=tk.RIGHT)
         btn_in = ttk.Button(
-            input_group, text="Buscar Archivo", command=self._browse_input
+            input_group, text="Buscar Archivos", command=self._browse_input
         )
-        btn_in.pack(side=tk.RIGHT)
+        btn_in.pack(side=tk.RIGHT, padx=(0, 5))
 
         # Output Selection Group
         output_group = ttk.LabelFrame(
@@ -69,11 +127,50 @@ class ImageProcessorGUI:
         )
         btn_out.pack(side=tk.RIGHT)
 
-        # Process Button
+        # Process / Cancel Buttons
+        buttons = ttk.Frame(main_frame)
+        buttons.pack(pady=(20, 5))
         self.process_btn = ttk.Button(
-            main_frame, text="INICIAR CONVERSION", command=self._process_image
+            buttons, text="INICIAR CONVERSION", command=self._process_image
+        )
+        self.process_btn.pack(side=tk.LEFT, padx=5)
+        self.cancel_btn = ttk.Button(buttons, text="Cancelar", command=self._cancel_clicked)
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
+        self.cancel_btn.state(["disabled"])
+        ttk.Checkbutton(
+            main_frame,
+            text="Vista previa rápida (baja resolución) antes del proceso completo",
+            variable=self.preview_mode,
+        ).pack(pady=(0, 10))
+
+        # Batch progress
+        progress_group = ttk.LabelFrame(main_frame, text=" Progreso ", padding="10")
+        progress_group.pack(fill=tk.X, pady=5)
+        self.file_list = ttk.Treeview(
+            progress_group, columns=("estado",), height=6, selectmode="none"
         )
-        self.process_btn.pack(pady=30)
+        self.file_list.heading("#0", text="Archivo")
+        self.file_list.heading("estado", text="Etapa")
+        self.file_list.column("#0", width=260)
+        self.file_list.column("estado", width=320)
+        scroll = ttk.Scrollbar(
+            progress_group, orient=tk.VERTICAL, command=self.file_list.yview
+        )
+        self.file_list.configure(yscrollcommand=scroll.set)
+        self.file_list.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        ttk.Label(main_frame, textvariable=self.progress_var).pack(anchor=tk.W)
+
+        # Preview
+        preview_group = ttk.LabelFrame(main_frame, text=" Vista previa ", padding="10")
+        preview_group.pack(fill=tk.BOTH, expand=True, pady=5)
+        self.preview_labels = {}
+        for key, text in (("alpha", "Alpha"), ("svg", "SVG color")):
+            column = ttk.Frame(preview_group)
+            column.pack(side=tk.LEFT, expand=True)
+            ttk.Label(column, text=text).pack()
+            self.preview_labels[key] = ttk.Label(column)
+            self.preview_labels[key].pack()
 
         # Status Bar
         status_frame = ttk.Frame(main_frame)
@@ -84,9 +181,9 @@ class ImageProcessorGUI:
 
     def _browse_input(self):
         print("DEBUG: Clicking Browse Input...")
-        filename = filedialog.askopenfilename(
+        filenames = filedialog.askopenfilenames(
             parent=self.root,
-            title="Seleccionar Imagen (PNG o JPEG)",
+            title="Seleccionar Imágenes (PNG o JPEG)",
             filetypes=[
                 ("Archivos de imagen", "*.png *.jpg *.jpeg *.JPG *.JPEG"),
                 ("PNG", "*.png"),
@@ -94,12 +191,36 @@ class ImageProcessorGUI:
                 ("Todos los archivos", "*.*"),
             ],
         )
-        if filename:
-            print(f"DEBUG: Selected file: {filename}")
-            self.input_file.set(filename)
-            # Suggest output directory if empty
-            if not self.output_dir.get():
-                self.output_dir.set(os.path.dirname(filename))
+        if filenames:
+            print(f"DEBUG: Selected files: {filenames}")
+            self._set_inputs(list(filenames), filenames[0] if len(filenames) == 1 else None)
+
+    def _browse_input_folder(self):
+        print("DEBUG: Clicking Browse Input Folder...")
+        directory = filedialog.askdirectory(
+            parent=self.root, title="Seleccionar carpeta de imágenes"
+        )
+        if directory:
+            print(f"DEBUG: Selected input directory: {directory}")
+            self._set_inputs(list_images(directory), directory)
+
+    def _set_inputs(self, paths, label):
+        # Lo que se estuviera procesando para la selección anterior ya no sirve
+        self._cancel_run(stale=True)
+        self.input_files = paths
+        self.input_file.set(label or f"{len(paths)} archivos seleccionados")
+        # Suggest output directory if empty
+        if paths and not self.output_dir.get():
+            self.output_dir.set(os.path.dirname(paths[0]))
+
+    def _selected_inputs(self):
+        """Archivos a procesar: lo escrito en el campo o la última selección."""
+        text = self.input_file.get()
+        if os.path.isdir(text):
+            return list_images(text)
+        if os.path.isfile(text):
+            return [text]
+        return [p for p in self.input_files if os.path.exists(p)]
 
     def _browse_output(self):
         print("DEBUG: Clicking Browse Output...")
@@ -112,14 +233,15 @@ class ImageProcessorGUI:
 
     def _process_image(self):
 
-        input_path = self.input_file.get()
+        input_paths = self._selected_inputs()
         output_dir = self.output_dir.get()
 
         print(
-            f"DEBUG: [GUI] Iniciar Conversión pulsado. Input: {input_path}, Output: {output_dir}"
+            f"DEBUG: [GUI] Iniciar Conversión pulsado. Input: {len(input_paths)} "
+            f"archivos, Output: {output_dir}"
         )
 
-        if not input_path or not os.path.exists(input_path):
+        if not input_paths:
             messagebox.showerror("Error", "Por favor, selecciona un archivo válido.")
             return
         if not output_dir or not os.path.exists(output_dir):
@@ -136,94 +258,269 @@ class ImageProcessorGUI:
             )
             return
 
+        self._cancel_run(stale=True)
+        self.run_id += 1
+        self.cancel_event = threading.Event()
+        self._clear_preview()
+        self._start_batch(input_paths)
         self.process_btn.state(["disabled"])
+        self.cancel_btn.state(["!disabled"])
         self.status_var.set("Iniciando proceso...")
-        self.root.update_idletasks()  # Force UI update
-
-        # Run conversion in a separate thread to keep UI responsive
-        def run_thread():
-            try:
-                print("DEBUG: [THREAD] Hilo iniciado.")
-                base_name = os.path.splitext(os.path.basename(input_path))[0] + "_alpha"
-                paths = {
-                    "alpha": os.path.join(output_dir, base_name + ".png"),
-                    "gray": os.path.join(output_dir, base_name + "_gray.svg"),
-                    "halftone": os.path.join(output_dir, base_name + "_halftone.svg"),
-                    "lineart": os.path.join(output_dir, base_name + "_lineart.svg"),
-                    "color_logo": os.path.join(
-                        output_dir, base_name + "_color_logo.svg"
-                    ),
-                    "color_illus": os.path.join(
-                        output_dir, base_name + "_color_illus.svg"
-                    ),
-                    "thumb": os.path.join(output_dir, base_name + "_thumb.png"),
-                }
-
-                print("DEBUG: [THREAD] Generando Alpha...")
-                self.status_var.set("Generando Alpha PNG (IA)...")
-                self.root.update_idletasks()
-                generators.generate_alpha_png(input_path, paths["alpha"])
-
-                alpha_processed = paths["alpha"]
-                if not os.path.exists(alpha_processed):
-                    raise FileNotFoundError(
-                        f"Fallo en la generación del PNG Alpha por IA: "
-                        f"no se encontró {alpha_processed}"
-                    )
-
-                print("DEBUG: [THREAD] Generando SVG Grayscale...")
-                self.status_var.set("Generando SVG Grayscale...")
-                self.root.update_idletasks()
-                generators.generate_grayscale_svg(alpha_processed, paths["gray"])
-
-                print("DEBUG: [THREAD] Generando SVG Halftone...")
-                self.status_var.set("Generando SVG Halftone...")
-                self.root.update_idletasks()
-                generators.generate_halftone_svg(alpha_processed, paths["halftone"])
-
-                print("DEBUG: [THREAD] Generando SVG Lineart...")
-                self.status_var.set("Generando SVG Lineart...")
-                self.root.update_idletasks()
-                generators.generate_lineart_svg(alpha_processed, paths["lineart"])
-
-                print("DEBUG: [THREAD] Generando SVG Color (Logo)...")
-                self.status_var.set("Generando SVG Color (Logo)...")
-                self.root.update_idletasks()
-                generators.generate_color_svg(
-                    alpha_processed, paths["color_logo"], num_colors=16, blur_radius=0.5
-                )
-
-                print("DEBUG: [THREAD] Generando SVG Color (Ilustración)...")
-                self.status_var.set("Generando SVG Color (Ilustración)...")
-                self.root.update_idletasks()
-                generators.generate_color_svg(
-                    alpha_processed, paths["color_illus"], num_colors=48, blur_radius=1
-                )
-
-                print("DEBUG: [THREAD] Generando Miniatura...")
-                self.status_var.set("Generando Miniatura...")
-                self.root.update_idletasks()
-                generators.generate_thumbnail(alpha_processed, paths["thumb"])
 
+        # Run conversion in separate threads to keep UI responsive
+        threading.Thread(
+            target=self._run_job,
+            args=(
+                self.run_id,
+                self.cancel_event,
+                input_paths,
+                output_dir,
+                self.preview_mode.get() and len(input_paths) == 1,
+            ),
+            daemon=True,
+        ).start()
+
+    # --- Trabajo en segundo plano (sin tocar Tk) ---
+
+    def _run_job(self, run_id, cancel, input_paths, output_dir, preview):
+        """Coordinador: vista previa (si procede) y reparto en el pool."""
+
+        def emit(kind, payload=None):
+            self.events.put((run_id, kind, payload))
+
+        try:
+            print(f"DEBUG: [THREAD] Hilo iniciado ({len(input_paths)} archivos).")
+            # Copia de la configuración al lanzar: no cambia durante la ejecución
+            job = JobConfig()
+            if preview:
+                emit("file", (input_paths[0], "Generando vista previa..."))
+                result = make_preview(input_paths[0], cancelled=cancel.is_set, job_config=job)
+                if result is not None:
+                    emit("preview", result)
+
+            admission = None
+            if config.MEMORY_ADMISSION and len(input_paths) > 1:
+                # Con la sesión ya cargada, para que el RSS base la incluya
+                get_ai_session(job)
+                admission = AdmissionController()
+                admission.start()
+
+            workers = max(1, min(config.GUI_WORKERS, len(input_paths)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(
+                        self._process_file, cancel, path, output_dir, emit, admission, job
+                    ): path
+                    for path in input_paths
+                }
+                for future in as_completed(futures):
+                    path = futures[future]
+                    try:
+                        future.result()
+                        emit("file_done", (path, None))
+                    except _Cancelled:
+                        emit("file_done", (path, "cancelado"))
+                    except Exception as e:  # pylint: disable=broad-exception-caught
+                        print(f"DEBUG: [THREAD] ERROR en {path}: {e}\n{traceback.format_exc()}")
+                        emit("file_done", (path, str(e)))
+
+            if admission is not None:
+                admission.stop()
+                print(f"DEBUG: [THREAD] {admission.summary()}")
+
+            if not cancel.is_set():
                 print("DEBUG: [THREAD] ¡Todo OK!")
-                self.status_var.set("¡Completado!")
-                messagebox.showinfo("Éxito", f"Archivos generados en:\n{output_dir}")
+                emit("done", output_dir)
+
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            error_trace = traceback.format_exc()
+            print(f"DEBUG: [THREAD] ERROR CRÍTICO: {e}\n{error_trace}")
+            emit("error", str(e))
+        finally:
+            print("DEBUG: [THREAD] Hilo finalizado.")
+            emit("finished")
+
+    def _process_file(
+        self, cancel, input_path, output_dir, emit, admission=None, job_config=None
+    ):
+        """
+        Todas las etapas de un archivo, en un hilo del pool. Con `admission`,
+        espera antes a que haya memoria para la imagen.
+        """
+        with admission.admit(input_path) if admission is not None else nullcontext():
+            self._process_file_stages(cancel, input_path, output_dir, emit, job_config)
+
+    def _process_file_stages(self, cancel, input_path, output_dir, emit, job_config):
+        job_config = resolve_config(job_config)
+
+        def step(text):
+            if cancel.is_set():
+                raise _Cancelled()
+            print(f"DEBUG: [THREAD] {os.path.basename(input_path)}: {text}")
+            emit("file", (input_path, text))
+
+        paths = output_paths(output_dir, input_path, job_config)
+        step("Generando Alpha PNG (IA)...")
+        img = generators.generate_alpha_png(input_path, paths["alpha"], job_config=job_config)
+        if img is None and not os.path.exists(paths["alpha"]):
+            raise FileNotFoundError(
+                f"Fallo en la generación del PNG Alpha por IA: "
+                f"no se encontró {paths['alpha']}"
+            )
+        source = img if img is not None else paths["alpha"]
 
-            except Exception as e:  # pylint: disable=broad-exception-caught
-                error_trace = traceback.format_exc()
-                print(f"DEBUG: [THREAD] ERROR CRÍTICO: {e}\n{error_trace}")
-                self.status_var.set("Error en el proceso.")
+        step("Analizando imagen...")
+        stages = (
+            plan_vectors(source, paths, VECTOR_STAGES, job_config)
+            if job_config.PLAN_STAGES
+            else VECTOR_STAGES
+        )
+        for key, name, kwargs, degraded in stages:
+            step(f"Generando {STAGE_LABELS.get(key, key)}...")
+            run_stage(key, name, kwargs, degraded, source, paths[key], job_config=job_config)
+
+    # --- Bucle principal de Tk ---
+
+    def _cancel_clicked(self):
+        self._cancel_run(stale=False)
+
+    def _cancel_run(self, stale):
+        """
+        Cancela la ejecución en curso. Los archivos en cola no empiezan y los
+        que están en marcha paran al terminar su etapa actual. Con `stale`
+        (nueva selección) sus eventos pendientes se ignoran.
+        """
+        if self.cancel_event is None or self.cancel_event.is_set():
+            return
+        self.cancel_event.set()
+        self.cancel_btn.state(["disabled"])
+        if stale:
+            self.run_id += 1
+            self.batch = None
+            self.process_btn.state(["!disabled"])
+            self.status_var.set("Proceso anterior cancelado.")
+        else:
+            self.status_var.set("Cancelando (se termina la etapa en curso)...")
+
+    def _poll_events(self):
+        try:
+            while True:
+                run_id, kind, payload = self.events.get_nowait()
+                if run_id == self.run_id:
+                    self._handle_event(kind, payload)
+        except queue.Empty:
+            pass
+        self._update_progress()
+        self.root.after(config.GUI_POLL_MS, self._poll_events)
+
+    def _handle_event(self, kind, payload):
+        if kind == "file":
+            path, text = payload
+            self.file_list.set(path, "estado", text)
+            if self.batch["total"] == 1:
+                self.status_var.set(text)
+            else:
+                self.status_var.set(f"{os.path.basename(path)}: {text}")
+        elif kind == "file_done":
+            path, error = payload
+            if error == "cancelado":
+                self.file_list.set(path, "estado", "⏹ Cancelado")
+                return
+            self.batch["done"] += 1
+            if error is None:
+                self.file_list.set(path, "estado", "✔ Completado")
+            else:
+                self.batch["failed"] += 1
+                self.file_list.set(path, "estado", f"✖ {error}")
+        elif kind == "preview":
+            self._show_preview(payload)
+            self.status_var.set("Vista previa lista; procesando a resolución completa...")
+        elif kind == "done":
+            failed = self.batch["failed"]
+            self.status_var.set("¡Completado!" if not failed else "Completado con errores.")
+            if self.batch["total"] == 1 and failed:
+                error = self.file_list.set(self.batch["paths"][0], "estado")
                 messagebox.showerror(
                     "Error",
-                    f"Fallo al procesar: {str(e)}\n\nRevisa la terminal para más detalles.",
+                    f"Fallo al procesar: {error}\n\nRevisa la terminal para más detalles.",
                 )
-            finally:
-                print("DEBUG: [THREAD] Hilo finalizado.")
-                self.process_btn.state(["!disabled"])
-                if self.status_var.get() != "¡Completado!":
-                    self.status_var.set("Listo.")
-
-        threading.Thread(target=run_thread, daemon=True).start()
+            elif self.batch["total"] == 1:
+                messagebox.showinfo("Éxito", f"Archivos generados en:\n{payload}")
+            else:
+                messagebox.showinfo(
+                    "Lote terminado",
+                    f"{self.batch['done'] - failed} de {self.batch['total']} imágenes "
+                    f"procesadas ({failed} con errores).\nArchivos en:\n{payload}",
+                )
+        elif kind == "error":
+            self.status_var.set("Error en el proceso.")
+            messagebox.showerror(
+                "Error",
+                f"Fallo al procesar: {payload}\n\nRevisa la terminal para más detalles.",
+            )
+        elif kind == "finished":
+            self.cancel_event = None
+            self.batch["finished"] = True
+            self.process_btn.state(["!disabled"])
+            self.cancel_btn.state(["disabled"])
+            if self.status_var.get().startswith("Cancelando"):
+                self.status_var.set("Cancelado.")
+
+    def _start_batch(self, input_paths):
+        self.file_list.delete(*self.file_list.get_children())
+        for path in input_paths:
+            self.file_list.insert("", tk.END, iid=path, text=os.path.basename(path), values=("En cola",))
+        self.batch = {
+            "paths": input_paths,
+            "total": len(input_paths),
+            "done": 0,
+            "failed": 0,
+            "start": time.monotonic(),
+            "finished": False,
+        }
+
+    def _update_progress(self):
+        """Progreso del lote: completadas, imágenes/min y tiempo restante."""
+        batch = self.batch
+        if batch is None:
+            self.progress_var.set("")
+            return
+        if batch["finished"] and batch.get("shown"):
+            return
+        elapsed = time.monotonic() - batch["start"]
+        text = f"{batch['done']}/{batch['total']} imágenes"
+        if batch["done"] and elapsed > 0:
+            rate = batch["done"] / elapsed * 60
+            remaining = (batch["total"] - batch["done"]) / rate * 60
+            text += f" · {rate:.1f} img/min"
+            if not batch["finished"]:
+                text += f" · ETA {int(remaining) // 60}:{int(remaining) % 60:02d}"
+        text += f" · {int(elapsed) // 60}:{int(elapsed) % 60:02d} transcurrido"
+        if batch["failed"]:
+            text += f" · {batch['failed']} errores"
+        self.progress_var.set(text)
+        batch["shown"] = batch["finished"]
+
+    def _clear_preview(self):
+        for label in self.preview_labels.values():
+            label.configure(image="")
+        self._photos.clear()
+
+    def _show_preview(self, result):
+        for key, img in result.items():
+            if img is None:
+                continue
+            img = img.copy()
+            img.thumbnail((PREVIEW_BOX, PREVIEW_BOX))
+            # Damero bajo la transparencia, como en los editores de imagen
+            board = Image.new("RGBA", img.size, (255, 255, 255, 255))
+            cell = Image.new("RGBA", (8, 8), (204, 204, 204, 255))
+            for y in range(0, img.height, 8):
+                for x in range((y // 8) % 2 * 8, img.width, 16):
+                    board.paste(cell, (x, y))
+            board.alpha_composite(img)
+            self._photos[key] = ImageTk.PhotoImage(board)
+            self.preview_labels[key].configure(image=self._photos[key])
 
 
 def start_gui():
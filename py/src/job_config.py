@@ -0,0 +1,92 @@
+"""
+Configuración inmutable por trabajo.
+
+src/config.py define los valores por defecto del proceso. Un JobConfig es
+una copia congelada de esas constantes con los cambios de un trabajo:
+
+    job = JobConfig(ALPHA_FEATHER=0, THUMB_WIDTHS=(150,), AI_MODEL="u2netp")
+    generators.generate_alpha_png(path, out, job_config=job)
+
+Los generadores y los pipelines reciben `job_config=` y leen de ahí en vez
+de las constantes del módulo, así que en un mismo proceso pueden ir a la vez
+trabajos con ajustes distintos sin pisarse. Sin `job_config` se usa una
+copia de src/config.py tal como esté en ese momento.
+
+Se puede enviar a otros procesos (pickle) y comparar por valor.
+"""
+
+from types import MappingProxyType
+
+from src import config
+
+
+def _defaults():
+    return {name: value for name, value in vars(config).items() if name.isupper()}
+
+
+class JobConfig:
+    """Constantes de src/config.py (mismos nombres) con cambios por trabajo."""
+
+    __slots__ = ("_values", "_overrides")
+
+    def __init__(self, **overrides):
+        values = _defaults()
+        unknown = sorted(set(overrides) - set(values))
+        if unknown:
+            raise ValueError(f"Ajustes desconocidos: {', '.join(unknown)}")
+        values.update(overrides)
+        object.__setattr__(self, "_values", MappingProxyType(values))
+        object.__setattr__(self, "_overrides", MappingProxyType(dict(overrides)))
+
+    def __getattr__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(f"JobConfig no tiene el ajuste {name!r}") from None
+
+    def __setattr__(self, name, value):
+        raise AttributeError("JobConfig es inmutable: usa replace()")
+
+    def __delattr__(self, name):
+        raise AttributeError("JobConfig es inmutable: usa replace()")
+
+    def __eq__(self, other):
+        return isinstance(other, JobConfig) and self._values == other._values
+
+    def __hash__(self):
+        return hash(tuple(sorted(self._values.items())))
+
+    def __repr__(self):
+        changes = ", ".join(f"{k}={v!r}" for k, v in sorted(self._overrides.items()))
+        return f"JobConfig({changes})"
+
+    def __reduce__(self):
+        # Se envían todos los valores, no solo los cambios: el otro proceso
+        # puede tener otro src/config.py en memoria
+        return (_restore, (dict(self._values), dict(self._overrides)))
+
+    @property
+    def overrides(self):
+        """Ajustes que difieren de src/config.py al crear la copia."""
+        return dict(self._overrides)
+
+    def replace(self, **overrides):
+        """Nueva copia con `overrides` aplicados sobre los de esta."""
+        values = dict(self._values)
+        unknown = sorted(set(overrides) - set(values))
+        if unknown:
+            raise ValueError(f"Ajustes desconocidos: {', '.join(unknown)}")
+        values.update(overrides)
+        return _restore(values, {**self._overrides, **overrides})
+
+
+def _restore(values, overrides):
+    job = JobConfig.__new__(JobConfig)
+    object.__setattr__(job, "_values", MappingProxyType(values))
+    object.__setattr__(job, "_overrides", MappingProxyType(overrides))
+    return job
+
+
+def resolve_config(job_config=None):
+    """`job_config`, o una copia de src/config.py si es None."""
+    return job_config if job_config is not None else JobConfig()
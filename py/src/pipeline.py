@@ -0,0 +1,420 @@
+"""
+Pipeline por etapas con asyncio para el procesamiento por lotes.
+
+Cada imagen recorre: lectura → decodificación → IA (alpha) → refinado →
+generadores vectoriales → escritura. Las etapas se comunican con colas
+acotadas, de modo que una etapa lenta frena a las anteriores (backpressure)
+y la memoria se mantiene estable aunque el lote tenga 100k imágenes.
+
+Las etapas de CPU se ejecutan en un pool de hilos (numpy, OpenCV, ONNX
+Runtime y potrace liberan el GIL) y las de E/S se solapan con ellas.
+
+Con un `AdmissionController` (src/admission.py), además, una imagen solo
+entra en el pipeline si su pico de memoria estimado cabe en el presupuesto:
+muchos logos pequeños van a la vez y los escaneos grandes, de uno en uno.
+
+Cada imagen lleva su JobConfig (src/job_config.py): el del pipeline o el
+que venga con la entrada como tupla (ruta, JobConfig), de modo que un mismo
+lote puede mezclar trabajos con ajustes distintos.
+"""
+
+import asyncio
+import functools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image
+
+from src import config
+from src import generators
+from src.generators.alpha import get_ai_session, remove_background, refine_cutout
+from src.generators.deadline import StageTimeout, deadline
+from src.generators.encode import alpha_extension, encode_alpha, encode_options, write_atomic
+from src.generators.svg import svg_extension
+from src.generators.thumbnail import thumbnail_paths
+from src.job_config import resolve_config
+from src.planner import load_plan, plan_vectors
+
+# Marca de fin de cola
+_DONE = object()
+
+
+def output_paths(output_dir, file, job_config=None):
+    """Rutas de todas las salidas de una imagen de entrada."""
+    job = resolve_config(job_config)
+    base_name = os.path.splitext(os.path.basename(file))[0] + "_alpha"
+    svg = svg_extension(job)
+    return {
+        "alpha": os.path.join(output_dir, base_name + alpha_extension(job.ALPHA_FORMAT)),
+        "gray": os.path.join(output_dir, base_name + "_gray" + svg),
+        "halftone": os.path.join(output_dir, base_name + "_halftone" + svg),
+        "lineart": os.path.join(output_dir, base_name + "_lineart" + svg),
+        "color_logo": os.path.join(output_dir, base_name + "_color_logo" + svg),
+        "color_illus": os.path.join(output_dir, base_name + "_color_illus" + svg),
+        "thumb": os.path.join(output_dir, base_name + "_thumb.png"),
+        # Metadatos, no una salida: qué generadores decidió ejecutar el plan
+        "plan": os.path.join(output_dir, base_name + "_plan.json"),
+    }
+
+
+def output_files(paths, job_config=None):
+    """
+    Archivos de cada salida de `paths` ({salida: [rutas]}): la miniatura
+    incluye todos los tamaños (THUMB_WIDTHS) y sus WebP.
+    """
+    files = {}
+    for key, path in paths.items():
+        if key == "thumb":
+            sizes = thumbnail_paths(path, job_config=job_config).values()
+            files[key] = [file for size in sizes for file in size]
+        else:
+            files[key] = [path]
+    return files
+
+
+def missing_outputs(paths, job_config=None):
+    """
+    Salidas de `paths` a las que les falta algún archivo, sin contar las que
+    el plan de la imagen descartó.
+    """
+    plan = resolve_config(job_config).PLAN_STAGES
+    skipped = load_plan(paths["plan"]).get("skipped", {}) if plan else {}
+    return [
+        key
+        for key, files in output_files(paths, job_config).items()
+        if key != "plan"
+        and key not in skipped
+        and not all(os.path.exists(file) for file in files)
+    ]
+
+
+# Generadores vectoriales en el orden del flujo en serie:
+# (salida, generador, argumentos, argumentos degradados si se agota el plazo)
+VECTOR_STAGES = [
+    ("gray", "generate_grayscale_svg", {}, {"num_tones": 4, "turdsize": 32}),
+    ("halftone", "generate_halftone_svg", {}, {"spacing": 10}),
+    ("lineart", "generate_lineart_svg", {}, {"turdsize": 40}),
+    (
+        "color_logo",
+        "generate_color_svg",
+        {"num_colors": 16, "blur_radius": 0.5},
+        {"num_colors": 8, "blur_radius": 0.5, "turdsize": 8, "n_init": 1},
+    ),
+    (
+        "color_illus",
+        "generate_color_svg",
+        {"num_colors": 48, "blur_radius": 1},
+        {"num_colors": 12, "blur_radius": 1, "turdsize": 8, "n_init": 1},
+    ),
+    ("thumb", "generate_thumbnail", {}, None),
+]
+
+
+def image_deadline(job_config=None):
+    """Hora (time.time) en la que vence el plazo de una imagen, o None."""
+    timeout = resolve_config(job_config).IMAGE_TIMEOUT
+    return time.time() + timeout if timeout and timeout > 0 else None
+
+
+def run_stage(
+    key, name, kwargs, degraded, source, output_path, deadline_at=None, job_config=None
+):
+    """
+    Ejecuta un generador dentro del plazo de la etapa (STAGE_TIMEOUT) y de lo
+    que quede del de la imagen. Si se agota, repite con los argumentos
+    degradados y su propio plazo (STAGE_TIMEOUT_DEGRADED), sin pasar del de
+    la imagen; si la imagen ya no tiene plazo, no hay reintento.
+    Devuelve {"stage", "status", "seconds"} con status "ok", "degraded" o
+    "timeout" (sin salida).
+    """
+    job = resolve_config(job_config)
+    func = getattr(generators, name)
+    start = time.perf_counter()
+    image_left = None if deadline_at is None else deadline_at - time.time()
+    status = "ok"
+    try:
+        if image_left is not None and image_left <= 0:
+            raise StageTimeout("plazo de la imagen agotado")
+        with deadline(image_left), deadline(job.STAGE_TIMEOUT):
+            func(source, output_path, job_config=job, **kwargs)
+    except StageTimeout as e:
+        status = "timeout"
+        image_left = None if deadline_at is None else deadline_at - time.time()
+        if degraded is not None and image_left is not None and image_left <= 0:
+            print(f"⏱ {key}: {e}; sin reintento: plazo de la imagen agotado")
+        elif degraded is not None:
+            print(f"⏱ {key}: {e}; reintentando en modo degradado {degraded}")
+            try:
+                # El reintento también cuenta contra el plazo de la imagen
+                with deadline(image_left), deadline(job.STAGE_TIMEOUT_DEGRADED):
+                    func(source, output_path, job_config=job, **degraded)
+                status = "degraded"
+            except StageTimeout as e2:
+                print(f"⏱ {key}: también se agotó el modo degradado: {e2}")
+        if status == "timeout":
+            print(f"❌ {key}: sin salida por tiempo ({os.path.basename(output_path)})")
+    return {"stage": key, "status": status, "seconds": time.perf_counter() - start}
+
+
+def vector_tasks(source, paths, deadline_at=None, plan=None, job_config=None):
+    """
+    Llamadas de los generadores que parten del PNG alpha (o de la imagen
+    RGBA ya en memoria), en el mismo orden que el flujo en serie.
+    Con `plan` (por defecto PLAN_STAGES del trabajo), solo las que el
+    análisis de la imagen considera útiles.
+    Cada llamada devuelve el resultado de `run_stage`.
+    """
+    job = resolve_config(job_config)
+    plan = job.PLAN_STAGES if plan is None else plan
+    stages = plan_vectors(source, paths, VECTOR_STAGES, job) if plan else VECTOR_STAGES
+    return [
+        functools.partial(
+            run_stage, key, name, kwargs, degraded, source, paths[key], deadline_at, job
+        )
+        for key, name, kwargs, degraded in stages
+    ]
+
+
+def job_inputs(input_paths, job_config=None):
+    """
+    (ruta, JobConfig) por cada entrada de `input_paths`: una ruta usa
+    `job_config` y una tupla (ruta, JobConfig) trae el suyo.
+    """
+    job = resolve_config(job_config)
+    for item in input_paths:
+        if isinstance(item, tuple):
+            yield item[0], resolve_config(item[1])
+        else:
+            yield item, job
+
+
+def record_stage_report(output_dir, file, results):
+    """
+    Añade a <output>/STAGE_REPORT las etapas degradadas o sin salida, para
+    poder regenerarlas después. Devuelve cuántas había.
+    """
+    flagged = [r for r in results if r["status"] != "ok"]
+    if flagged:
+        lines = "".join(
+            json.dumps({"file": file, "time": time.time(), **r}) + "\n" for r in flagged
+        )
+        # Una sola escritura en modo append: segura entre procesos
+        with open(os.path.join(output_dir, config.STAGE_REPORT), "a", encoding="utf-8") as f:
+            f.write(lines)
+    return len(flagged)
+
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _decode(data):
+    img = Image.open(BytesIO(data))
+    img.load()
+    return img
+
+
+class StagedPipeline:
+    """
+    Pipeline asíncrono con colas acotadas entre etapas.
+    `queue_size` limita las imágenes en espera entre dos etapas y
+    `cpu_workers` los hilos que ejecutan el trabajo pesado.
+    Con `admission`, las imágenes esperan en la lectura hasta que su pico de
+    memoria estimado quepa en el presupuesto.
+    """
+
+    def __init__(
+        self,
+        output_dir,
+        queue_size=config.PIPELINE_QUEUE_SIZE,
+        cpu_workers=config.PIPELINE_CPU_WORKERS,
+        io_workers=config.PIPELINE_IO_WORKERS,
+        admission=None,
+        job_config=None,
+    ):
+        self.output_dir = output_dir
+        self.queue_size = queue_size
+        self.cpu_workers = cpu_workers
+        self.io_workers = io_workers
+        self.admission = admission
+        self.job_config = resolve_config(job_config)
+        self._cpu_pool = None
+        self.stats = {"done": 0, "skipped": 0, "failed": 0, "degraded": 0}
+
+    async def _cpu(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._cpu_pool, func, *args)
+
+    async def _stage(self, name, inbox, outbox, func, workers):
+        """
+        Lanza `workers` consumidores de `inbox`. Cada trabajo procesado por
+        `func` pasa a `outbox`; si `func` devuelve None el trabajo termina ahí.
+        """
+
+        async def worker():
+            while True:
+                job = await inbox.get()
+                if job is _DONE:
+                    # Reenviar la marca para el resto de consumidores
+                    await inbox.put(_DONE)
+                    return
+                try:
+                    job = await func(job)
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    self.stats["failed"] += 1
+                    print(f"❌ Error en etapa '{name}' para {job['file']}: {e}")
+                    self._release(job)
+                    job = None
+                if job is not None and outbox is not None:
+                    await outbox.put(job)
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        if outbox is not None:
+            await outbox.put(_DONE)
+
+    def _release(self, job):
+        """Devuelve al presupuesto la memoria reservada para `job`."""
+        ticket = job.pop("ticket", None)
+        if ticket is not None:
+            self.admission.release(ticket)
+
+    # --- Etapas ---
+
+    async def _read(self, job):
+        paths = job["paths"]
+        missing = await asyncio.to_thread(missing_outputs, paths, job["config"])
+        if not missing:
+            self.stats["skipped"] += 1
+            return None
+
+        if self.admission is not None:
+            # Solo la cabecera: las dimensiones bastan para estimar el pico
+            header = paths["alpha"] if "alpha" not in missing else job["input_path"]
+            job["ticket"] = await asyncio.to_thread(self.admission.acquire, header)
+
+        print(f"\n📦 Processing: {job['file']}...")
+        if "alpha" not in missing:
+            # Reutilizar el PNG alpha ya generado (igual que el flujo en serie)
+            job["data"] = await asyncio.to_thread(_read_bytes, paths["alpha"])
+            job["alpha_ready"] = True
+        else:
+            job["data"] = await asyncio.to_thread(_read_bytes, job["input_path"])
+            job["alpha_ready"] = False
+        return job
+
+    async def _decode(self, job):
+        # El plazo de la imagen cuenta desde que empieza a procesarse, no
+        # desde que entra en la cola
+        job["deadline"] = image_deadline(job["config"])
+        job["image"] = await self._cpu(_decode, job.pop("data"))
+        return job
+
+    async def _infer(self, job):
+        if not job["alpha_ready"]:
+            job["image"] = await self._cpu(
+                functools.partial(remove_background, job["image"], job_config=job["config"])
+            )
+        return job
+
+    async def _refine(self, job):
+        if job["alpha_ready"]:
+            job["image"] = await self._cpu(lambda: job["image"].convert("RGBA"))
+        else:
+            job["image"] = await self._cpu(refine_cutout, job["image"], job["config"])
+        return job
+
+    async def _vectorize(self, job):
+        # El plan analiza la imagen: trabajo de CPU, fuera del bucle de eventos
+        tasks = await self._cpu(
+            functools.partial(
+                vector_tasks,
+                job["image"],
+                job["paths"],
+                job["deadline"],
+                job_config=job["config"],
+            )
+        )
+        if not job["alpha_ready"]:
+            # La codificación del alpha no bloquea a los generadores: va en paralelo
+            tasks.append(lambda: encode_alpha(job["image"], **encode_options(job["config"])))
+        results = await asyncio.gather(*(self._cpu(task) for task in tasks))
+        job["alpha_data"] = None if job["alpha_ready"] else results.pop()
+        self.stats["degraded"] += await asyncio.to_thread(
+            record_stage_report, self.output_dir, job["file"], results
+        )
+        # La imagen ya no hace falta: liberar memoria antes de la escritura
+        job.pop("image")
+        self._release(job)
+        return job
+
+    async def _write(self, job):
+        if job["alpha_data"] is not None:
+            await asyncio.to_thread(write_atomic, job["paths"]["alpha"], job["alpha_data"])
+            print(f"🖼 PNG Alpha OK (PRO): {os.path.basename(job['paths']['alpha'])}")
+        self.stats["done"] += 1
+        return None
+
+    # --- Ejecución ---
+
+    async def run_async(self, input_paths):
+        """
+        Procesa `input_paths` (cualquier iterable de rutas o de tuplas
+        (ruta, JobConfig)) a través de todas las etapas.
+        """
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(6)]
+        stages = [
+            ("read", self._read, self.io_workers),
+            ("decode", self._decode, self.cpu_workers),
+            ("alpha", self._infer, self.cpu_workers),
+            ("refine", self._refine, self.cpu_workers),
+            ("vector", self._vectorize, self.cpu_workers),
+            ("write", self._write, self.io_workers),
+        ]
+
+        async def feed():
+            for input_path, job_config in job_inputs(input_paths, self.job_config):
+                await queues[0].put(
+                    {
+                        "file": os.path.basename(input_path),
+                        "input_path": input_path,
+                        "paths": output_paths(self.output_dir, input_path, job_config),
+                        "config": job_config,
+                    }
+                )
+            await queues[0].put(_DONE)
+
+        if self.admission is not None:
+            # El RSS base debe incluir ya la sesión del modelo (coste fijo)
+            await asyncio.to_thread(get_ai_session, self.job_config)
+            self.admission.start()
+
+        with ThreadPoolExecutor(max_workers=self.cpu_workers) as pool:
+            self._cpu_pool = pool
+            await asyncio.gather(
+                feed(),
+                *(
+                    self._stage(
+                        name,
+                        queues[i],
+                        queues[i + 1] if i + 1 < len(stages) else None,
+                        func,
+                        workers,
+                    )
+                    for i, (name, func, workers) in enumerate(stages)
+                ),
+            )
+        self._cpu_pool = None
+        if self.admission is not None:
+            self.admission.stop()
+        return self.stats
+
+    def run(self, input_paths):
+        """Versión síncrona de `run_async`."""
+        start = time.perf_counter()
+        stats = asyncio.run(self.run_async(input_paths))
+        stats["seconds"] = time.perf_counter() - start
+        return stats
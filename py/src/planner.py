@@ -0,0 +1,135 @@
+"""
+Plan de etapas según el contenido de la imagen.
+
+Con el análisis rápido de `generators.analysis` se decide qué generadores
+vectoriales ejecutar y con qué parámetros:
+
+- Sin figura visible: no se vectoriza nada (solo la miniatura).
+- Imagen en B/N: los dos presets de color caen en la misma rama B/N de
+  generate_color_svg; basta con el primero.
+- Line art (B/N sin medios tonos): el SVG en grises y el halftone no
+  aportan nada sobre el lineart.
+- Pocos colores: un preset de color con más clusters que colores reales es
+  redundante si otro más pequeño ya los cubre; al que queda se le baja
+  `num_colors` a los colores reales (nunca se sube: el valor configurado
+  es el máximo).
+- Mucho ruido (densidad de bordes alta): se sube `turdsize` en los presets
+  de color para no trazar miles de motas.
+
+Los argumentos degradados de un preset ajustado salen de los planificados:
+nunca más colores ni un `turdsize` menor que los del modo normal.
+
+El plan se guarda junto a las salidas (`*_plan.json`) para poder auditarlo,
+y las salidas descartadas no cuentan como pendientes en lotes posteriores.
+"""
+
+import json
+
+from src.generators.analysis import analyze_image
+from src.generators.encode import write_atomic
+from src.job_config import resolve_config
+
+
+def plan_stages(features, stages, job_config=None):
+    """
+    Aplica las reglas a `stages` (lista de (salida, generador, argumentos,
+    degradados)) con los umbrales PLAN_* del trabajo. Devuelve (etapas a
+    ejecutar, {salida: motivo}).
+    """
+    job = resolve_config(job_config)
+    skipped = {}
+    planned = {key: (name, dict(kwargs), degraded) for key, name, kwargs, degraded in stages}
+    vector_keys = [key for key, (name, _, _) in planned.items() if name != "generate_thumbnail"]
+
+    if features["foreground"] < job.PLAN_MIN_FOREGROUND:
+        skipped.update({key: "sin figura visible" for key in vector_keys})
+    else:
+        is_bw = features["saturation"] < job.PLAN_BW_SATURATION
+        color_keys = sorted(
+            (key for key, (name, _, _) in planned.items() if name == "generate_color_svg"),
+            key=lambda key: planned[key][1].get("num_colors", 32),
+        )
+
+        if is_bw:
+            for key in color_keys[1:]:
+                skipped[key] = f"imagen en B/N: igual que {color_keys[0]}"
+            if features["midtones"] < job.PLAN_LINEART_MIDTONES:
+                for key, (name, _, _) in planned.items():
+                    if name in ("generate_grayscale_svg", "generate_halftone_svg"):
+                        skipped[key] = "line art sin medios tonos: igual que lineart"
+        else:
+            colors = max(2, features["colors"])
+            covered = None
+            for key in color_keys:
+                kwargs = planned[key][1]
+                if covered is not None:
+                    skipped[key] = f"{colors} colores: ya cubiertos por {covered}"
+                    continue
+                if kwargs.get("num_colors", 32) >= colors:
+                    kwargs["num_colors"] = min(kwargs.get("num_colors", 32), colors)
+                    covered = key
+
+        if features["edges"] > job.PLAN_NOISY_EDGES:
+            for key in color_keys:
+                kwargs = planned[key][1]
+                kwargs["turdsize"] = max(kwargs.get("turdsize", 2), job.PLAN_NOISY_TURDSIZE)
+
+    run = [
+        (key, name, kwargs, _planned_degraded(kwargs, degraded))
+        for key, (name, kwargs, degraded) in planned.items()
+        if key not in skipped
+    ]
+    return run, skipped
+
+
+def _planned_degraded(kwargs, degraded):
+    """
+    Argumentos degradados acordes a los planificados `kwargs`: como mucho
+    sus `num_colors` y como poco su `turdsize`.
+    """
+    if degraded is None:
+        return None
+    degraded = dict(degraded)
+    if "num_colors" in kwargs:
+        degraded["num_colors"] = min(degraded.get("num_colors", 32), kwargs["num_colors"])
+    if "turdsize" in kwargs:
+        degraded["turdsize"] = max(degraded.get("turdsize", 2), kwargs["turdsize"])
+    return degraded
+
+
+def plan_vectors(source, paths, stages, job_config=None):
+    """
+    Analiza `source`, decide el plan y lo guarda en paths["plan"].
+    Devuelve las etapas a ejecutar.
+    """
+    features = analyze_image(source, job_config=job_config)
+    run, skipped = plan_stages(features, stages, job_config)
+    write_plan(paths["plan"], features, run, skipped)
+
+    if skipped:
+        print(f"🧭 Plan: se omiten {', '.join(f'{k} ({v})' for k, v in skipped.items())}")
+    return run
+
+
+def write_plan(path, features, run, skipped, **extra):
+    """
+    Guarda en `path` el plan (características, etapas a ejecutar y
+    descartadas). `extra` añade claves, p. ej. el fotograma del que sale
+    el plan en el modo secuencia.
+    """
+    plan = {
+        "features": {k: round(v, 4) if isinstance(v, float) else v for k, v in features.items()},
+        "stages": {key: kwargs for key, _, kwargs, _ in run},
+        "skipped": skipped,
+        **extra,
+    }
+    write_atomic(path, json.dumps(plan, indent=2, ensure_ascii=False).encode("utf-8"))
+
+
+def load_plan(path):
+    """Plan guardado en `path` ({} si no existe o no se puede leer)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
@@ -0,0 +1,79 @@
+"""
+Vista previa rápida para la GUI.
+
+Ejecuta el flujo sobre una copia reducida (PREVIEW_SIZE px) con el modelo
+ligero (PREVIEW_AI_MODEL) y pocos colores, para enseñar el alpha y un SVG
+de color en uno o dos segundos mientras el trabajo a resolución completa
+sigue en segundo plano.
+"""
+
+import os
+import tempfile
+
+from PIL import Image
+
+from src import config
+from src.generators.alpha import get_ai_session, refine_cutout, remove_background
+from src.generators.color import generate_color_svg
+from src.generators.session import get_session, session_options
+from src.generators.svg import rasterize_svg
+from src.job_config import resolve_config
+
+
+# Opciones del modelo ligero que ya fallaron al cargar: no se reintentan
+_UNAVAILABLE = set()
+
+
+def get_preview_session(job_config=None):
+    """
+    Sesión del modelo ligero (del registro); si no se puede cargar, la normal.
+    Un fallo se recuerda: las vistas previas siguientes van directas a la normal.
+    """
+    job = resolve_config(job_config)
+    options = {**session_options(job), "model_name": job.PREVIEW_AI_MODEL, "variant": "fp32"}
+    key = tuple(sorted(options.items()))
+    if key not in _UNAVAILABLE:
+        try:
+            return get_session(**options)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            _UNAVAILABLE.add(key)
+            print(f"[PREVIEW] Modelo ligero no disponible ({e}); se usa {job.AI_MODEL}")
+    return get_ai_session(job)
+
+
+def load_preview_source(input_path, size=config.PREVIEW_SIZE):
+    """Imagen de entrada reducida a `size` px de lado (draft en JPEG)."""
+    with Image.open(input_path) as img:
+        img.draft("RGB", (size, size))
+        img = img.convert("RGBA")
+    img.thumbnail((size, size), Image.Resampling.BILINEAR)
+    return img
+
+
+def make_preview(input_path, cancelled=lambda: False, size=None, job_config=None):
+    """
+    Devuelve {"alpha": RGBA, "svg": RGBA} con la vista previa, o None si
+    `cancelled()` pasa a ser True entre pasos.
+    """
+    job = resolve_config(job_config)
+    img = load_preview_source(input_path, job.PREVIEW_SIZE if size is None else size)
+    if cancelled():
+        return None
+
+    session = get_preview_session(job)
+    cutout = refine_cutout(remove_background(img, session=session), job)
+    if cancelled():
+        return None
+
+    with tempfile.TemporaryDirectory(prefix="transparente-preview-") as tmp:
+        svg_path = os.path.join(tmp, "preview.svg")
+        generate_color_svg(
+            cutout,
+            svg_path,
+            num_colors=job.PREVIEW_COLORS,
+            blur_radius=0.5,
+            n_init=1,
+            job_config=job,
+        )
+        svg = rasterize_svg(svg_path) if os.path.exists(svg_path) else None
+    return {"alpha": cutout, "svg": svg}
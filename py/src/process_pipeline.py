@@ -0,0 +1,334 @@
+"""
+Procesamiento por lotes con procesos de inferencia dedicados.
+
+Solo uno o dos procesos cargan el modelo de IA (~176MB más el arena de ONNX
+Runtime). Atienden las peticiones de una en una y entregan cada recorte a
+los workers de vectorización a través de `multiprocessing.shared_memory`,
+sin serializar el array con pickle. Así el número de workers lo limita la
+CPU y no la memoria del modelo.
+
+    coordinador ──rutas──▶ inferencia (1-2) ──shm──▶ workers (N) ──▶ salidas
+"""
+
+import multiprocessing
+import os
+import queue
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+from PIL import Image
+
+from src import config
+from src.generators.alpha import remove_background, refine_cutout
+from src.generators.session import default_intra_op_threads, get_session, session_options
+from src.generators.encode import save_alpha
+from src.job_config import resolve_config
+from src.pipeline import (
+    image_deadline,
+    job_inputs,
+    missing_outputs,
+    output_paths,
+    record_stage_report,
+    vector_tasks,
+)
+
+
+# ----------------------------
+# Memoria compartida
+# ----------------------------
+
+
+def put_shared_image(img, name=None):
+    """
+    Copia `img` (RGBA) a un bloque de memoria compartida (con nombre `name`
+    si se pasa) y devuelve la referencia que viaja por la cola: (nombre,
+    forma). El bloque lo libera quien lo consume (`take_shared_image`) o,
+    si el consumidor cae antes, `release_shared_image`.
+    """
+    array = np.asarray(img.convert("RGBA"))
+    shm = shared_memory.SharedMemory(name=name, create=True, size=array.nbytes)
+    try:
+        np.ndarray(array.shape, dtype=np.uint8, buffer=shm.buf)[:] = array
+        # El consumidor hace unlink(); si el resource tracker de este proceso
+        # siguiera registrándolo, intentaría liberarlo de nuevo al salir.
+        resource_tracker.unregister(shm._name, "shared_memory")  # pylint: disable=protected-access
+        return shm.name, array.shape
+    finally:
+        shm.close()
+
+
+def take_shared_image(name, shape):
+    """Recupera la imagen de un bloque compartido y libera el bloque."""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        array = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+    return Image.fromarray(array, mode="RGBA")
+
+
+def release_shared_image(name):
+    """Libera el bloque `name` si sigue existiendo. Devuelve True si lo liberó."""
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return False
+    shm.close()
+    shm.unlink()
+    return True
+
+
+# ----------------------------
+# Procesos
+# ----------------------------
+
+
+def _inference_main(requests, tasks, handed, done, job_config):
+    """
+    Proceso de inferencia: dueño de las sesiones del modelo. La del
+    `job_config` del pipeline se carga al arrancar; los trabajos con otro
+    modelo u otras opciones cargan la suya (una vez) del registro. Cada
+    trabajo que sale de aquí (a los workers o con error) se anuncia en
+    `handed`.
+    """
+    try:
+        get_session(**session_options(job_config))
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        print(f"[ERROR] No se pudo cargar el modelo de IA: {e}")
+        # Sin modelo, cada petición pendiente se da por fallida
+        while (job := requests.get()) is not None:
+            done.put((job["file"], f"modelo no disponible: {e}", 0))
+            handed.put(job["file"])
+        return
+
+    while (job := requests.get()) is not None:
+        try:
+            job["deadline"] = image_deadline(job["config"])
+            session = get_session(**session_options(job["config"]))
+            with Image.open(job["input_path"]) as img:
+                cutout = remove_background(img, session=session)
+            job["shm"] = put_shared_image(cutout, job["shm_name"])
+            tasks.put(job)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            done.put((job["file"], str(e), 0))
+        finally:
+            handed.put(job["file"])
+
+
+def _worker_main(tasks, done):
+    """Worker de vectorización: refinado, PNG alpha y generadores."""
+    # Un hilo codifica el alpha mientras el proceso sigue con los generadores
+    with ThreadPoolExecutor(max_workers=1) as encoder:
+        while (job := tasks.get()) is not None:
+            try:
+                paths = job["paths"]
+                job_config = job["config"]
+                saved = None
+                if job.get("shm"):
+                    img = refine_cutout(take_shared_image(*job["shm"]), job_config)
+                    saved = encoder.submit(save_alpha, img, paths["alpha"], job_config)
+                else:
+                    img = Image.open(paths["alpha"]).convert("RGBA")
+
+                deadline_at = job.get("deadline") or image_deadline(job_config)
+                calls = vector_tasks(img, paths, deadline_at, job_config=job_config)
+                results = [call() for call in calls]
+                if saved is not None:
+                    saved.result()
+                    print(f"🖼 PNG Alpha OK (PRO): {os.path.basename(paths['alpha'])}")
+                output_dir = os.path.dirname(paths["alpha"])
+                done.put((job["file"], None, record_stage_report(output_dir, job["file"], results)))
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                traceback.print_exc()
+                done.put((job["file"], str(e), 0))
+
+
+# ----------------------------
+# Coordinador
+# ----------------------------
+
+
+class ProcessPipeline:
+    """
+    Reparte un lote entre `inference_processes` procesos con el modelo y
+    `vector_processes` workers de vectorización. `model_name`, `variant` y
+    `threads`, si se pasan, se aplican sobre `job_config` (el JobConfig del
+    lote); las entradas pueden traer el suyo como tupla (ruta, JobConfig).
+    """
+
+    def __init__(
+        self,
+        output_dir,
+        inference_processes=config.INFERENCE_PROCESSES,
+        vector_processes=config.VECTOR_PROCESSES,
+        queue_size=config.PIPELINE_QUEUE_SIZE,
+        model_name=None,
+        variant=None,
+        threads=None,
+        job_config=None,
+    ):
+        self.output_dir = output_dir
+        self.inference_processes = inference_processes
+        self.vector_processes = vector_processes
+        self.queue_size = queue_size
+        overrides = {
+            name: value
+            for name, value in (
+                ("AI_MODEL", model_name),
+                ("AI_MODEL_VARIANT", variant),
+                ("ORT_INTRA_OP_THREADS", threads),
+            )
+            if value is not None
+        }
+        self.job_config = resolve_config(job_config).replace(**overrides)
+        if not self.job_config.ORT_INTRA_OP_THREADS:
+            # Cada proceso de inferencia carga su sesión: repartir los núcleos
+            self.job_config = self.job_config.replace(
+                ORT_INTRA_OP_THREADS=default_intra_op_threads(inference_processes)
+            )
+        self.stats = {"done": 0, "skipped": 0, "failed": 0, "degraded": 0}
+        self._waiting = set()  # Archivos que aún no han salido de inferencia
+
+    def _collect(self, done, block):
+        """Lee resultados de `done`; devuelve cuántos se recibieron."""
+        received = 0
+        while True:
+            try:
+                file, error, degraded = done.get(timeout=1) if block else done.get_nowait()
+            except queue.Empty:
+                return received
+            received += 1
+            self.stats["degraded"] += degraded
+            if error is None:
+                self.stats["done"] += 1
+            else:
+                self.stats["failed"] += 1
+                print(f"❌ Error procesando {file}: {error}")
+            if block:
+                return received
+
+    def _fail(self, files, reason):
+        """Da por fallidos `files`; devuelve cuántos son."""
+        for file in files:
+            print(f"❌ Error procesando {file}: {reason}")
+        self.stats["failed"] += len(files)
+        return len(files)
+
+    def _lost(self, handed, inference, workers, pending):
+        """
+        Da por fallidos los trabajos que ya no van a terminar porque murieron
+        los procesos que los tenían y devuelve cuántos son: los `pending` si
+        no queda ningún worker, o los que no salieron de inferencia si no
+        queda ningún proceso de inferencia.
+        """
+        if not any(p.is_alive() for p in workers):
+            print("❌ Todos los workers han terminado con trabajos pendientes.")
+            self.stats["failed"] += pending
+            return pending
+        if not self._waiting or any(p.is_alive() for p in inference):
+            return 0
+        # Un proceso terminado ya ha volcado su cola: lo que salió está en `handed`
+        while True:
+            try:
+                self._waiting.discard(handed.get_nowait())
+            except queue.Empty:
+                break
+        lost = self._fail(sorted(self._waiting), "el proceso de inferencia ha terminado")
+        self._waiting.clear()
+        return lost
+
+    @staticmethod
+    def _put(target, item, processes):
+        """put() que se rinde si mueren todos los `processes` que leen `target`."""
+        while True:
+            try:
+                target.put(item, timeout=1)
+                return True
+            except queue.Full:
+                if not any(p.is_alive() for p in processes):
+                    return False
+
+    def run(self, input_paths):
+        """Procesa `input_paths` y devuelve las estadísticas del lote."""
+        start = time.perf_counter()
+        # spawn: los hilos de ONNX Runtime no sobreviven bien a un fork
+        ctx = multiprocessing.get_context("spawn")
+        requests = ctx.Queue(maxsize=self.queue_size)
+        tasks = ctx.Queue(maxsize=self.queue_size)
+        handed = ctx.Queue()
+        done = ctx.Queue()
+
+        inference = [
+            ctx.Process(
+                target=_inference_main,
+                args=(requests, tasks, handed, done, self.job_config),
+                daemon=True,
+            )
+            for _ in range(self.inference_processes)
+        ]
+        workers = [
+            ctx.Process(target=_worker_main, args=(tasks, done), daemon=True)
+            for _ in range(self.vector_processes)
+        ]
+        for process in inference + workers:
+            process.start()
+
+        # Bloques de memoria compartida de cada trabajo que pasa por
+        # inferencia: si un worker cae antes de recogerlo, se libera aquí
+        shared = []
+        submitted = received = 0
+        try:
+            for input_path, job_config in job_inputs(input_paths, self.job_config):
+                paths = output_paths(self.output_dir, input_path, job_config)
+                missing = missing_outputs(paths, job_config)
+                if not missing:
+                    self.stats["skipped"] += 1
+                    continue
+
+                print(f"\n📦 Processing: {os.path.basename(input_path)}...")
+                job = {
+                    "file": os.path.basename(input_path),
+                    "input_path": input_path,
+                    "paths": paths,
+                    "config": job_config,
+                }
+                submitted += 1
+                # Con el PNG alpha ya generado no hace falta pasar por el modelo
+                if "alpha" in missing:
+                    job["shm_name"] = f"tp{uuid.uuid4().hex[:12]}"
+                    shared.append(job["shm_name"])
+                    self._waiting.add(job["file"])
+                    sent = self._put(requests, job, inference)
+                else:
+                    sent = self._put(tasks, job, workers)
+                if not sent:
+                    self._waiting.discard(job["file"])
+                    received += self._fail([job["file"]], "no quedan procesos que lo atiendan")
+                received += self._collect(done, block=False)
+
+            for _ in inference:
+                self._put(requests, None, inference)
+            while received < submitted:
+                received += self._collect(done, block=True)
+                if received < submitted:
+                    received += self._lost(handed, inference, workers, submitted - received)
+
+            for _ in workers:
+                self._put(tasks, None, workers)
+        finally:
+            for process in inference + workers:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+            leaked = sum(release_shared_image(name) for name in shared)
+            if leaked:
+                print(f"🧹 {leaked} bloques de memoria compartida sin recoger liberados")
+
+        self.stats["seconds"] = time.perf_counter() - start
+        return self.stats
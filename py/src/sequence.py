@@ -0,0 +1,269 @@
+"""
+Modo secuencia: fotogramas numerados (giros de producto, clips exportados).
+
+Los fotogramas consecutivos se parecen mucho, así que en vez de tratarlos
+como imágenes sueltas se comparte el trabajo entre ellos:
+
+- Una sola sesión del modelo y un solo plan (el del primer fotograma).
+- Una paleta fija por preset de color (y otra para su modo degradado),
+  la del KMeans del primer fotograma que la necesita: los demás solo
+  asignan cada píxel al color más cercano, y los colores no "bailan" de un
+  fotograma a otro.
+- Sin inferencia cuando el fotograma apenas cambia respecto al último
+  fotograma inferido (fotograma clave): se reutiliza su máscara. Si lo que
+  cambia es un desplazamiento (cámara o producto que se mueve), se estima
+  con correlación de fase y se desplaza la máscara.
+- Cada capa de color solo se vuelve a trazar con potrace si su máscara ha
+  cambiado respecto al fotograma anterior.
+
+Cada SEQUENCE_KEYFRAME_INTERVAL fotogramas se fuerza la inferencia para
+que los errores no se acumulen.
+"""
+
+import os
+import re
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from src.generators.alpha import get_ai_session, refine_cutout, remove_background
+from src.generators.analysis import analyze_image
+from src.generators.encode import save_alpha
+from src.job_config import resolve_config
+from src.pipeline import (
+    VECTOR_STAGES,
+    image_deadline,
+    missing_outputs,
+    output_paths,
+    record_stage_report,
+    run_stage,
+)
+from src.planner import plan_stages, write_plan
+
+# nombre0001.png -> ("nombre", 1)
+_FRAME_RE = re.compile(r"^(.*?)(\d+)$")
+
+
+def frame_sequences(input_paths):
+    """
+    Agrupa las rutas en secuencias: mismo directorio, extensión y nombre
+    salvo el número final, ordenadas por ese número. Las rutas sin número
+    forman una secuencia de un solo fotograma.
+    """
+    groups = {}
+    for path in input_paths:
+        stem, ext = os.path.splitext(os.path.basename(path))
+        match = _FRAME_RE.match(stem)
+        if match:
+            key = (os.path.dirname(path), match.group(1), ext.lower())
+            groups.setdefault(key, []).append((int(match.group(2)), path))
+        else:
+            groups[(path,)] = [(0, path)]
+    return [[path for _, path in sorted(frames)] for _, frames in sorted(groups.items())]
+
+
+def _small_gray(img, size):
+    """Copia reducida en grises (float32) para comparar fotogramas."""
+    small = img.convert("L")
+    small.thumbnail((size, size), Image.Resampling.BILINEAR)
+    return np.asarray(small, dtype=np.float32)
+
+
+def _changed(a, b, delta):
+    """Fracción de píxeles que cambian más de `delta` niveles de gris."""
+    return float(np.count_nonzero(np.abs(a - b) > delta)) / a.size
+
+
+def _residual(moved, current, delta):
+    """
+    Como `_changed`, pero cada píxel se compara con el rango de su vecindario
+    3x3 en `moved`: el remuestreo subpíxel de los bordes no cuenta como cambio.
+    """
+    kernel = np.ones((3, 3), np.uint8)
+    low = cv2.erode(moved, kernel) - delta
+    high = cv2.dilate(moved, kernel) + delta
+    return float(np.count_nonzero((current < low) | (current > high))) / current.size
+
+
+def _shift(img, dx, dy, border):
+    """Desplaza un array 2D (dx, dy) píxeles."""
+    matrix = np.float32([[1, 0, dx], [0, 1, dy]])
+    height, width = img.shape
+    return cv2.warpAffine(
+        img, matrix, (width, height), flags=cv2.INTER_LINEAR, borderMode=border
+    )
+
+
+def _apply_mask(img, mask):
+    """Recorte RGBA de `img` con `mask` (L), como el de rembg."""
+    empty = Image.new("RGBA", img.size, 0)
+    return Image.composite(img.convert("RGBA"), empty, mask)
+
+
+class SequenceProcessor:
+    """
+    Procesa secuencias de fotogramas reutilizando máscara, plan, paleta y
+    trazados entre fotogramas. `run(frames)` procesa una secuencia (las
+    rutas en orden) y devuelve sus estadísticas; `stats` acumula todas.
+    """
+
+    def __init__(self, output_dir, session=None, job_config=None):
+        self.output_dir = output_dir
+        self.job_config = resolve_config(job_config)
+        self.session = session
+        self.stats = {
+            "frames": 0,
+            "skipped": 0,
+            "failed": 0,
+            "inferred": 0,
+            "reused": 0,
+            "warped": 0,
+            "degraded": 0,
+            "layers_traced": 0,
+            "layers_reused": 0,
+        }
+
+    # --- Máscara ---
+
+    def _mask(self, state, img):
+        """
+        Máscara (L) del fotograma `img`: la del fotograma clave, desplazada,
+        o la del modelo. Actualiza `state` y devuelve (máscara, modo).
+        """
+        job = self.job_config
+        small = _small_gray(img, job.SEQUENCE_ANALYSIS_SIZE)
+        key = state.get("key")
+        if (
+            key is not None
+            and key["size"] == img.size
+            and key["small"].shape == small.shape
+            and state["since_key"] < job.SEQUENCE_KEYFRAME_INTERVAL
+        ):
+            changed = _changed(key["small"], small, job.SEQUENCE_PIXEL_DELTA)
+            if changed <= job.SEQUENCE_REUSE_CHANGED:
+                state["since_key"] += 1
+                return key["mask"], "reused"
+
+            if job.SEQUENCE_WARP:
+                (dx, dy), _ = cv2.phaseCorrelate(key["small"], small)
+                moved = _shift(key["small"], dx, dy, cv2.BORDER_REPLICATE)
+                residual = _residual(moved, small, job.SEQUENCE_PIXEL_DELTA)
+                if residual <= job.SEQUENCE_WARP_CHANGED:
+                    # La copia reducida solo sirve para decidir: el
+                    # desplazamiento se mide a resolución completa
+                    gray = np.asarray(img.convert("L"), dtype=np.float32)
+                    (dx, dy), _ = cv2.phaseCorrelate(key["gray"], gray)
+                    mask = _shift(np.asarray(key["mask"]), dx, dy, cv2.BORDER_CONSTANT)
+                    state["since_key"] += 1
+                    return Image.fromarray(mask, mode="L"), "warped"
+
+        if self.session is None:
+            self.session = get_ai_session(job)
+        cutout = remove_background(img, session=self.session, job_config=job)
+        mask = cutout.getchannel("A")
+        state["key"] = {"size": img.size, "small": small, "mask": mask}
+        if job.SEQUENCE_WARP:
+            state["key"]["gray"] = np.asarray(img.convert("L"), dtype=np.float32)
+        state["since_key"] = 0
+        return mask, "inferred"
+
+    # --- Vectorización ---
+
+    def _stages(self, state, source, paths, file):
+        """
+        Etapas del fotograma: el plan sale del primero que llega aquí; los
+        demás guardan el mismo plan. Cada preset de color recibe su caché
+        de paleta y trazados, una para los argumentos normales y otra para
+        los degradados (la paleta se ajusta dentro de la etapa, con su plazo).
+        """
+        job = self.job_config
+        if "plan" not in state:
+            features = analyze_image(source, job_config=job) if job.PLAN_STAGES else {}
+            if job.PLAN_STAGES:
+                run, skipped = plan_stages(features, VECTOR_STAGES, job)
+            else:
+                run, skipped = list(VECTOR_STAGES), {}
+            state["plan"] = (features, run, skipped, file)
+            state["caches"] = {}
+            if skipped:
+                print(f"🧭 Plan: se omiten {', '.join(f'{k} ({v})' for k, v in skipped.items())}")
+
+        features, run, skipped, first = state["plan"]
+        if job.PLAN_STAGES:
+            write_plan(paths["plan"], features, run, skipped, sequence_plan_from=first)
+
+        def with_cache(key, name, kwargs, mode):
+            if kwargs is None or name != "generate_color_svg":
+                return kwargs
+            cache = state["caches"].setdefault((key, mode), {})
+            return {**kwargs, "trace_cache": cache}
+
+        return [
+            (
+                key,
+                name,
+                with_cache(key, name, kwargs, "normal"),
+                with_cache(key, name, degraded, "degraded"),
+            )
+            for key, name, kwargs, degraded in run
+        ]
+
+    # --- Ejecución ---
+
+    def _frame(self, state, input_path):
+        job = self.job_config
+        file = os.path.basename(input_path)
+        paths = output_paths(self.output_dir, file, job)
+        if not missing_outputs(paths, job):
+            self.stats["skipped"] += 1
+            # El siguiente fotograma no puede compararse con este: inferencia
+            state.pop("key", None)
+            return
+
+        print(f"\n🎞 Processing frame: {file}...")
+        deadline_at = image_deadline(job)
+        if os.path.exists(paths["alpha"]):
+            # Alpha ya refinado: sirve para vectorizar pero no como máscara clave
+            with Image.open(paths["alpha"]) as img:
+                source = img.convert("RGBA")
+            state.pop("key", None)
+        else:
+            with Image.open(input_path) as img:
+                img.load()
+                mask, mode = self._mask(state, img)
+                source = refine_cutout(_apply_mask(img, mask), job)
+            self.stats[mode] += 1
+            save_alpha(source, paths["alpha"], job)
+            print(f"🖼 PNG Alpha OK ({mode}): {os.path.basename(paths['alpha'])}")
+
+        results = [
+            run_stage(key, name, kwargs, degraded, source, paths[key], deadline_at, job)
+            for key, name, kwargs, degraded in self._stages(state, source, paths, file)
+        ]
+        self.stats["degraded"] += record_stage_report(self.output_dir, file, results)
+        self.stats["frames"] += 1
+
+    def run(self, frames):
+        """Procesa la secuencia `frames` (rutas en orden). Devuelve `stats`."""
+        state = {"since_key": 0}
+        for input_path in frames:
+            try:
+                self._frame(state, input_path)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                self.stats["failed"] += 1
+                state.pop("key", None)
+                print(f"❌ Error en el fotograma {os.path.basename(input_path)}: {e}")
+        for cache in state.get("caches", {}).values():
+            self.stats["layers_traced"] += cache.get("misses", 0)
+            self.stats["layers_reused"] += cache.get("hits", 0)
+        return self.stats
+
+    def run_all(self, input_paths):
+        """Agrupa `input_paths` en secuencias y las procesa todas."""
+        start = time.perf_counter()
+        for frames in frame_sequences(input_paths):
+            self.run(frames)
+        self.stats["seconds"] = time.perf_counter() - start
+        return self.stats
@@ -0,0 +1,57 @@
+"""
+Configuración común de los tests: la raíz de py/ en sys.path (para
+`import src...`) y una carpeta de caché temporal por test.
+"""
+
+import os
+import shutil
+import sys
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import config  # noqa: E402
+
+needs_potrace = pytest.mark.skipif(
+    shutil.which("potrace") is None, reason="potrace no está instalado"
+)
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """CACHE_DIR en una carpeta temporal: los tests no tocan ~/.transparente."""
+    path = tmp_path / "cache"
+    monkeypatch.setattr(config, "CACHE_DIR", str(path))
+    return path
+
+
+def fake_remove_background(source, session=None, job_config=None):
+    """Sustituto del modelo: el blanco puro pasa a ser transparente."""
+    if isinstance(source, bytes):
+        source = Image.open(BytesIO(source))
+    rgba = np.array(source.convert("RGBA"))
+    rgba[(rgba[..., :3] > 250).all(axis=-1), 3] = 0
+    return Image.fromarray(rgba)
+
+
+def draw_logo(path, size=(160, 120), offset=0):
+    """Guarda en `path` un logo sencillo de tres colores sobre blanco."""
+    img = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(img)
+    draw.ellipse((10 + offset, 10, 70 + offset, 70), fill=(200, 30, 30))
+    draw.rectangle((80 + offset, 20, 140 + offset, 90), fill=(30, 60, 200))
+    draw.rectangle((40 + offset, 80, 70 + offset, 110), fill=(20, 160, 40))
+    img.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    """Dos imágenes de entrada en tmp_path/in."""
+    folder = tmp_path / "in"
+    folder.mkdir()
+    return [draw_logo(folder / "a.png"), draw_logo(folder / "b.png", offset=8)]
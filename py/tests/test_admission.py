@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from src import config
+from src.admission import AdmissionController, MemoryModel, image_pixels
+
+
+@pytest.fixture
+def simple_model(monkeypatch):
+    """1 byte por píxel y sin coste fijo: los costes son los píxeles."""
+    monkeypatch.setattr(config, "MEMORY_BYTES_PER_PIXEL", 1)
+    monkeypatch.setattr(config, "MEMORY_JOB_OVERHEAD_MB", 0)
+    monkeypatch.setattr(config, "MEMORY_LEARN_RATE", 0.25)
+    return MemoryModel()
+
+
+def _image(tmp_path, name, size):
+    path = tmp_path / name
+    Image.new("RGB", size).save(path)
+    return str(path)
+
+
+def test_image_pixels(tmp_path):
+    assert image_pixels(_image(tmp_path, "a.png", (30, 20))) == 600
+
+
+def test_model_learns_and_persists(simple_model):
+    assert simple_model.estimate(1000) == 1000
+    simple_model.update(3.0)
+    # Media de las primeras medidas; después, media móvil (MEMORY_LEARN_RATE)
+    assert simple_model.bytes_per_pixel == pytest.approx(3.0)
+    simple_model.update(5.0)
+    assert simple_model.bytes_per_pixel == pytest.approx(4.0)
+    # Medidas absurdas se acotan a [inicial / 4, inicial * 8]
+    simple_model.update(1e9)
+    assert simple_model.bytes_per_pixel <= 8
+    simple_model.save()
+
+    loaded = MemoryModel()
+    assert loaded.samples == 3
+    assert loaded.bytes_per_pixel == pytest.approx(round(simple_model.bytes_per_pixel, 2))
+
+
+def test_model_ignores_corrupt_file(simple_model):
+    os.makedirs(os.path.dirname(simple_model.path))
+    with open(simple_model.path, "w", encoding="utf-8") as f:
+        f.write("{not json")
+    assert MemoryModel().bytes_per_pixel == 1.0
+
+
+def test_admission_waits_for_budget(tmp_path, simple_model):
+    path = _image(tmp_path, "a.png", (100, 100))  # 10000 bytes estimados
+    admission = AdmissionController(budget=15000, model=simple_model)
+    first = admission.acquire(path)
+
+    admitted = threading.Event()
+
+    def second():
+        with admission.admit(path):
+            admitted.set()
+
+    thread = threading.Thread(target=second)
+    thread.start()
+    time.sleep(0.05)
+    assert not admitted.is_set() and admission.waits == 1
+    admission.release(first)
+    thread.join(timeout=5)
+    assert admitted.is_set()
+    assert admission.in_use == 0 and admission.peak_in_use == 10000
+
+
+def test_oversized_job_runs_alone(tmp_path, simple_model):
+    path = _image(tmp_path, "big.png", (200, 200))
+    admission = AdmissionController(budget=1000, model=simple_model)
+    with admission.admit(path):
+        assert admission.in_use == 40000
+
+
+def test_unreadable_header_uses_minimum(tmp_path, simple_model):
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"nope")
+    admission = AdmissionController(budget=10, model=simple_model)
+    ticket = admission.acquire(str(broken))
+    assert admission.in_use == 0
+    admission.release(ticket)
@@ -0,0 +1,74 @@
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.generators import alpha
+
+from conftest import draw_logo, fake_remove_background
+
+
+def _shapes(height, width):
+    """Plano alpha con disco suave, rectángulo duro y semitransparencias."""
+    plane = np.zeros((height, width), np.uint8)
+    cv2.circle(plane, (width // 3, height // 2), min(height, width) // 4, 255, -1, lineType=cv2.LINE_AA)
+    plane[height // 8 : height // 4, width // 2 : width - 9] = 255
+    plane[-height // 6 :, : width // 5] = 128
+    return plane
+
+
+def _cutouts(tmp_path):
+    """Recortes como los del modelo: logos con borde suave y manchas irregulares."""
+    planes = []
+    for k, size in enumerate([(160, 120), (333, 251), (517, 389)]):
+        logo = Image.open(draw_logo(tmp_path / f"logo{k}.png", size=size, offset=k * 7))
+        plane = np.asarray(fake_remove_background(logo))[..., 3]
+        planes.append(cv2.GaussianBlur(plane, (0, 0), 1.3))
+    rng = np.random.default_rng(0)
+    for height, width in [(211, 389), (640, 97)]:
+        noise = cv2.GaussianBlur(rng.random((height, width), np.float32), (0, 0), 9)
+        soft = np.clip((noise - noise.mean()) * 40000 + 128, 0, 255)
+        planes.append(soft.astype(np.uint8))
+    return planes
+
+
+@pytest.mark.parametrize("size", [(97, 131), (200, 64), (64, 300), (150, 257)])
+@pytest.mark.parametrize("feather,blur,tile", [(2, 1, 32), (3, 2, 16), (0, 1, 48), (2, 0, 8)])
+def test_band_equals_full_plane(size, feather, blur, tile):
+    plane = _shapes(*size)
+    assert np.array_equal(
+        alpha._refine_band(plane, feather, blur, tile), alpha._refine_plane(plane, feather, blur)
+    )
+
+
+@pytest.mark.parametrize("feather,blur,tile", [(2, 1, 64), (2, 1, 16), (4, 3, 32), (1, 0.5, 8)])
+def test_band_equals_full_plane_on_cutouts(tmp_path, feather, blur, tile):
+    constant = 0
+    for plane in _cutouts(tmp_path):
+        band, _, _ = alpha.refine_band_mask(plane, feather, blur, tile)
+        constant += np.count_nonzero(~band)
+        assert np.array_equal(
+            alpha._refine_band(plane, feather, blur, tile),
+            alpha._refine_plane(plane, feather, blur),
+        )
+    assert constant > 0
+
+
+def test_refine_alpha_tile_is_equivalent():
+    rgba = np.zeros((120, 181, 4), np.uint8)
+    rgba[..., 3] = _shapes(120, 181)
+    img = Image.fromarray(rgba)
+    tiled = alpha.refine_alpha(img, feather=2, blur=1, tile=32)
+    full = alpha.refine_alpha(img, feather=2, blur=1, tile=0)
+    assert np.array_equal(np.asarray(tiled), np.asarray(full))
+
+
+def test_band_mask_covers_edges_only():
+    plane = np.zeros((512, 512), np.uint8)
+    plane[128:384, 128:384] = 255
+    band, low, tile = alpha.refine_band_mask(plane, 2, 1, 32)
+    assert tile == 32 and band.shape == low.shape == (16, 16)
+    assert 0 < band.mean() < 0.5
+    # Centro del cuadrado y esquinas: constantes
+    assert not band[8, 8] and not band[0, 0] and not band[-1, -1]
+    assert band[3, 8] and band[8, 12]
@@ -0,0 +1,89 @@
+import numpy as np
+from PIL import Image
+
+from src.generators.svg import SvgWriter, parse_color
+from tools import bench_ports
+
+# Cuadrado de 40x40 en (10, 10), como lo escribe potrace: coordenadas x10 y
+# el eje y invertido por el transform del grupo
+_POTRACE_D = "M100 900 l400 0 0 -400 -400 0 z"
+_POTRACE_TRANSFORM = "translate(0,100) scale(0.1,-0.1)"
+
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def _potrace_svg(tmp_path):
+    return _write(
+        tmp_path / "potrace.svg",
+        '<svg width="100" height="100" viewBox="0 0 100 100">\n'
+        f'<g transform="{_POTRACE_TRANSFORM}" fill="#000000" stroke="none">\n'
+        f'<path d="{_POTRACE_D}"/>\n</g>\n</svg>\n',
+    )
+
+
+def test_parse_color():
+    assert parse_color("#c03030") == (192, 48, 48)
+    assert parse_color("#fff") == (255, 255, 255)
+    assert parse_color("black") == (0, 0, 0)
+    assert parse_color("none") is None
+
+
+def test_writer_and_potrace_rasterize_alike(tmp_path):
+    writer = SvgWriter(100, 100, simplify=0)
+    writer.add_path(_POTRACE_D, "#000000", _POTRACE_TRANSFORM)
+    ours = str(tmp_path / "writer.svg")
+    writer.save(ours)
+
+    a = bench_ports.rasterize(ours, size=100)
+    b = bench_ports.rasterize(_potrace_svg(tmp_path), size=100)
+    assert a.shape == b.shape == (100, 100, 3)
+    assert bench_ports.pixel_difference(a, b) < 0.005
+    # El cuadrado está donde debe: (10, 10)-(50, 50), no reflejado
+    assert (a[20:40, 20:40] == 0).all() and (a[60:, :] == 255).all()
+    assert bench_ports.count_paths(ours) == bench_ports.count_paths(str(tmp_path / "potrace.svg")) == 1
+
+
+def test_halftone_arcs_match_circles(tmp_path):
+    circles = [(20, 20, 6), (50, 70, 9), (80, 30, 3)]
+    writer = SvgWriter(100, 100)
+    writer.add_circles(circles, "#000")
+    arcs = str(tmp_path / "arcs.svg")
+    writer.save(arcs)
+    plain = _write(
+        tmp_path / "circles.svg",
+        '<svg width="100" height="100">\n'
+        '<rect width="100%" height="100%" fill="white"/>\n'
+        + "".join(f'<circle cx="{x}" cy="{y}" r="{r}" fill="#000" />\n' for x, y, r in circles)
+        + "</svg>\n",
+    )
+    assert bench_ports.count_paths(arcs) == bench_ports.count_paths(plain) == 3
+    a, b = bench_ports.rasterize(arcs, size=100), bench_ports.rasterize(plain, size=100)
+    assert bench_ports.pixel_difference(a, b) < 0.002
+    assert (a < 128).any()
+
+
+def test_stage_times_from_log():
+    outputs = {file: bench_ports.rust_outputs("out", file) for file in ("a.png", "b.png")}
+    events = [
+        (0.0, '📦 Processing: "a.png"...'),
+        (1.0, '✅ Alpha OK: "a_alpha.png"'),
+        (1.5, '✅ SVG OK: "a_alpha_gray.svg"'),
+        (2.0, '📦 Processing: "b.png"...'),
+        (2.25, '✅ Alpha OK: "b_alpha.png"'),
+        (3.0, '✅ Thumb OK: "b_alpha_thumb.png"'),
+    ]
+    times = bench_ports.stage_times(events, ["a.png", "b.png"], outputs)
+    assert times == {"a.png": {"alpha": 1.0, "gray": 0.5}, "b.png": {"alpha": 0.25, "thumb": 0.75}}
+
+
+def test_alpha_iou(tmp_path):
+    rgba = np.zeros((20, 20, 4), np.uint8)
+    rgba[:10, :, 3] = 255
+    Image.fromarray(rgba).save(tmp_path / "a.png")
+    rgba[:, :10, 3] = 255
+    Image.fromarray(rgba).save(tmp_path / "b.png")
+    # 200 píxeles en común de 300 en la unión
+    assert bench_ports.alpha_iou(str(tmp_path / "a.png"), str(tmp_path / "b.png")) == 200 / 300
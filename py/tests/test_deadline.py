@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src import generators
+from src.generators import color
+from src.generators.deadline import (
+    StageTimeout,
+    check_deadline,
+    deadline,
+    iterations_within,
+    remaining,
+)
+from src.job_config import JobConfig
+from src.pipeline import record_stage_report, run_stage
+
+
+def test_nested_deadlines_keep_the_strictest():
+    assert remaining() is None
+    with deadline(10):
+        with deadline(60):
+            assert remaining() <= 10
+        with deadline(None):
+            assert remaining() <= 10
+        with deadline(1):
+            assert remaining() <= 1
+    assert remaining() is None
+
+
+def test_check_deadline_raises_when_expired():
+    with deadline(0.01):
+        time.sleep(0.02)
+        with pytest.raises(StageTimeout):
+            check_deadline()
+    check_deadline()
+
+
+def test_iterations_within_the_deadline():
+    assert iterations_within(1.0, 300) == 300
+    with deadline(10):
+        assert iterations_within(0.001, 300) == 300
+        assert 5 <= iterations_within(1.0, 300) <= 10
+        assert iterations_within(1.0, 300, reserve=2) <= 8
+        with pytest.raises(StageTimeout):
+            iterations_within(20.0, 300)
+
+
+def test_kmeans_iterations_follow_the_budget():
+    pixels = np.random.default_rng(0).integers(0, 256, (20000, 3), dtype=np.uint8)
+    assert color._kmeans_max_iter(pixels, 16, 10) == 300
+    with deadline(600):
+        assert color._kmeans_max_iter(pixels, 16, 10) == 300
+    with deadline(1e-6):
+        with pytest.raises(StageTimeout):
+            color._kmeans_max_iter(pixels, 16, 10)
+
+
+def test_deadlines_are_per_thread():
+    seen = []
+    with deadline(5):
+        thread = threading.Thread(target=lambda: seen.append(remaining()))
+        thread.start()
+        thread.join()
+    assert seen == [None]
+
+
+@pytest.fixture
+def fake_generator(monkeypatch):
+    """Generador que no termina hasta que vence el plazo si `slow`."""
+    calls = []
+
+    def generate(source, output_path, job_config=None, slow=False):
+        calls.append((slow, remaining()))
+        while slow:
+            check_deadline()
+            time.sleep(0.005)
+
+    monkeypatch.setattr(generators, "fake_generator", generate, raising=False)
+    return calls
+
+
+JOB = JobConfig(STAGE_TIMEOUT=0.05, STAGE_TIMEOUT_DEGRADED=0.05)
+
+
+def test_run_stage_ok(fake_generator):
+    result = run_stage("k", "fake_generator", {}, None, None, "out", None, JOB)
+    assert result["status"] == "ok" and len(fake_generator) == 1
+
+
+def test_run_stage_degraded_retry(fake_generator):
+    result = run_stage("k", "fake_generator", {"slow": True}, {}, None, "out", None, JOB)
+    assert result["status"] == "degraded"
+    assert [slow for slow, _ in fake_generator] == [True, False]
+
+
+def test_run_stage_times_out_without_degraded(fake_generator):
+    result = run_stage("k", "fake_generator", {"slow": True}, None, None, "out", None, JOB)
+    assert result["status"] == "timeout"
+
+
+def test_retry_stays_inside_image_deadline(fake_generator):
+    job = JobConfig(STAGE_TIMEOUT=0.05, STAGE_TIMEOUT_DEGRADED=30)
+    run_stage("k", "fake_generator", {"slow": True}, {}, None, "out", time.time() + 1, job)
+    # El reintento no recibe sus 30 s: solo lo que queda de la imagen
+    assert fake_generator[1][1] < 1
+
+
+def test_no_retry_once_image_deadline_is_spent(fake_generator):
+    job = JobConfig(STAGE_TIMEOUT=30, STAGE_TIMEOUT_DEGRADED=30)
+    deadline_at = time.time() + 0.05
+    result = run_stage(
+        "k", "fake_generator", {"slow": True}, {}, None, "out", deadline_at, job
+    )
+    assert result["status"] == "timeout"
+    assert len(fake_generator) == 1
+
+
+def test_record_stage_report(tmp_path):
+    results = [
+        {"stage": "gray", "status": "ok", "seconds": 1.0},
+        {"stage": "color_logo", "status": "degraded", "seconds": 2.0},
+        {"stage": "halftone", "status": "timeout", "seconds": 3.0},
+    ]
+    assert record_stage_report(str(tmp_path), "a.png", results) == 2
+    with open(tmp_path / "stage_report.jsonl", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [(r["file"], r["stage"], r["status"]) for r in records] == [
+        ("a.png", "color_logo", "degraded"),
+        ("a.png", "halftone", "timeout"),
+    ]
+    assert record_stage_report(str(tmp_path), "b.png", results[:1]) == 0
@@ -0,0 +1,82 @@
+import os
+import random
+import shutil
+
+from PIL import Image
+
+from conftest import draw_logo
+from src.dedup import BKTree, find_duplicates, hamming, link_duplicates, perceptual_hash
+from src.pipeline import output_files, output_paths
+
+
+def test_bktree_matches_brute_force():
+    rng = random.Random(7)
+    keys = [rng.getrandbits(64) for _ in range(300)]
+    tree = BKTree()
+    for k, key in enumerate(keys):
+        tree.add(key, k)
+    for _ in range(50):
+        # Mitad cerca de una clave existente, mitad al azar
+        query = rng.choice(keys) ^ 0b1011 if rng.random() < 0.5 else rng.getrandbits(64)
+        best = min(hamming(query, key) for key in keys)
+        for threshold in (0, 4, 24):
+            found = tree.nearest(query, threshold)
+            if best > threshold:
+                assert found is None
+            else:
+                assert found == (best, found[1])
+                assert hamming(query, keys[found[1]]) == best
+
+
+def test_empty_tree():
+    assert BKTree().nearest(123, 10) is None
+
+
+def test_phash_survives_resize_and_recompression(tmp_path):
+    original = draw_logo(tmp_path / "a.png", size=(320, 240))
+    with Image.open(original) as img:
+        img.resize((200, 150), Image.Resampling.LANCZOS).save(tmp_path / "b.jpg", quality=80)
+    other = draw_logo(tmp_path / "c.png", size=(320, 240), offset=120)
+    assert hamming(perceptual_hash(original), perceptual_hash(str(tmp_path / "b.jpg"))) <= 6
+    assert hamming(perceptual_hash(original), perceptual_hash(other)) > 6
+
+
+def test_find_duplicates(tmp_path):
+    a = draw_logo(tmp_path / "a.png")
+    b = str(tmp_path / "b.png")
+    shutil.copy(a, b)
+    with Image.open(a) as img:
+        img.save(tmp_path / "c.jpg", quality=85)
+    d = draw_logo(tmp_path / "d.png", offset=60)
+    broken = tmp_path / "e.png"
+    broken.write_bytes(b"not an image")
+
+    paths = [d, str(tmp_path / "c.jpg"), b, a, str(broken)]
+    canonicals, duplicates = find_duplicates(paths, threshold=6, workers=2)
+    assert canonicals == [a, d, str(broken)]
+    assert duplicates[b] == {"canonical": a, "distance": 0, "exact": True}
+    assert duplicates[str(tmp_path / "c.jpg")]["canonical"] == a
+    assert not duplicates[str(tmp_path / "c.jpg")]["exact"]
+
+    # Con threshold < 0 solo cuentan las copias exactas
+    _, exact_only = find_duplicates(paths, threshold=-1, workers=2)
+    assert list(exact_only) == [b]
+
+
+def test_link_duplicates(tmp_path):
+    out = str(tmp_path)
+    source = output_paths(out, "a.png")
+    for files in output_files(source).values():
+        for path in files:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(os.path.basename(path))
+
+    duplicates = {
+        "b.png": {"canonical": "a.png", "distance": 0, "exact": True},
+        "x.png": {"canonical": "missing.png", "distance": 2, "exact": False},
+    }
+    assert link_duplicates(out, duplicates) == ["x.png"]
+    for key, files in output_files(output_paths(out, "b.png")).items():
+        for target, origin in zip(files, output_files(source)[key]):
+            with open(target, encoding="utf-8") as f:
+                assert f.read() == os.path.basename(origin)
@@ -0,0 +1,200 @@
+import os
+import threading
+import time
+
+from src.distributed import DistributedWorker, LeaseDir
+from src.job_config import JobConfig
+from src.pipeline import output_files, output_paths
+
+
+def test_claim_is_exclusive(tmp_path):
+    leases = LeaseDir(str(tmp_path), ttl=60)
+    token = leases.claim("a.png", "node-1")
+    assert token is not None
+    assert leases.claim("a.png", "node-2") is None
+    assert leases.state("a.png") == "leased"
+    assert leases.owns("a.png", token) and leases.heartbeat("a.png", token)
+    assert not leases.owns("a.png", "other-token")
+
+
+def test_release_leaves_marker(tmp_path):
+    leases = LeaseDir(str(tmp_path), ttl=60)
+    token = leases.claim("a.png", "node-1")
+    leases.release("a.png", token, "failed", "node-1: boom")
+    assert leases.state("a.png") == "failed"
+    assert not os.path.exists(leases._file("a.png", "lease"))
+
+    # Sin estado, el lease solo se libera
+    token = leases.claim("b.png", "node-1")
+    leases.release("b.png", token)
+    assert leases.state("b.png") is None
+
+
+def test_stale_lease_is_broken(tmp_path):
+    leases = LeaseDir(str(tmp_path), ttl=30)
+    old = leases.claim("a.png", "crashed")
+    lease = leases._file("a.png", "lease")
+    past = time.time() - 60
+    os.utime(lease, (past, past))
+
+    token = leases.claim("a.png", "node-2")
+    assert token is not None and token != old
+    assert leases.owns("a.png", token)
+    assert not leases.heartbeat("a.png", old)
+    # Ni la lápida ni nada más queda en la carpeta
+    assert sorted(os.listdir(leases.path)) == ["a.png.lease"]
+
+
+def _fake_process(output_dir, calls, job_config=None):
+    def process(input_path):
+        calls.append(os.path.basename(input_path))
+        paths = output_paths(output_dir, input_path, job_config)
+        for files in output_files(paths, job_config).values():
+            for path in files:
+                open(path, "wb").close()
+
+    return process
+
+
+def test_workers_share_the_batch(tmp_path):
+    inputs = [str(tmp_path / f"img{k}.png") for k in range(12)]
+    out = str(tmp_path / "out")
+    os.makedirs(out)
+    calls = []
+    workers = [DistributedWorker(out, node_id=f"node-{k}", poll=0.01) for k in range(3)]
+    threads = [
+        threading.Thread(target=w.run, args=(inputs, _fake_process(out, calls)))
+        for w in workers
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(calls) == sorted(os.path.basename(p) for p in inputs)
+    assert sum(w.stats["done"] for w in workers) == len(inputs)
+    assert all(LeaseDir(out).state(os.path.basename(p)) == "done" for p in inputs)
+
+
+def test_failed_image_is_retried_up_to_max_attempts(tmp_path, capsys):
+    out = str(tmp_path / "out")
+    os.makedirs(out)
+    calls = []
+
+    def broken(input_path):
+        calls.append(input_path)
+        raise RuntimeError("boom")
+
+    for node in ("n1", "n2", "n3", "n4"):
+        worker = DistributedWorker(out, node_id=node, poll=0.01)
+        worker.leases.max_attempts = 3
+        stats = worker.run(["x.png"], broken)
+        assert stats["failed"] == 1
+    assert len(calls) == 3
+    assert worker.leases.failures("x.png") == 3
+    assert "ya falló 3 veces" in capsys.readouterr().out
+
+    # Un fallo antiguo ya no cuenta
+    worker.leases.failed_ttl = 0
+    assert worker.leases.should_retry("x.png")
+    calls = []
+    stats = worker.run(["x.png"], _fake_process(out, calls))
+    assert calls == ["x.png"] and stats["done"] == 1
+    assert worker.leases.state("x.png") == "done"
+
+
+def test_outputs_decide_over_done_marker(tmp_path):
+    out = str(tmp_path / "out")
+    os.makedirs(out)
+    calls = []
+    DistributedWorker(out, node_id="n1", poll=0.01).run(["x.png"], _fake_process(out, calls))
+    stats = DistributedWorker(out, node_id="n1", poll=0.01).run(
+        ["x.png"], _fake_process(out, calls)
+    )
+    assert stats["skipped"] == 1 and calls == ["x.png"]
+
+    # Se borra una salida: se regenera aunque exista .done
+    os.remove(output_paths(out, "x.png")["gray"])
+    stats = DistributedWorker(out, node_id="n2", poll=0.01).run(
+        ["x.png"], _fake_process(out, calls)
+    )
+    assert stats["done"] == 1 and calls == ["x.png", "x.png"]
+
+
+def test_worker_uses_the_job_config(tmp_path):
+    out = str(tmp_path / "out")
+    os.makedirs(out)
+    job = JobConfig(ALPHA_FORMAT="webp", THUMB_WIDTHS=(150,))
+    calls = []
+    DistributedWorker(out, node_id="n1", poll=0.01, job_config=job).run(
+        ["x.png"], _fake_process(out, calls, job)
+    )
+    # Las salidas del trabajo (alpha .webp) cuentan como hechas
+    stats = DistributedWorker(out, node_id="n2", poll=0.01, job_config=job).run(
+        ["x.png"], _fake_process(out, calls, job)
+    )
+    assert stats["skipped"] == 1 and calls == ["x.png"]
+    # Con la configuración por defecto falta el alpha .png
+    stats = DistributedWorker(out, node_id="n3", poll=0.01).run(
+        ["x.png"], _fake_process(out, calls)
+    )
+    assert stats["done"] == 1 and calls == ["x.png", "x.png"]
+
+
+def _stale_lease(leases, key, node):
+    token = leases.claim(key, node)
+    past = time.time() - 60
+    os.utime(leases._file(key, "lease"), (past, past))
+    return token
+
+
+def test_reclaimed_lease_is_put_back(tmp_path, monkeypatch):
+    leases = LeaseDir(str(tmp_path), ttl=30)
+    _stale_lease(leases, "a.png", "crashed")
+    lease = leases._file("a.png", "lease")
+    read = leases._read
+    state = {}
+
+    def racing_read(path):
+        data = read(path)
+        if path == lease and "other" not in state:
+            # Otro nodo rompe el lease caducado y lo reclama justo después
+            # de que este nodo lo lea
+            os.remove(lease)
+            state["other"] = LeaseDir(str(tmp_path), ttl=30).claim("a.png", "other")
+        return data
+
+    monkeypatch.setattr(leases, "_read", racing_read)
+    assert leases.claim("a.png", "late") is None
+    assert leases.owns("a.png", state["other"])
+    assert sorted(os.listdir(leases.path)) == ["a.png.lease"]
+
+
+def test_lost_put_back_is_not_claimed(tmp_path, monkeypatch):
+    leases = LeaseDir(str(tmp_path), ttl=30)
+    _stale_lease(leases, "a.png", "crashed")
+    lease = leases._file("a.png", "lease")
+    other = LeaseDir(str(tmp_path), ttl=30)
+    read = leases._read
+    link = os.link
+    state = {}
+
+    def racing_read(path):
+        data = read(path)
+        if path == lease and "other" not in state:
+            os.remove(lease)
+            state["other"] = other.claim("a.png", "other")
+        return data
+
+    def racing_link(src, dst):
+        # Un tercer nodo crea su lease entre el rename y el link
+        state["third"] = other.claim("a.png", "third")
+        link(src, dst)
+
+    monkeypatch.setattr(leases, "_read", racing_read)
+    monkeypatch.setattr(os, "link", racing_link)
+    assert leases.claim("a.png", "late") is None
+    assert state["third"] is not None and other.owns("a.png", state["third"])
+    # El nodo desplazado lo detecta en su latido
+    assert not other.heartbeat("a.png", state["other"])
+    assert sorted(os.listdir(leases.path)) == ["a.png.lease"]
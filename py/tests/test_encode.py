@@ -0,0 +1,63 @@
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.generators.encode import alpha_extension, encode_alpha, save_alpha, write_atomic
+from src.job_config import JobConfig
+
+
+def _cutout():
+    rgba = np.zeros((48, 64, 4), np.uint8)
+    rgba[8:40, 8:56] = (200, 30, 30, 255)
+    rgba[20:28, 20:44] = (30, 60, 200, 128)
+    return Image.fromarray(rgba)
+
+
+@pytest.mark.parametrize(
+    "fmt, strategy",
+    [("png", s) for s in ("default", "filtered", "huffman", "rle", "fixed")]
+    + [("webp", "default")],
+)
+def test_lossless_formats_round_trip(fmt, strategy):
+    img = _cutout()
+    data = encode_alpha(img, fmt=fmt, compress_level=1, strategy=strategy)
+    decoded = Image.open(BytesIO(data))
+    assert decoded.format == ("WEBP" if fmt == "webp" else "PNG")
+    original = np.asarray(img)
+    visible = original[..., 3] > 0
+    result = np.asarray(decoded.convert("RGBA"))
+    # WebP (exact=False) puede cambiar el RGB de los píxeles transparentes
+    assert np.array_equal(result[..., 3], original[..., 3])
+    assert np.array_equal(result[visible], original[visible])
+
+
+def test_png8_keeps_alpha():
+    data = encode_alpha(_cutout(), fmt="png8", palette_colors=16)
+    decoded = Image.open(BytesIO(data))
+    assert decoded.mode == "P"
+    alpha = np.asarray(decoded.convert("RGBA"))[..., 3]
+    assert set(np.unique(alpha)) == {0, 128, 255}
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        alpha_extension("gif")
+    with pytest.raises(ValueError):
+        encode_alpha(_cutout(), fmt="gif")
+
+
+def test_save_alpha_uses_job_format(tmp_path):
+    path = tmp_path / "x_alpha.webp"
+    written = save_alpha(_cutout(), str(path), JobConfig(ALPHA_FORMAT="webp"))
+    assert written == path.stat().st_size
+    assert Image.open(path).format == "WEBP"
+
+
+def test_write_atomic_leaves_no_temporary(tmp_path):
+    path = tmp_path / "out.bin"
+    write_atomic(str(path), b"first")
+    write_atomic(str(path), b"second")
+    assert path.read_bytes() == b"second"
+    assert [p.name for p in tmp_path.iterdir()] == ["out.bin"]
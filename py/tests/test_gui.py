@@ -0,0 +1,64 @@
+import os
+import queue
+import threading
+
+import pytest
+
+from src import config, generators, gui
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    """La parte de ImageProcessorGUI que corre fuera de Tk, sin ventana."""
+    monkeypatch.setattr(config, "MEMORY_ADMISSION", False)
+    app = gui.ImageProcessorGUI.__new__(gui.ImageProcessorGUI)
+    app.events = queue.Queue()
+    return app
+
+
+def _events(app):
+    events = []
+    while not app.events.empty():
+        events.append(app.events.get())
+    return events
+
+
+def test_list_images(tmp_path):
+    for name in ("b.PNG", "a.jpg", "c.txt", "d.temp.png", "e.vtrace_temp.png"):
+        (tmp_path / name).write_bytes(b"")
+    names = [os.path.basename(p) for p in gui.list_images(str(tmp_path))]
+    assert names == ["a.jpg", "b.PNG"]
+
+
+def test_batch_reports_each_file(worker, tmp_path, monkeypatch):
+    seen = []
+
+    def fail_alpha(input_path, output_path, executor=None, job_config=None):
+        seen.append(threading.current_thread().name)
+        raise RuntimeError(f"sin modelo para {input_path}")
+
+    monkeypatch.setattr(config, "GUI_WORKERS", 2)
+    monkeypatch.setattr(generators, "generate_alpha_png", fail_alpha)
+    paths = [str(tmp_path / f"{k}.png") for k in range(4)]
+    worker._run_job(7, threading.Event(), paths, str(tmp_path), preview=False)
+
+    events = _events(worker)
+    assert all(run_id == 7 for run_id, _, _ in events)
+    done = {payload[0]: payload[1] for _, kind, payload in events if kind == "file_done"}
+    assert sorted(done) == paths
+    assert all("sin modelo" in error for error in done.values())
+    assert [kind for _, kind, _ in events[-2:]] == ["done", "finished"]
+    assert len(set(seen)) <= 2
+
+
+def test_cancelled_batch_does_not_start_files(worker, tmp_path, monkeypatch):
+    monkeypatch.setattr(generators, "generate_alpha_png", pytest.fail)
+    cancel = threading.Event()
+    cancel.set()
+    paths = [str(tmp_path / "a.png"), str(tmp_path / "b.png")]
+    worker._run_job(1, cancel, paths, str(tmp_path), preview=False)
+
+    events = _events(worker)
+    done = [payload for _, kind, payload in events if kind == "file_done"]
+    assert sorted(done) == [(p, "cancelado") for p in paths]
+    assert "done" not in [kind for _, kind, _ in events]
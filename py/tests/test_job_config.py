@@ -0,0 +1,152 @@
+import pickle
+import threading
+import time
+
+import pytest
+
+from src import config, preview
+from src.generators import session
+from src.job_config import JobConfig, resolve_config
+from src.process_pipeline import ProcessPipeline
+
+
+def test_defaults_and_overrides():
+    job = JobConfig(ALPHA_FEATHER=0)
+    assert job.ALPHA_FEATHER == 0
+    assert job.AI_MODEL == config.AI_MODEL
+    assert job.overrides == {"ALPHA_FEATHER": 0}
+    assert repr(job) == "JobConfig(ALPHA_FEATHER=0)"
+    with pytest.raises(ValueError, match="NOT_A_SETTING"):
+        JobConfig(NOT_A_SETTING=1)
+    with pytest.raises(AttributeError):
+        job.NOT_A_SETTING
+
+
+def test_immutable():
+    job = JobConfig()
+    with pytest.raises(AttributeError):
+        job.ALPHA_FEATHER = 3
+    with pytest.raises(AttributeError):
+        del job.ALPHA_FEATHER
+
+
+def test_snapshot_of_config(monkeypatch):
+    job = JobConfig()
+    monkeypatch.setattr(config, "ALPHA_FEATHER", 99)
+    assert job.ALPHA_FEATHER != 99
+    assert JobConfig().ALPHA_FEATHER == 99
+    assert resolve_config(None).ALPHA_FEATHER == 99
+    assert resolve_config(job) is job
+
+
+def test_replace():
+    job = JobConfig(ALPHA_FEATHER=0)
+    other = job.replace(MIN_ALPHA=100)
+    assert (other.ALPHA_FEATHER, other.MIN_ALPHA) == (0, 100)
+    assert other.overrides == {"ALPHA_FEATHER": 0, "MIN_ALPHA": 100}
+    assert job.MIN_ALPHA == config.MIN_ALPHA
+    with pytest.raises(ValueError):
+        job.replace(NOT_A_SETTING=1)
+
+
+def test_equality_and_hash():
+    assert JobConfig(MIN_ALPHA=5) == JobConfig().replace(MIN_ALPHA=5)
+    assert JobConfig(MIN_ALPHA=5) != JobConfig(MIN_ALPHA=6)
+    assert len({JobConfig(), JobConfig(), JobConfig(MIN_ALPHA=5)}) == 2
+
+
+def test_pickle_keeps_all_values(monkeypatch):
+    job = JobConfig(THUMB_WIDTHS=(150,))
+    data = pickle.dumps(job)
+    # El proceso que lo recibe puede tener otro src/config.py
+    monkeypatch.setattr(config, "ALPHA_FEATHER", 99)
+    restored = pickle.loads(data)
+    assert restored == job
+    assert restored.ALPHA_FEATHER != 99
+    assert restored.overrides == {"THUMB_WIDTHS": (150,)}
+
+
+# ----------------------------
+# Registro de sesiones
+# ----------------------------
+
+
+@pytest.fixture
+def fake_sessions(monkeypatch):
+    """create_ai_session sin modelo: anota las cargas y devuelve un objeto."""
+    loads = []
+
+    def create(**options):
+        loads.append(options["model_name"])
+        time.sleep(0.01)
+        return object()
+
+    monkeypatch.setattr(session, "create_ai_session", create)
+    monkeypatch.setattr(session, "_SESSIONS", type(session._SESSIONS)())
+    monkeypatch.setattr(session, "_LOAD_LOCKS", {})
+    return loads
+
+
+def _options(model_name):
+    return {**session.session_options(JobConfig()), "model_name": model_name}
+
+
+def test_session_loaded_once_across_threads(fake_sessions):
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(session.get_session(**_options("a"))))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert fake_sessions == ["a"]
+    assert len({id(r) for r in results}) == 1
+    assert session.cached_session(**_options("a")) is results[0]
+    assert session.cached_session(**_options("b")) is None
+
+
+def test_session_registry_is_bounded(fake_sessions, monkeypatch):
+    monkeypatch.setattr(config, "ORT_MAX_SESSIONS", 2)
+    for name in ("a", "b", "a", "c", "b"):
+        session.get_session(**_options(name))
+    # "b" fue la menos usada cuando llegó "c": se vuelve a cargar
+    assert fake_sessions == ["a", "b", "c", "b"]
+    assert session.cached_session(**_options("a")) is None
+    assert session.cached_session(**_options("c")) is not None
+
+
+def test_preview_remembers_failed_light_model(monkeypatch):
+    attempts = []
+
+    def broken(**options):
+        attempts.append(options["model_name"])
+        raise RuntimeError("sin descarga")
+
+    monkeypatch.setattr(preview, "_UNAVAILABLE", set())
+    monkeypatch.setattr(preview, "get_session", broken)
+    monkeypatch.setattr(preview, "get_ai_session", lambda job: "principal")
+    assert preview.get_preview_session() == "principal"
+    assert preview.get_preview_session() == "principal"
+    assert attempts == [config.PREVIEW_AI_MODEL]
+
+
+# ----------------------------
+# ProcessPipeline
+# ----------------------------
+
+
+def test_process_pipeline_keeps_job_settings():
+    job = JobConfig(AI_MODEL="u2netp", AI_MODEL_VARIANT="int8", ORT_INTRA_OP_THREADS=3)
+    assert ProcessPipeline("out", job_config=job).job_config == job
+
+    changed = ProcessPipeline("out", variant="fp32", threads=2, job_config=job).job_config
+    assert changed.AI_MODEL == "u2netp"
+    assert (changed.AI_MODEL_VARIANT, changed.ORT_INTRA_OP_THREADS) == ("fp32", 2)
+
+
+def test_process_pipeline_splits_threads(monkeypatch):
+    monkeypatch.setattr("os.cpu_count", lambda: 8)
+    job = ProcessPipeline("out", inference_processes=2, job_config=JobConfig()).job_config
+    assert job.ORT_INTRA_OP_THREADS == 4
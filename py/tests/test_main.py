@@ -0,0 +1,37 @@
+import argparse
+import os
+
+import main
+from conftest import fake_remove_background, needs_potrace
+from src.generators import alpha
+from src.pipeline import output_files, output_paths
+
+
+def _serial():
+    return argparse.Namespace(
+        distributed=False, sequence=False, serial=True, sync_alpha=True
+    )
+
+
+def _broken_model(source, session=None, job_config=None):
+    raise RuntimeError("modelo no disponible")
+
+
+def test_serial_batch_skips_finished_images(tmp_path, inputs, monkeypatch):
+    monkeypatch.setattr(alpha, "remove_background", _broken_model)
+    out = str(tmp_path / "out")
+    os.makedirs(out)
+    for files in output_files(output_paths(out, inputs[0])).values():
+        for path in files:
+            open(path, "wb").close()
+    # La primera ya está hecha y la segunda se queda sin alpha: ninguna cuenta
+    assert main.run_batch(_serial(), inputs, out) == 0
+
+
+@needs_potrace
+def test_serial_batch_counts_processed_images(tmp_path, inputs, monkeypatch):
+    monkeypatch.setattr(alpha, "remove_background", fake_remove_background)
+    out = str(tmp_path / "out")
+    os.makedirs(out)
+    assert main.run_batch(_serial(), inputs[:1], out) == 1
+    assert main.run_batch(_serial(), inputs, out) == 1
@@ -0,0 +1,41 @@
+import cv2
+import numpy as np
+
+from src.generators.masks import blur_mask, iter_label_masks
+
+
+def _labels():
+    rng = np.random.default_rng(3)
+    return rng.integers(-1, 7, (41, 67)).astype(np.int16)
+
+
+def test_masks_follow_potrace_convention():
+    label_img = np.full((8, 8), -1, np.int16)
+    label_img[2:6, 2:6] = 4
+    ((label, mask),) = iter_label_masks(label_img, [4], close=False)
+    assert label == 4
+    assert (mask[2:6, 2:6] == 0).all()
+    assert mask.sum() == 255 * (64 - 16)
+
+
+def test_batches_match_one_label_at_a_time():
+    label_img = _labels()
+    labels = [5, 0, 3, 1, 6, 2, 4]
+    single = list(iter_label_masks(label_img, labels, blur_radius=1, batch=1))
+    batched = list(iter_label_masks(label_img, labels, blur_radius=1, batch=3))
+    assert [label for label, _ in batched] == labels
+    for (_, a), (_, b) in zip(single, batched):
+        assert np.array_equal(a, b)
+
+
+def test_close_and_blur_per_channel():
+    label_img = _labels()
+    for label, mask in iter_label_masks(label_img, range(7), blur_radius=1.5, batch=4):
+        figure = (label_img == label).astype(np.uint8) * 255
+        figure = cv2.morphologyEx(figure, cv2.MORPH_CLOSE, np.ones((3, 3), np.uint8))
+        assert np.array_equal(mask, 255 - blur_mask(figure, 1.5))
+
+
+def test_blur_mask_without_radius_is_identity():
+    mask = np.zeros((4, 4), np.uint8)
+    assert blur_mask(mask, 0) is mask
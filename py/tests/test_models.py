@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.generators import models
+from src.generators.session import optimized_model_path, source_model_path
+
+
+def test_check_model_rejects_unknown():
+    with pytest.raises(ValueError):
+        models.check_model("no-such-model")
+    with pytest.raises(ValueError):
+        models.check_model("u2netp", "int4")
+
+
+def test_variant_path_and_available_variants(cache_dir):
+    assert models.variant_path("u2netp", "fp32") is None
+    path = models.variant_path("u2netp", "int8")
+    assert path == os.path.join(str(cache_dir), "models", "u2netp.int8.onnx")
+    assert models.available_variants("u2netp") == ["fp32"]
+
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as f:
+        f.write(b"onnx")
+    assert models.available_variants("u2netp") == ["fp32", "int8"]
+    assert source_model_path("u2netp", "int8") == path
+
+
+def test_optimized_model_path_follows_source(cache_dir):
+    source = models.variant_path("u2netp", "int8")
+    assert optimized_model_path("u2netp", "int8") is None
+
+    os.makedirs(os.path.dirname(source))
+    with open(source, "wb") as f:
+        f.write(b"first")
+    first = optimized_model_path("u2netp", "int8")
+    assert first is not None and first == optimized_model_path("u2netp", "int8")
+
+    # Regenerar la variante (otro tamaño y mtime) cambia la ruta en caché
+    with open(source, "wb") as f:
+        f.write(b"regenerated")
+    os.utime(source, ns=(0, os.stat(source).st_mtime_ns + 1))
+    assert optimized_model_path("u2netp", "int8") != first
+
+
+def test_mask_metrics():
+    # tools.quantize_models necesita onnx (onnxruntime.quantization)
+    quantize = pytest.importorskip("tools.quantize_models", exc_type=ImportError)
+    mask_metrics = quantize.mask_metrics
+    reference = np.zeros((4, 4), np.uint8)
+    reference[:2] = 255
+    assert mask_metrics(reference, reference) == (1.0, 0.0)
+
+    candidate = np.zeros_like(reference)
+    candidate[:1] = 255
+    iou, error = mask_metrics(reference, candidate)
+    assert iou == pytest.approx(0.5)
+    assert error == pytest.approx(255 * 4 / 16)
+
+    empty = np.zeros_like(reference)
+    assert mask_metrics(empty, empty)[0] == 1.0
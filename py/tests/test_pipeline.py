@@ -0,0 +1,37 @@
+import os
+
+from conftest import fake_remove_background, needs_potrace
+from src import pipeline
+from src.generators.session import default_intra_op_threads
+from src.pipeline import StagedPipeline, missing_outputs, output_paths
+
+
+def test_default_intra_op_threads(monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    assert default_intra_op_threads() == 8
+    assert default_intra_op_threads(2) == 4
+    assert default_intra_op_threads(16) == 1
+    monkeypatch.setattr(os, "cpu_count", lambda: None)
+    assert default_intra_op_threads() == 1
+
+
+def test_staged_pipeline_counts_failures(tmp_path):
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"not an image")
+    stats = StagedPipeline(str(tmp_path / "out")).run([str(broken)])
+    assert stats["failed"] == 1 and stats["done"] == 0
+
+
+@needs_potrace
+def test_staged_pipeline_writes_and_skips(tmp_path, inputs, monkeypatch):
+    monkeypatch.setattr(pipeline, "remove_background", fake_remove_background)
+    out = str(tmp_path / "out")
+    os.makedirs(out)
+
+    stats = StagedPipeline(out, queue_size=1, cpu_workers=2).run(inputs)
+    assert (stats["done"], stats["skipped"], stats["failed"]) == (2, 0, 0)
+    for path in inputs:
+        assert not missing_outputs(output_paths(out, os.path.basename(path)))
+
+    stats = StagedPipeline(out).run(inputs)
+    assert (stats["done"], stats["skipped"]) == (0, 2)
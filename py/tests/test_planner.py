@@ -0,0 +1,123 @@
+import pytest
+from PIL import Image, ImageDraw
+
+from src.generators.analysis import _reduced_size, analyze_image
+from src.pipeline import VECTOR_STAGES, missing_outputs, output_paths
+from src.planner import load_plan, plan_stages, write_plan
+
+
+def _logo(size=(300, 200)):
+    img = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((20, 20, 140, 180), fill=(200, 30, 30, 255))
+    draw.rectangle((160, 20, 280, 180), fill=(30, 60, 200, 255))
+    return img
+
+
+def _line_art():
+    img = Image.new("RGBA", (200, 200), (255, 255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    for x in range(10, 200, 20):
+        draw.line((x, 0, x, 199), fill=(0, 0, 0, 255), width=2)
+    return img
+
+
+def _features(**values):
+    features = {
+        "foreground": 0.5,
+        "saturation": 60.0,
+        "colors": 40,
+        "midtones": 0.5,
+        "edges": 0.1,
+    }
+    features.update(values)
+    return features
+
+
+def _keys(run):
+    return [key for key, _, _, _ in run]
+
+
+def test_analyze_transparent_image():
+    features = analyze_image(Image.new("RGBA", (50, 50), (0, 0, 0, 0)))
+    assert features["foreground"] == 0.0 and features["colors"] == 0
+
+
+def test_analyze_logo():
+    features = analyze_image(_logo())
+    assert features["foreground"] == pytest.approx(2 * 121 * 161 / (300 * 200), abs=0.02)
+    assert features["colors"] == 2
+    assert features["saturation"] > 15
+
+
+def test_analyze_downscales_like_thumbnail():
+    big = _logo((3000, 2000))
+    small = big.copy()
+    small.thumbnail((256, 256), Image.Resampling.NEAREST)
+    assert analyze_image(big, size=256) == analyze_image(small, size=256)
+    for shape in [(3000, 2000), (2000, 3000), (257, 1), (1, 257), (999, 998)]:
+        img = Image.new("L", shape)
+        img.thumbnail((256, 256), Image.Resampling.NEAREST)
+        assert _reduced_size(shape, 256) == img.size
+
+
+def test_plan_skips_everything_without_foreground():
+    run, skipped = plan_stages(_features(foreground=0.0), VECTOR_STAGES)
+    assert _keys(run) == ["thumb"]
+    assert set(skipped) == {key for key, _, _, _ in VECTOR_STAGES} - {"thumb"}
+
+
+def test_plan_line_art():
+    run, skipped = plan_stages(_features(saturation=0.0, midtones=0.0), VECTOR_STAGES)
+    assert _keys(run) == ["lineart", "color_logo", "thumb"]
+    assert set(skipped) == {"gray", "halftone", "color_illus"}
+
+
+def test_plan_few_colors_keeps_one_preset():
+    run, skipped = plan_stages(_features(colors=3), VECTOR_STAGES)
+    assert "color_illus" in skipped
+    kwargs = dict((key, kw) for key, _, kw, _ in run)
+    assert kwargs["color_logo"]["num_colors"] == 3
+    degraded = dict((key, d) for key, _, _, d in run)
+    assert degraded["color_logo"]["num_colors"] == 3
+    assert degraded["color_logo"]["n_init"] == 1
+    # Las etapas originales no cambian
+    assert dict((k, kw) for k, _, kw, _ in VECTOR_STAGES)["color_logo"]["num_colors"] == 16
+
+
+def test_plan_never_raises_num_colors():
+    run, skipped = plan_stages(_features(colors=30), VECTOR_STAGES)
+    assert "color_logo" not in skipped
+    kwargs = dict((key, kw) for key, _, kw, _ in run)
+    assert kwargs["color_logo"]["num_colors"] == 16
+    assert kwargs["color_illus"]["num_colors"] == 30
+    degraded = dict((key, d) for key, _, _, d in run)
+    assert degraded["color_logo"]["num_colors"] == 8
+    assert degraded["color_illus"]["num_colors"] == 12
+
+
+def test_plan_noisy_image_raises_turdsize():
+    run, _ = plan_stages(_features(edges=0.9), VECTOR_STAGES)
+    for key, name, kwargs, degraded in run:
+        if name == "generate_color_svg":
+            assert kwargs["turdsize"] >= 6
+            assert degraded["turdsize"] >= kwargs["turdsize"]
+
+
+def test_plan_round_trip_and_missing_outputs(tmp_path):
+    paths = output_paths(str(tmp_path), "a.png")
+    features = _features(saturation=0.0, midtones=0.0)
+    run, skipped = plan_stages(features, VECTOR_STAGES)
+    write_plan(paths["plan"], features, run, skipped)
+    plan = load_plan(paths["plan"])
+    assert plan["skipped"] == skipped and list(plan["stages"]) == _keys(run)
+    # Las salidas descartadas por el plan no cuentan como pendientes
+    assert set(missing_outputs(paths)) == {"alpha", *_keys(run)}
+    assert load_plan(str(tmp_path / "missing.json")) == {}
+
+
+def test_analyze_line_art_has_no_midtones():
+    features = analyze_image(_line_art())
+    assert features["saturation"] < 15
+    assert features["midtones"] < 0.05
+    assert features["edges"] > 0
@@ -0,0 +1,49 @@
+import numpy as np
+
+from conftest import draw_logo, fake_remove_background, needs_potrace
+from src import preview
+from src.generators.svg import SvgWriter, rasterize_svg
+
+
+def test_load_preview_source(tmp_path):
+    path = draw_logo(tmp_path / "a.png", size=(1600, 1200))
+    img = preview.load_preview_source(path, size=384)
+    assert img.mode == "RGBA" and img.size == (384, 288)
+
+
+def test_make_preview_can_be_cancelled(tmp_path, monkeypatch):
+    path = draw_logo(tmp_path / "a.png")
+    steps = []
+
+    def cancelled():
+        steps.append(1)
+        return True
+
+    monkeypatch.setattr(preview, "get_preview_session", lambda job: None)
+    assert preview.make_preview(path, cancelled=cancelled) is None
+    assert len(steps) == 1
+
+
+@needs_potrace
+def test_make_preview(tmp_path, monkeypatch):
+    path = draw_logo(tmp_path / "a.png", size=(800, 600))
+    monkeypatch.setattr(preview, "get_preview_session", lambda job: None)
+    monkeypatch.setattr(preview, "remove_background", fake_remove_background)
+    result = preview.make_preview(path, size=200)
+    assert result["alpha"].size == (200, 150)
+    assert result["svg"] is not None and result["svg"].size == (200, 150)
+
+
+def test_rasterize_svg(tmp_path):
+    writer = SvgWriter(40, 20, simplify=0, background="white")
+    writer.add_path("M20 0L40 0L40 20L20 20Z", "#ff0000")
+    path = tmp_path / "a.svgz"
+    writer.save(str(path))
+
+    pixels = np.asarray(rasterize_svg(str(path)))
+    assert pixels.shape == (20, 40, 4)
+    assert tuple(pixels[10, 5]) == (255, 255, 255, 255)
+    assert tuple(pixels[10, 30]) == (255, 0, 0, 255)
+
+    small = rasterize_svg(str(path), max_side=20)
+    assert small.size == (20, 10)
@@ -0,0 +1,77 @@
+import queue
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.process_pipeline import (
+    ProcessPipeline,
+    put_shared_image,
+    release_shared_image,
+    take_shared_image,
+)
+
+
+def test_shared_image_round_trip():
+    rgba = np.random.default_rng(0).integers(0, 256, (37, 53, 4), dtype=np.uint8)
+    name, shape = put_shared_image(Image.fromarray(rgba, mode="RGBA"))
+    assert shape == (37, 53, 4)
+    assert np.array_equal(np.asarray(take_shared_image(name, shape)), rgba)
+    # El consumidor libera el bloque
+    with pytest.raises(FileNotFoundError):
+        take_shared_image(name, shape)
+
+
+def test_shared_image_converts_to_rgba():
+    name, shape = put_shared_image(Image.new("RGB", (4, 3), (1, 2, 3)))
+    img = take_shared_image(name, shape)
+    assert img.mode == "RGBA" and img.getpixel((0, 0)) == (1, 2, 3, 255)
+
+
+def test_release_shared_image_frees_unclaimed_blocks():
+    name, _ = put_shared_image(Image.new("RGBA", (4, 4)), "tptest_release")
+    assert name == "tptest_release"
+    assert release_shared_image(name)
+    assert not release_shared_image(name)
+
+
+class _Process:
+    def __init__(self, alive):
+        self.alive = alive
+
+    def is_alive(self):
+        return self.alive
+
+
+def _queue(*items):
+    q = queue.Queue()
+    for item in items:
+        q.put(item)
+    return q
+
+
+def test_dead_inference_fails_jobs_it_still_had(capsys):
+    pipeline = ProcessPipeline("out")
+    pipeline._waiting = {"a.png", "b.png", "c.png"}
+    workers = [_Process(True)]
+
+    # Mientras quede un proceso de inferencia vivo no se pierde nada
+    assert pipeline._lost(_queue("a.png"), [_Process(True)], workers, 3) == 0
+
+    # "a.png" llegó a los workers antes de que el proceso muriera
+    assert pipeline._lost(_queue("a.png"), [_Process(False)], workers, 3) == 2
+    assert pipeline.stats["failed"] == 2 and not pipeline._waiting
+    assert "b.png" in capsys.readouterr().out
+
+
+def test_dead_workers_fail_everything_pending():
+    pipeline = ProcessPipeline("out")
+    assert pipeline._lost(_queue(), [_Process(True)], [_Process(False)], 4) == 4
+    assert pipeline.stats["failed"] == 4
+
+
+def test_put_gives_up_when_readers_are_gone():
+    full = queue.Queue(maxsize=1)
+    full.put(1)
+    assert not ProcessPipeline._put(full, 2, [_Process(False)])
+    assert ProcessPipeline._put(_queue(), 2, [_Process(False)])
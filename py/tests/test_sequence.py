@@ -0,0 +1,124 @@
+import os
+
+import numpy as np
+from PIL import Image
+
+from src import sequence
+from src.job_config import JobConfig
+from src.pipeline import VECTOR_STAGES, output_paths
+from src.sequence import SequenceProcessor, frame_sequences
+
+from conftest import draw_logo, fake_remove_background, needs_potrace
+
+
+def test_frame_sequences_grouping():
+    paths = [
+        "a/spin0010.png",
+        "a/spin0002.png",
+        "a/spin0001.PNG",
+        "b/spin0003.png",
+        "a/logo.png",
+        "a/spin0004.jpg",
+    ]
+    groups = frame_sequences(paths)
+    assert ["a/spin0002.png", "a/spin0010.png"] not in groups
+    assert ["a/spin0001.PNG", "a/spin0002.png", "a/spin0010.png"] in groups
+    assert ["b/spin0003.png"] in groups
+    assert ["a/logo.png"] in groups
+    assert ["a/spin0004.jpg"] in groups
+    assert sorted(p for group in groups for p in group) == sorted(paths)
+
+
+def test_changed_and_residual():
+    a = np.zeros((20, 20), np.float32)
+    a[5:15, 5:15] = 200
+    assert sequence._changed(a, a, 8) == 0
+    assert sequence._changed(a, a + 9, 8) == 1
+
+    moved = sequence._shift(a, 3, 0, 0)
+    assert sequence._changed(a, moved, 8) > 0.1
+    # Medio píxel de remuestreo en los bordes no cuenta como cambio
+    half = sequence._shift(moved, 0.5, 0, 0)
+    assert sequence._changed(moved, half, 8) > 0
+    assert sequence._residual(moved, half, 8) == 0
+
+
+def _processor(tmp_path, monkeypatch, **settings):
+    calls = []
+
+    def remove(img, session=None, job_config=None):
+        calls.append(img.size)
+        return fake_remove_background(img)
+
+    monkeypatch.setattr(sequence, "remove_background", remove)
+    job = JobConfig(PLAN_STAGES=False, **settings)
+    return SequenceProcessor(str(tmp_path / "out"), session=object(), job_config=job), calls
+
+
+def test_mask_reused_warped_and_inferred(tmp_path, monkeypatch):
+    processor, calls = _processor(tmp_path, monkeypatch)
+    state = {"since_key": 0}
+    first = Image.open(draw_logo(tmp_path / "f1.png"))
+    same = Image.open(draw_logo(tmp_path / "f2.png"))
+    moved = Image.open(draw_logo(tmp_path / "f3.png", offset=6))
+
+    assert processor._mask(state, first)[1] == "inferred"
+    assert processor._mask(state, same)[1] == "reused"
+    mask, mode = processor._mask(state, moved)
+    assert mode == "warped"
+    expected = np.asarray(fake_remove_background(moved).getchannel("A"), np.int16)
+    assert np.abs(np.asarray(mask, np.int16) - expected).mean() < 2
+    assert len(calls) == 1
+
+    # Otro tamaño: inferencia
+    other = Image.open(draw_logo(tmp_path / "f4.png", size=(200, 120)))
+    assert processor._mask(state, other)[1] == "inferred"
+    assert len(calls) == 2
+
+
+def test_keyframe_interval_forces_inference(tmp_path, monkeypatch):
+    processor, calls = _processor(tmp_path, monkeypatch, SEQUENCE_KEYFRAME_INTERVAL=2)
+    state = {"since_key": 0}
+    img = Image.open(draw_logo(tmp_path / "f.png"))
+    modes = [processor._mask(state, img)[1] for _ in range(5)]
+    assert modes == ["inferred", "reused", "reused", "inferred", "reused"]
+    assert len(calls) == 2
+
+
+def test_stages_share_caches_per_mode(tmp_path, monkeypatch):
+    processor, _ = _processor(tmp_path, monkeypatch)
+    state = {"since_key": 0}
+    source = Image.new("RGBA", (32, 32))
+    paths = output_paths(str(tmp_path / "out"), "f.png", processor.job_config)
+    first = processor._stages(state, source, paths, "f0001.png")
+    second = processor._stages(state, source, paths, "f0002.png")
+
+    assert [stage[:2] for stage in first] == [stage[:2] for stage in VECTOR_STAGES]
+    for (key, name, kwargs, degraded), again in zip(first, second):
+        if name != "generate_color_svg":
+            assert "trace_cache" not in (kwargs or {})
+            continue
+        # Misma caché en cada fotograma, distinta para el modo degradado
+        assert kwargs["trace_cache"] is again[2]["trace_cache"]
+        if degraded is not None:
+            assert degraded["trace_cache"] is again[3]["trace_cache"]
+            assert degraded["trace_cache"] is not kwargs["trace_cache"]
+    assert len({id(cache) for cache in state["caches"].values()}) == len(state["caches"])
+
+
+@needs_potrace
+def test_sequence_run(tmp_path, monkeypatch):
+    processor, calls = _processor(tmp_path, monkeypatch)
+    folder = tmp_path / "in"
+    folder.mkdir()
+    (tmp_path / "out").mkdir()
+    frames = [draw_logo(folder / f"spin{n:04d}.png") for n in (1, 2, 3)]
+    stats = processor.run_all(frames)
+
+    assert stats["frames"] == 3 and stats["failed"] == 0
+    assert (stats["inferred"], stats["reused"]) == (1, 2)
+    assert len(calls) == 1
+    # Fotogramas idénticos: las capas de color se trazan solo en el primero
+    assert stats["layers_reused"] >= 2 * stats["layers_traced"] > 0
+    outputs = os.listdir(tmp_path / "out")
+    assert any(name.startswith("spin0003") and name.endswith(".svg") for name in outputs)
@@ -0,0 +1,32 @@
+import os
+
+import onnxruntime as ort
+import pytest
+
+from src.generators.session import build_session_options, optimized_model_path
+
+
+def test_build_session_options():
+    opts = build_session_options(3, 2, "parallel", enable_mem_arena=False)
+    assert opts.intra_op_num_threads == 3
+    assert opts.inter_op_num_threads == 2
+    assert opts.execution_mode == ort.ExecutionMode.ORT_PARALLEL
+    assert not opts.enable_cpu_mem_arena
+
+
+def test_build_session_options_rejects_unknown_mode():
+    with pytest.raises(ValueError, match="turbo"):
+        build_session_options(execution_mode="turbo")
+
+
+def test_optimized_model_path_depends_on_providers(tmp_path, cache_dir):
+    source = tmp_path / "model.onnx"
+    source.write_bytes(b"onnx")
+    cpu = optimized_model_path("u2netp", "fp32", ("CPUExecutionProvider",), str(source))
+    both = optimized_model_path(
+        "u2netp", "fp32", ("CUDAExecutionProvider", "CPUExecutionProvider"), str(source)
+    )
+    assert cpu != both
+    assert os.path.dirname(cpu) == os.path.join(str(cache_dir), "ort")
+    assert ort.__version__ in os.path.basename(cpu)
+    assert ".cpu." in os.path.basename(cpu) and ".cuda-cpu." in os.path.basename(both)
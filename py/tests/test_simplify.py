@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from src.generators.simplify import _drop_subpixel, count_nodes, simplify_subpaths
+from src.generators.svg import format_path, parse_path
+
+
+def _dense(subpaths, samples=24):
+    """Puntos del trazado muestreado con mucha más densidad que simplify."""
+    t = np.linspace(0.0, 1.0, samples)[:, None]
+    points = []
+    for sp in subpaths:
+        current = np.asarray(sp["start"], dtype=np.float64)
+        for kind, values in sp["segments"]:
+            values = np.asarray(values, dtype=np.float64).reshape(-1, 2)
+            if kind == "L":
+                points.append(current + t * (values[0] - current))
+            else:
+                p1, p2, end = values
+                mt = 1.0 - t
+                points.append(
+                    mt**3 * current + 3 * mt**2 * t * p1 + 3 * mt * t**2 * p2 + t**3 * end
+                )
+            current = values[-1]
+        if sp["closed"]:
+            points.append(current + t * (np.asarray(sp["start"]) - current))
+    return np.vstack(points)
+
+
+def _distance(points, polyline):
+    """Distancia máxima de `points` a la polilínea."""
+    a, ab = polyline[:-1], np.diff(polyline, axis=0)
+    length2 = np.maximum((ab**2).sum(axis=1), 1e-12)
+    k = np.clip(((points[:, None] - a) * ab).sum(axis=2) / length2, 0.0, 1.0)
+    nearest = a + k[..., None] * ab
+    return np.sqrt(((points[:, None] - nearest) ** 2).sum(axis=2)).min(axis=1).max()
+
+
+def _wobbly_outline(seed, count=80, curves=False):
+    """Contorno cerrado de `count` segmentos cortos con ruido."""
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, 2 * np.pi, count, endpoint=False)
+    radius = 40 + 3 * np.sin(5 * angles) + rng.normal(0, 0.05, count)
+    pts = np.column_stack((50 + radius * np.cos(angles), 50 + radius * np.sin(angles)))
+    segments = []
+    for k in range(1, count + 1):
+        prev, end = pts[k - 1], pts[k % count]
+        if curves:
+            c1, c2 = prev + (end - prev) / 3, prev + 2 * (end - prev) / 3
+            segments.append(("C", (*c1, *c2, *end)))
+        else:
+            segments.append(("L", tuple(end)))
+    return [{"start": tuple(pts[0]), "segments": segments, "closed": True}]
+
+
+@pytest.mark.parametrize("curves", [False, True])
+@pytest.mark.parametrize("tolerance", [0.25, 0.5, 1.0])
+def test_deviation_is_bounded(curves, tolerance):
+    original = _wobbly_outline(seed=int(tolerance * 100), curves=curves)
+    simplified = simplify_subpaths(original, tolerance, precision=2, min_segment=0.3)
+    assert count_nodes(simplified) < count_nodes(original)
+
+    # Tal como se escribe: redondeado a 2 decimales
+    written = parse_path(format_path(simplified, precision=2))
+    a, b = _dense(original), _dense(written)
+    # Las medidas de simplify usan menos muestras: margen pequeño
+    assert max(_distance(a, b), _distance(b, a)) <= tolerance * 1.05
+
+
+def test_collinear_lines_merge():
+    subpaths = [
+        {
+            "start": (0.0, 0.0),
+            "segments": [("L", (float(x), 0.0)) for x in range(1, 11)],
+            "closed": False,
+        }
+    ]
+    simplified = simplify_subpaths(subpaths, 0.1, precision=2, min_segment=0)
+    assert simplified[0]["segments"] == [("L", (10.0, 0.0))]
+
+
+def test_subpixel_segments_are_dropped():
+    subpaths = [
+        {
+            "start": (0.0, 0.0),
+            "segments": [("L", (10.0, 0.0)), ("L", (10.05, 0.02)), ("L", (10.0, 10.0))],
+            "closed": False,
+        }
+    ]
+    simplified = simplify_subpaths(subpaths, 0.5, precision=2, min_segment=0.3)
+    ends = [points[-2:] for _, points in simplified[0]["segments"]]
+    assert (10.05, 0.02) not in ends
+    assert ends[-1] == (10.0, 10.0)
+
+
+def test_no_budget_keeps_input():
+    subpaths = _wobbly_outline(seed=1)
+    # Con precisión 0 el redondeo ya consume toda la tolerancia
+    assert simplify_subpaths(subpaths, 0.5, precision=0) is subpaths
+
+
+def test_dropped_segments_keep_original_samples():
+    sp = {
+        "start": (0.0, 0.0),
+        "segments": [("L", (0.1, 0.0)), ("L", (0.1, 5.0)), ("L", (10.0, 5.0))],
+        "closed": False,
+    }
+    items = _drop_subpixel(sp, 0.3)
+    assert [points for _, points, _ in items] == [(0.1, 5.0), (10.0, 5.0)]
+    # El segmento conservado se muestrea desde su extremo real (0.1, 0),
+    # no desde el punto actual (0, 0) que dejó el segmento eliminado
+    samples = items[0][2]
+    assert samples[0] == pytest.approx((0.0, 0.0))
+    assert (samples == (0.1, 0.0)).all(axis=1).any()
+    assert not ((samples[:, 0] == 0.0) & (samples[:, 1] > 0)).any()
@@ -0,0 +1,83 @@
+import gzip
+import re
+
+import pytest
+
+from src.generators.svg import (
+    SvgWriter,
+    format_number,
+    format_path,
+    parse_path,
+    parse_transform,
+)
+
+
+def _points(subpaths):
+    return [
+        value
+        for sp in subpaths
+        for value in (*sp["start"], *(v for _, points in sp["segments"] for v in points))
+    ]
+
+
+def test_format_number():
+    assert format_number(150, 2) == "1.5"
+    assert format_number(-5, 2) == "-.05"
+    assert format_number(300, 2) == "3"
+    assert format_number(7, 0) == "7"
+
+
+def test_parse_path_absolute_and_relative():
+    subpaths = parse_path("M10 10L20 10h5v5C25 20 20 25 10 25zm5 5l1 1")
+    assert len(subpaths) == 2
+    first, second = subpaths
+    assert first["closed"] and not second["closed"]
+    assert [kind for kind, _ in first["segments"]] == ["L", "L", "L", "C"]
+    assert first["segments"][2] == ("L", (25.0, 15.0))
+    # Tras z, el punto actual vuelve al inicio del subpath
+    assert second["start"] == (15.0, 15.0)
+    assert second["segments"] == [("L", (16.0, 16.0))]
+
+
+def test_parse_path_rejects_unsupported():
+    with pytest.raises(ValueError):
+        parse_path("M0 0A5 5 0 1 0 10 0")
+    with pytest.raises(ValueError):
+        parse_path("M0 0L1 1 #")
+
+
+def test_format_path_round_trip():
+    d = "M10.123 20.456C11 21 12.5 22.25 13 24L15.5 30.75Z M40 40L41 42"
+    subpaths = parse_path(d)
+    again = parse_path(format_path(subpaths, precision=2))
+    assert len(again) == len(subpaths)
+    assert _points(again) == pytest.approx(_points(subpaths), abs=0.005 + 1e-9)
+
+
+def test_parse_transform():
+    assert parse_transform("") == (1.0, 1.0, 0.0, 0.0)
+    assert parse_transform("translate(0,120) scale(0.1,-0.1)") == (0.1, -0.1, 0.0, 120.0)
+    assert parse_transform("rotate(45)") is None
+
+
+def test_writer_keeps_paint_order():
+    writer = SvgWriter(10, 10, simplify=0, min_segment=0)
+    writer.add_path("M0 0L1 0L1 1Z", "#ff0000")
+    writer.add_path("M2 2L3 2L3 3Z", "#ff0000")
+    writer.add_path("M4 4L5 4L5 5Z", "#0000ff")
+    writer.add_path("M6 6L7 6L7 7Z", "#ff0000")
+    writer.add_path("M0 0A1 1 0 1 0 2 0", "#00ff00")
+    fills = re.findall(r'fill="(#[0-9a-f]{6})"', writer.render())
+    # Solo se fusionan los consecutivos; el path no compactable queda en su sitio
+    assert fills == ["#ff0000", "#0000ff", "#ff0000", "#00ff00"]
+
+
+def test_writer_saves_svgz(tmp_path):
+    writer = SvgWriter(10, 10, background="white")
+    writer.add_path("M0 0L5 0L5 5Z", "#000000")
+    path = tmp_path / "out.svgz"
+    before, after = writer.save(str(path))
+    assert after == path.stat().st_size and before > 0
+    text = gzip.decompress(path.read_bytes()).decode()
+    assert text == writer.render()
+    assert '<rect width="100%" height="100%" fill="white"/>' in text
@@ -0,0 +1,72 @@
+import os
+
+from PIL import Image
+
+from src.generators.thumbnail import generate_thumbnail, thumbnail_paths
+from src.job_config import JobConfig
+from src.pipeline import missing_outputs, output_files, output_paths
+
+JOB = JobConfig(THUMB_WIDTH=200, THUMB_WIDTHS=(400, 200, 100), THUMB_WEBP=True)
+
+
+def _source():
+    img = Image.new("RGBA", (900, 600), (0, 0, 0, 0))
+    img.paste((200, 30, 30, 255), (100, 100, 700, 500))
+    return img
+
+
+def test_thumbnail_paths(tmp_path):
+    paths = thumbnail_paths(str(tmp_path / "x_thumb.png"), job_config=JOB)
+    names = {w: [os.path.basename(p) for p in files] for w, files in paths.items()}
+    assert names == {
+        400: ["x_thumb_400.png", "x_thumb_400.webp"],
+        200: ["x_thumb.png", "x_thumb.webp"],
+        100: ["x_thumb_100.png", "x_thumb_100.webp"],
+    }
+
+
+def test_generate_all_sizes(tmp_path):
+    output = str(tmp_path / "x_thumb.png")
+    generate_thumbnail(_source(), output, job_config=JOB)
+    for width, files in thumbnail_paths(output, job_config=JOB).items():
+        for path in files:
+            with Image.open(path) as img:
+                assert img.size == (width, width * 2 // 3)
+
+
+def test_regenerates_only_missing_sizes(tmp_path):
+    output = str(tmp_path / "x_thumb.png")
+    generate_thumbnail(_source(), output, job_config=JOB)
+    paths = thumbnail_paths(output, job_config=JOB)
+    with open(paths[100][0], "rb") as f:
+        original = f.read()
+    kept = {p: os.stat(p).st_mtime_ns for w in (400, 200) for p in paths[w]}
+
+    os.remove(paths[100][0])
+    generate_thumbnail(_source(), output, job_config=JOB)
+    with open(paths[100][0], "rb") as f:
+        # Misma cadena de reducciones que en la primera pasada
+        assert f.read() == original
+    assert {p: os.stat(p).st_mtime_ns for p in kept} == kept
+
+
+def test_missing_outputs_checks_every_thumbnail(tmp_path):
+    paths = output_paths(str(tmp_path), "x.png", JOB)
+    files = output_files(paths, JOB)
+    assert len(files["thumb"]) == 6
+    for group in files.values():
+        for path in group:
+            open(path, "wb").close()
+    assert missing_outputs(paths, JOB) == []
+
+    os.remove(thumbnail_paths(paths["thumb"], job_config=JOB)[400][1])
+    assert missing_outputs(paths, JOB) == ["thumb"]
+
+
+def test_main_thumbnail_is_always_written(tmp_path):
+    job = JobConfig(THUMB_WIDTH=150, THUMB_WIDTHS=(300, 600))
+    output = str(tmp_path / "x_thumb.png")
+    assert set(thumbnail_paths(output, job_config=job)) == {150, 300, 600}
+    generate_thumbnail(_source(), output, job_config=job)
+    with Image.open(output) as img:
+        assert img.size == (150, 100)
@@ -0,0 +1,4 @@
+"""
+Herramientas de desarrollo (benchmarks, preparación de modelos).
+Se ejecutan desde la carpeta py/ con: python -m tools.<herramienta>
+"""
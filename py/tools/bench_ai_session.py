@@ -0,0 +1,108 @@
+"""
+Benchmark de la sesión de IA: imágenes/segundo según el reparto entre
+workers (procesos) e hilos de ONNX Runtime por sesión.
+
+Uso:
+    python -m tools.bench_ai_session --fixtures carpeta/ --splits 1x8,2x4,4x2,8x1
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+
+from rembg import remove
+
+from src import config
+from src.generators.session import create_ai_session, default_intra_op_threads
+
+_WORKER_SESSION = None
+
+
+def _init_worker(model_name, variant, threads, execution_mode, enable_mem_arena):
+    global _WORKER_SESSION
+    _WORKER_SESSION = create_ai_session(
+        model_name,
+        variant,
+        intra_op_threads=threads,
+        inter_op_threads=1,
+        execution_mode=execution_mode,
+        enable_mem_arena=enable_mem_arena,
+    )
+
+
+def _infer(data):
+    remove(data, session=_WORKER_SESSION)
+    return len(data)
+
+
+def parse_splits(text):
+    """Convierte "2x4,4x2" en [(2, 4), (4, 2)] (workers x hilos)."""
+    splits = []
+    for item in text.split(","):
+        workers, threads = item.lower().split("x")
+        splits.append((int(workers), int(threads)))
+    return splits
+
+
+def run_split(images, workers, threads, args):
+    """
+    Procesa todas las imágenes con un pool y devuelve imágenes/segundo.
+    Con 0 hilos se reparten los núcleos entre los workers.
+    """
+    threads = threads or default_intra_op_threads(workers)
+    with multiprocessing.Pool(
+        workers,
+        initializer=_init_worker,
+        initargs=(args.model, args.variant, threads, args.execution_mode, not args.no_arena),
+    ) as pool:
+        # Calentamiento: cada worker carga su sesión antes de medir
+        pool.map(_infer, images[:1] * workers, chunksize=1)
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            pool.map(_infer, images, chunksize=1)
+        elapsed = time.perf_counter() - start
+
+    return (len(images) * args.repeat) / elapsed
+
+
+def main():
+    """Punto de entrada del benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark de sesiones ONNX")
+    parser.add_argument("--fixtures", "-f", required=True, help="Carpeta de imágenes")
+    parser.add_argument("--splits", default="1x0,1x4,2x2,4x1", help="workers x hilos")
+    parser.add_argument("--model", default=config.AI_MODEL)
+    parser.add_argument("--variant", default=config.AI_MODEL_VARIANT)
+    parser.add_argument("--execution-mode", default=config.ORT_EXECUTION_MODE)
+    parser.add_argument("--no-arena", action="store_true")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    extensions = (".png", ".jpg", ".jpeg")
+    images = []
+    for name in sorted(os.listdir(args.fixtures)):
+        if name.lower().endswith(extensions):
+            with open(os.path.join(args.fixtures, name), "rb") as f:
+                images.append(f.read())
+
+    if not images:
+        print(f"ℹ️ No image files found in {args.fixtures}")
+        return
+
+    # Crea la caché del modelo optimizado antes de medir
+    create_ai_session(args.model, args.variant)
+
+    print(
+        f"🚀 {len(images)} imágenes, modelo {args.model} ({args.variant}), "
+        f"{os.cpu_count()} CPUs"
+    )
+    print(f"{'workers':>8} {'hilos':>6} {'img/s':>8}")
+    for workers, threads in parse_splits(args.splits):
+        rate = run_split(images, workers, threads, args)
+        threads = threads or default_intra_op_threads(workers)
+        print(f"{workers:>8} {threads:>6} {rate:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
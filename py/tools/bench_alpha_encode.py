@@ -0,0 +1,80 @@
+"""
+Benchmark de la codificación del alpha: tiempo y bytes por formato.
+
+Compara PNG con distintos niveles/estrategias de zlib, PNG con paleta y
+WebP sin pérdidas sobre las imágenes RGBA de una carpeta (por ejemplo, los
+`*_alpha.png` ya generados).
+
+Uso:
+    python -m tools.bench_alpha_encode --fixtures carpeta/ --repeat 3
+"""
+
+import argparse
+import os
+import time
+
+from PIL import Image
+
+from src.generators.encode import encode_alpha
+
+# (etiqueta, argumentos de encode_alpha)
+CANDIDATES = [
+    ("png nivel 1", {"fmt": "png", "compress_level": 1}),
+    ("png nivel 3", {"fmt": "png", "compress_level": 3}),
+    ("png nivel 6 (actual)", {"fmt": "png", "compress_level": 6}),
+    ("png nivel 9", {"fmt": "png", "compress_level": 9}),
+    ("png nivel 6 filtered", {"fmt": "png", "compress_level": 6, "strategy": "filtered"}),
+    ("png nivel 6 rle", {"fmt": "png", "compress_level": 6, "strategy": "rle"}),
+    ("png8 256 colores", {"fmt": "png8", "palette_colors": 256}),
+    ("png8 64 colores", {"fmt": "png8", "palette_colors": 64}),
+    ("webp método 0", {"fmt": "webp", "webp_method": 0}),
+    ("webp método 4", {"fmt": "webp", "webp_method": 4}),
+    ("webp método 6", {"fmt": "webp", "webp_method": 6}),
+]
+
+
+def load_fixtures(folder):
+    """Imágenes RGBA de `folder`, ya decodificadas."""
+    images = []
+    for name in sorted(os.listdir(folder)):
+        if name.lower().endswith((".png", ".webp", ".jpg", ".jpeg")):
+            with Image.open(os.path.join(folder, name)) as img:
+                images.append(img.convert("RGBA"))
+    return images
+
+
+def bench(images, kwargs, repeat):
+    """Devuelve (segundos por imagen, bytes totales) del mejor intento."""
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = sum(len(encode_alpha(img, **kwargs)) for img in images)
+        best = min(best, time.perf_counter() - start)
+    return best / len(images), size
+
+
+def main():
+    """Punto de entrada del benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark de codificación del alpha")
+    parser.add_argument("--fixtures", required=True, help="Carpeta con imágenes RGBA")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    images = load_fixtures(args.fixtures)
+    if not images:
+        print(f"[ERROR] No hay imágenes en {args.fixtures}")
+        return
+
+    print(f"📊 {len(images)} imágenes, mejor de {args.repeat} intentos\n")
+    results = [(label, *bench(images, kwargs, args.repeat)) for label, kwargs in CANDIDATES]
+    # Tamaños relativos a la configuración por defecto
+    reference = next(size for label, _, size in results if label.endswith("(actual)"))
+
+    print(f"{'formato':<24}{'ms/imagen':>12}{'KB total':>12}{'tamaño':>10}")
+    for label, seconds, size in results:
+        print(f"{label:<24}{seconds * 1000:>12.1f}{size / 1024:>12.1f}{size / reference:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
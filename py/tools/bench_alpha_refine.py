@@ -0,0 +1,68 @@
+"""
+Benchmark del refinado del alpha: franja del borde frente a imagen completa.
+
+Para cada imagen RGBA de la carpeta (por ejemplo, los `*_alpha.png` ya
+generados) ejecuta refine_alpha con tile=0 (plano completo) y con los
+tamaños de bloque indicados, comprueba que el resultado es idéntico y
+muestra el tiempo y la fracción de píxeles que cae en la franja.
+
+Uso:
+    python -m tools.bench_alpha_refine --fixtures carpeta/ --tiles 32 64 128
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from src import config
+from src.generators.alpha import refine_alpha, refine_band_mask
+from tools.bench_alpha_encode import load_fixtures
+
+
+def band_fraction(img, tile, feather, blur):
+    """Fracción de bloques que se refinan (ver refine_band_mask)."""
+    band, _, _ = refine_band_mask(np.asarray(img)[..., 3], feather, blur, tile)
+    return float(band.mean())
+
+
+def bench(images, tile, feather, blur, repeat):
+    """Devuelve (segundos por imagen del mejor intento, resultados)."""
+    best = float("inf")
+    results = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [refine_alpha(img, feather, blur, tile) for img in images]
+        best = min(best, time.perf_counter() - start)
+    return best / len(images), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del refinado del alpha")
+    parser.add_argument("--fixtures", required=True, help="Carpeta con imágenes RGBA")
+    parser.add_argument("--tiles", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--feather", type=int, default=config.ALPHA_FEATHER)
+    parser.add_argument("--blur", type=float, default=config.ALPHA_BLUR)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    images = load_fixtures(args.fixtures)
+    if not images:
+        print(f"[ERROR] No hay imágenes en {args.fixtures}")
+        return
+
+    print(f"📊 {len(images)} imágenes, mejor de {args.repeat} intentos\n")
+    reference_seconds, reference = bench(images, 0, args.feather, args.blur, args.repeat)
+    print(f"{'bloque':<16}{'ms/imagen':>12}{'franja':>10}{'idéntico':>10}")
+    print(f"{'completa':<16}{reference_seconds * 1000:>12.1f}{1:>10.0%}{'-':>10}")
+    for tile in args.tiles:
+        seconds, results = bench(images, tile, args.feather, args.blur, args.repeat)
+        same = all(
+            np.array_equal(np.asarray(a), np.asarray(b)) for a, b in zip(reference, results)
+        )
+        band = np.mean([band_fraction(img, tile, args.feather, args.blur) for img in images])
+        print(f"{tile:<16}{seconds * 1000:>12.1f}{band:>10.0%}{'sí' if same else 'NO':>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,527 @@
+"""
+Benchmark entre las dos implementaciones: py/ (main.py) y rust/ (transparente_rust).
+
+Ejecuta las dos CLI sobre la misma carpeta de imágenes, cada una en una
+carpeta de salida vacía, y compara por etapa (alpha, gray, halftone,
+lineart, color_logo, color_illus, thumb):
+
+- Tiempo: intervalo entre la línea de log de la etapa y la anterior de la
+  misma imagen. Las dos CLI procesan en serie (main.py con --serial
+  --sync-alpha, para que el alpha no se codifique en segundo plano mientras
+  corren los generadores) y escriben una línea al terminar cada salida, así
+  que es una aproximación sin tocar el código de ninguna de las dos.
+- Bytes de la salida.
+- Paridad: IoU de la máscara alpha (alpha >= 128), número de paths
+  (subpaths y círculos) y diferencia media de píxeles de los SVG
+  rasterizados sobre blanco (las miniaturas se comparan directamente).
+
+Solo por ejecución, no por etapa: el tiempo total y el pico de RSS (wait4:
+el mayor proceso del árbol, incluidos los potrace; no la suma). El informe
+lo indica junto a los resultados.
+
+Con --history se añade una línea JSON por ejecución del benchmark para
+seguir la evolución de cada port.
+
+Uso:
+    python -m tools.bench_ports --fixtures carpeta/ \\
+        --rust-bin ../rust/target/release/transparente_rust --history bench_ports.jsonl
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from src import config
+from src.generators.svg import (
+    PATH_TOKEN,
+    SVG_ATTR,
+    SVG_SIZE,
+    parse_color,
+    parse_path,
+    parse_transform,
+    path_polygons,
+    transform_subpaths,
+)
+from src.pipeline import output_paths
+
+STAGES = ["alpha", "gray", "halftone", "lineart", "color_logo", "color_illus", "thumb"]
+PY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_RUST_BIN = os.path.join(
+    os.path.dirname(PY_ROOT), "rust", "target", "release", "transparente_rust"
+)
+RASTER_SIZE = 512  # Lado mayor al rasterizar los SVG para compararlos
+
+_NODE = re.compile(r"<(/?)(g|path|circle|rect)\b([^>]*?)(/?)>")
+
+
+# ----------------------------
+# Salidas de cada port
+# ----------------------------
+
+
+def python_outputs(output_dir, file):
+    """Salidas de main.py para `file` (respeta ALPHA_FORMAT y SVG_COMPRESS)."""
+    paths = output_paths(output_dir, file)
+    return {stage: paths[stage] for stage in STAGES}
+
+
+def rust_outputs(output_dir, file):
+    """Salidas de rust/src/cli.rs para `file` (siempre .png y .svg)."""
+    base = os.path.join(output_dir, os.path.splitext(file)[0] + "_alpha")
+    outputs = {"alpha": base + ".png", "thumb": base + "_thumb.png"}
+    for stage in STAGES[1:-1]:
+        outputs[stage] = f"{base}_{stage}.svg"
+    return outputs
+
+
+# ----------------------------
+# Ejecución
+# ----------------------------
+
+
+def run_cli(cmd, cwd):
+    """
+    Ejecuta `cmd` y devuelve {"seconds", "peak_rss", "returncode", "events"},
+    con `events` = [(segundos desde el inicio, línea)] de stdout y stderr.
+    """
+    start = time.perf_counter()
+    env = {**os.environ, "PYTHONUNBUFFERED": "1"}
+    proc = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    events = [(time.perf_counter() - start, line.rstrip("\n")) for line in proc.stdout]
+    peak_rss = None
+    if hasattr(os, "wait4"):
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        peak_rss = usage.ru_maxrss * 1024  # KB en Linux
+    else:
+        proc.wait()
+    return {
+        "seconds": time.perf_counter() - start,
+        "peak_rss": peak_rss,
+        "returncode": proc.returncode,
+        "events": events,
+    }
+
+
+def stage_times(events, files, outputs):
+    """
+    {archivo: {etapa: segundos}} a partir de las líneas de log: cada imagen
+    empieza en su línea "Processing" y cada etapa termina en la primera
+    línea que nombra su salida.
+    """
+    starts = []
+    for i, (_, line) in enumerate(events):
+        if "Processing" in line:
+            for file in files:
+                if file in line:
+                    starts.append((i, file))
+    times = {}
+    for n, (i, file) in enumerate(starts):
+        end = starts[n + 1][0] if n + 1 < len(starts) else len(events)
+        names = {stage: os.path.basename(path) for stage, path in outputs[file].items()}
+        previous = events[i][0]
+        found = {}
+        for t, line in events[i + 1 : end]:
+            for stage, name in names.items():
+                if stage not in found and name in line:
+                    found[stage] = t - previous
+                    previous = t
+                    break
+        times[file] = found
+    return times
+
+
+def run_port(label, cmd, cwd, fixtures, output_dir, outputs_for):
+    """Ejecuta un port sobre `fixtures` y devuelve su resultado por imagen."""
+    files = sorted(
+        f for f in os.listdir(fixtures) if f.lower().endswith((".png", ".jpg", ".jpeg"))
+    )
+    print(f"▶ {label}: {' '.join(cmd)}")
+    result = run_cli(cmd, cwd)
+    if result["returncode"] != 0:
+        tail = "\n".join(line for _, line in result["events"][-10:])
+        print(f"❌ {label} terminó con código {result['returncode']}:\n{tail}")
+    outputs = {file: outputs_for(output_dir, file) for file in files}
+    times = stage_times(result["events"], files, outputs)
+    images = {}
+    for file in files:
+        images[file] = {
+            stage: {
+                "path": path,
+                "seconds": times.get(file, {}).get(stage),
+                "bytes": os.path.getsize(path) if os.path.exists(path) else None,
+            }
+            for stage, path in outputs[file].items()
+        }
+    return {
+        "seconds": result["seconds"],
+        "peak_rss": result["peak_rss"],
+        "returncode": result["returncode"],
+        "images": images,
+    }
+
+
+# ----------------------------
+# Paridad
+# ----------------------------
+
+
+def _read_svg(path):
+    opener = gzip.open if path.lower().endswith(".svgz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return f.read()
+
+
+def _compose(parent, child):
+    """Transformación (sx, sy, tx, ty) de `child` dentro de `parent`."""
+    psx, psy, ptx, pty = parent
+    csx, csy, ctx, cty = child
+    return (psx * csx, psy * csy, psx * ctx + ptx, psy * cty + pty)
+
+
+def _arc_circles(d):
+    """
+    Círculos (cx, cy, r) de un path de arcos como el del halftone de
+    SvgWriter.add_circles ("M... a r r 0 1 0 2r 0 a..."). Solo M/m y a:
+    cada medio círculo da su círculo completo y el segundo medio, el mismo,
+    se descarta (dibujado dos veces, el antialiasing oscurece el borde).
+    None si el path tiene otros comandos.
+    """
+    tokens = PATH_TOKEN.findall(d)
+    circles = []
+    x = y = 0.0
+    i = 0
+    cmd = None
+    while i < len(tokens):
+        if tokens[i].isalpha():
+            cmd = tokens[i]
+            i += 1
+            continue
+        if cmd in ("M", "m"):
+            dx, dy = float(tokens[i]), float(tokens[i + 1])
+            x, y = (x + dx, y + dy) if cmd == "m" else (dx, dy)
+            i += 2
+        elif cmd == "a":
+            r = float(tokens[i])
+            dx, dy = float(tokens[i + 5]), float(tokens[i + 6])
+            circle = (x + dx / 2, y + dy / 2, r)
+            if not circles or circles[-1] != circle:
+                circles.append(circle)
+            x, y = x + dx, y + dy
+            i += 7
+        else:
+            return None
+    return circles
+
+
+def rasterize(path, size=RASTER_SIZE):
+    """
+    Rasteriza un SVG de cualquiera de los dos ports sobre blanco (RGB):
+    paths de SvgWriter, grupos de potrace con su transform, círculos y
+    arcos del halftone. Devuelve un array (alto, ancho, 3) con lado mayor
+    `size`.
+    """
+    text = _read_svg(path)
+    match = SVG_SIZE.search(text)
+    width, height = (float(match.group(1)), float(match.group(2))) if match else (512.0, 512.0)
+    scale = size / max(width, height)
+    shape = (max(1, round(height * scale)), max(1, round(width * scale)), 3)
+    canvas = np.full(shape, 255, np.uint8)
+
+    stack = [((1.0, 1.0, 0.0, 0.0), "#000000")]
+    for closing, tag, attrs, self_closing in _NODE.findall(text):
+        if tag == "g":
+            if closing:
+                if len(stack) > 1:
+                    stack.pop()
+            elif not self_closing:
+                attrs = dict(SVG_ATTR.findall(attrs))
+                matrix = parse_transform(attrs.get("transform", "")) or (1.0, 1.0, 0.0, 0.0)
+                stack.append((_compose(stack[-1][0], matrix), attrs.get("fill", stack[-1][1])))
+            continue
+        if closing:
+            continue
+        attrs = dict(SVG_ATTR.findall(attrs))
+        matrix, inherited = stack[-1]
+        color = parse_color(attrs.get("fill", inherited))
+        if color is None:
+            continue
+        if tag == "rect":
+            canvas[:] = color
+            continue
+        if tag == "circle":
+            circles = [(float(attrs["cx"]), float(attrs["cy"]), float(attrs["r"]))]
+        else:
+            d = attrs.get("d", "")
+            circles = _arc_circles(d) if re.search(r"[aA]", d) else None
+        if circles is not None:
+            sx, sy, tx, ty = matrix
+            for cx, cy, r in circles:
+                center = (round((tx + sx * cx) * scale * 16), round((ty + sy * cy) * scale * 16))
+                radius = round(abs(sx) * r * scale * 16)
+                cv2.circle(canvas, center, radius, color, -1, lineType=cv2.LINE_AA, shift=4)
+            continue
+        try:
+            subpaths = transform_subpaths(parse_path(d), matrix)
+        except ValueError:
+            continue
+        polygons = path_polygons(subpaths, scale)
+        if polygons:
+            cv2.fillPoly(canvas, polygons, color, lineType=cv2.LINE_AA, shift=4)
+    return canvas
+
+
+def count_paths(path):
+    """Subpaths (cada moveto) y círculos del SVG."""
+    text = _read_svg(path)
+    count = len(re.findall(r"<circle\b", text))
+    for d in re.findall(r'\bd="([^"]*)"', text):
+        circles = _arc_circles(d) if re.search(r"[aA]", d) else None
+        count += len(circles) if circles is not None else len(re.findall(r"[Mm]", d))
+    return count
+
+
+def _pixels(path):
+    """RGB sobre blanco de una imagen (PNG/WebP con alpha)."""
+    with Image.open(path) as img:
+        rgba = img.convert("RGBA")
+    white = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+    return np.asarray(Image.alpha_composite(white, rgba).convert("RGB"))
+
+
+def pixel_difference(a, b):
+    """Diferencia media (0-1) entre dos arrays RGB; `b` se escala al tamaño de `a`."""
+    if a.shape != b.shape:
+        b = cv2.resize(b, (a.shape[1], a.shape[0]), interpolation=cv2.INTER_AREA)
+    return float(np.abs(a.astype(np.int16) - b.astype(np.int16)).mean()) / 255
+
+
+def alpha_iou(path_a, path_b, threshold=128):
+    """IoU de las máscaras alpha >= `threshold` (la segunda escalada a la primera)."""
+    with Image.open(path_a) as img:
+        a = np.asarray(img.convert("RGBA"))[..., 3]
+    with Image.open(path_b) as img:
+        b = np.asarray(img.convert("RGBA"))[..., 3]
+    if a.shape != b.shape:
+        b = cv2.resize(b, (a.shape[1], a.shape[0]), interpolation=cv2.INTER_NEAREST)
+    a, b = a >= threshold, b >= threshold
+    union = np.count_nonzero(a | b)
+    return np.count_nonzero(a & b) / union if union else 1.0
+
+
+def parity(stage, path_py, path_rs):
+    """Métricas de paridad de una salida, o None si falta alguna."""
+    if not (os.path.exists(path_py) and os.path.exists(path_rs)):
+        return None
+    if stage == "alpha":
+        return {"iou": alpha_iou(path_py, path_rs)}
+    if stage == "thumb":
+        return {"pixel_diff": pixel_difference(_pixels(path_py), _pixels(path_rs))}
+    return {
+        "paths_py": count_paths(path_py),
+        "paths_rs": count_paths(path_rs),
+        "pixel_diff": pixel_difference(rasterize(path_py), rasterize(path_rs)),
+    }
+
+
+# ----------------------------
+# Informe
+# ----------------------------
+
+
+def summarize(ports, files):
+    """Media por imagen de cada etapa: tiempo, bytes y paridad."""
+    rows = {}
+    for stage in STAGES:
+        row = {}
+        for name, port in ports.items():
+            entries = [port["images"][f][stage] for f in files]
+            seconds = [e["seconds"] for e in entries if e["seconds"] is not None]
+            sizes = [e["bytes"] for e in entries if e["bytes"] is not None]
+            row[name] = {
+                "seconds": sum(seconds) / len(seconds) if seconds else None,
+                "bytes": sum(sizes) / len(sizes) if sizes else None,
+                "outputs": len(sizes),
+            }
+        if len(ports) == 2:
+            metrics = [
+                parity(
+                    stage,
+                    ports["python"]["images"][f][stage]["path"],
+                    ports["rust"]["images"][f][stage]["path"],
+                )
+                for f in files
+            ]
+            metrics = [m for m in metrics if m is not None]
+            row["parity"] = (
+                {key: float(np.mean([m[key] for m in metrics])) for key in metrics[0]}
+                if metrics
+                else None
+            )
+        rows[stage] = row
+    return rows
+
+
+def _fmt(value, unit):
+    if value is None:
+        return "-"
+    if unit == "ms":
+        return f"{value * 1000:.0f}"
+    return f"{value / 1024:.1f}"
+
+
+def print_report(ports, rows, images):
+    names = list(ports)
+    header = f"{'etapa':<13}" + "".join(f"{n + ' ~ms':>12}{n + ' KB':>12}" for n in names)
+    print(f"\n📊 {images} imágenes (media por imagen)\n")
+    print(header + ("  paridad" if len(names) == 2 else ""))
+    for stage, row in rows.items():
+        line = f"{stage:<13}" + "".join(
+            f"{_fmt(row[n]['seconds'], 'ms'):>12}{_fmt(row[n]['bytes'], 'KB'):>12}" for n in names
+        )
+        p = row.get("parity")
+        if p:
+            if "iou" in p:
+                line += f"  IoU {p['iou']:.3f}"
+            elif "paths_py" in p:
+                line += (
+                    f"  paths {p['paths_py']:.0f}/{p['paths_rs']:.0f}, "
+                    f"Δpx {p['pixel_diff']:.1%}"
+                )
+            else:
+                line += f"  Δpx {p['pixel_diff']:.1%}"
+        print(line)
+    print()
+    for name, port in ports.items():
+        rss = "-" if port["peak_rss"] is None else f"{port['peak_rss'] / 1024 / 1024:.0f}MB"
+        print(f"⏱ {name}: {port['seconds']:.1f}s en total, pico de RSS {rss}")
+    print(
+        "\nℹ️ ~ms es una aproximación: el intervalo entre la línea de log de la etapa y\n"
+        "   la anterior de la misma imagen, no una medida de la etapa. El pico de RSS\n"
+        "   es de toda la ejecución (el mayor proceso del árbol), no por etapa."
+    )
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PY_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Python vs Rust")
+    parser.add_argument("--fixtures", required=True, help="Carpeta con imágenes originales")
+    parser.add_argument("--rust-bin", default=DEFAULT_RUST_BIN, help="Binario de rust/ (release)")
+    parser.add_argument("--python", default=sys.executable, help="Intérprete para main.py")
+    parser.add_argument(
+        "--python-args",
+        nargs=argparse.REMAINDER,
+        default=[],
+        help="Argumentos extra de main.py (al final; se añaden siempre --serial --sync-alpha)",
+    )
+    parser.add_argument("--history", help="Archivo JSONL al que añadir los resultados")
+    parser.add_argument("--keep", help="Carpeta donde dejar las salidas (por defecto temporal)")
+    args = parser.parse_args()
+
+    fixtures = os.path.abspath(args.fixtures)
+    files = sorted(
+        f for f in os.listdir(fixtures) if f.lower().endswith((".png", ".jpg", ".jpeg"))
+    )
+    if not files:
+        print(f"[ERROR] No hay imágenes en {fixtures}")
+        return
+
+    work = os.path.abspath(args.keep) if args.keep else tempfile.mkdtemp(prefix="bench-ports-")
+    ports = {}
+    py_out = os.path.join(work, "python")
+    os.makedirs(py_out, exist_ok=True)
+    ports["python"] = run_port(
+        "python",
+        [
+            args.python,
+            "-u",
+            os.path.join(PY_ROOT, "main.py"),
+            "-i",
+            fixtures,
+            "-o",
+            py_out,
+            "--serial",
+            "--sync-alpha",
+            *args.python_args,
+        ],
+        PY_ROOT,
+        fixtures,
+        py_out,
+        python_outputs,
+    )
+    if os.path.exists(args.rust_bin):
+        rs_out = os.path.join(work, "rust")
+        os.makedirs(rs_out, exist_ok=True)
+        # cli.rs crea sus temporales en el directorio actual
+        ports["rust"] = run_port(
+            "rust",
+            [os.path.abspath(args.rust_bin), "-i", fixtures, "-o", rs_out],
+            rs_out,
+            fixtures,
+            rs_out,
+            rust_outputs,
+        )
+    else:
+        print(f"⚠️ No existe {args.rust_bin} (cargo build --release en rust/); solo Python")
+
+    rows = summarize(ports, files)
+    print_report(ports, rows, len(files))
+
+    if args.history:
+        record = {
+            "time": time.time(),
+            "commit": _git_commit(),
+            "fixtures": fixtures,
+            "images": len(files),
+            "svg_compress": config.SVG_COMPRESS,
+            # Tiempos por etapa a partir del log y RSS de toda la ejecución
+            "stage_seconds": "log_interval",
+            "peak_rss": "whole_run",
+            "ports": {
+                name: {k: port[k] for k in ("seconds", "peak_rss", "returncode")}
+                for name, port in ports.items()
+            },
+            "stages": rows,
+        }
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"📝 Resultados añadidos a {args.history}")
+
+    if not args.keep:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
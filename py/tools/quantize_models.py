@@ -0,0 +1,137 @@
+"""
+Genera y registra variantes INT8 (cuantización dinámica) de los modelos de IA
+y mide cuánta calidad cuestan frente al modelo FP32.
+
+Uso:
+    python -m tools.quantize_models --model isnet-general-use
+    python -m tools.quantize_models --model isnet-general-use --check fixtures/
+
+La comprobación compara las máscaras de ambas variantes sobre un conjunto de
+imágenes: IoU de la máscara binarizada y error medio del alpha (0-255).
+"""
+
+import argparse
+import os
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+from rembg import remove
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+from src import config
+from src.generators import models
+from src.generators.session import create_ai_session, rembg_session_class
+
+
+def quantize_model(model_name, preprocess=True):
+    """Cuantiza el modelo FP32 de rembg y lo guarda como variante "int8"."""
+    models.check_model(model_name, "int8")
+    source = str(rembg_session_class(model_name).download_models())
+    size_in = os.path.getsize(source)
+    target = models.variant_path(model_name, "int8")
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    if preprocess:
+        # Inferencia de formas + optimización previa: mejora la cobertura de
+        # operadores cuantizados.
+        prepared = f"{target}.prep.onnx"
+        quant_pre_process(source, prepared, skip_symbolic_shape=True)
+        source = prepared
+
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    try:
+        quantize_dynamic(source, tmp_path, weight_type=QuantType.QUInt8)
+        os.replace(tmp_path, target)
+    finally:
+        for path in (tmp_path, f"{target}.prep.onnx"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    size_out = os.path.getsize(target)
+    print(
+        f"🧮 {model_name} INT8 OK: {size_in / 1e6:.1f} MB → {size_out / 1e6:.1f} MB "
+        f"({os.path.basename(target)})"
+    )
+    return target
+
+
+def _mask(data, session):
+    start = time.perf_counter()
+    result = remove(data, session=session, only_mask=True)
+    elapsed = time.perf_counter() - start
+    return np.array(Image.open(BytesIO(result)).convert("L")), elapsed
+
+
+def mask_metrics(reference, candidate, threshold=128):
+    """IoU de las máscaras binarizadas y error medio absoluto del alpha."""
+    ref_bin = reference >= threshold
+    cand_bin = candidate >= threshold
+    union = np.logical_or(ref_bin, cand_bin).sum()
+    iou = np.logical_and(ref_bin, cand_bin).sum() / union if union else 1.0
+    alpha_error = np.abs(reference.astype(np.int16) - candidate.astype(np.int16)).mean()
+    return float(iou), float(alpha_error)
+
+
+def check_accuracy(model_name, fixtures_dir, variant="int8"):
+    """Compara las máscaras de `variant` con las del modelo FP32."""
+    reference_session = create_ai_session(model_name, "fp32")
+    candidate_session = create_ai_session(model_name, variant)
+
+    extensions = (".png", ".jpg", ".jpeg")
+    files = sorted(f for f in os.listdir(fixtures_dir) if f.lower().endswith(extensions))
+    if not files:
+        print(f"ℹ️ No image files found in {fixtures_dir}")
+        return None
+
+    ious, errors = [], []
+    time_ref = time_cand = 0.0
+    print(f"{'imagen':<32} {'IoU':>7} {'err α':>7}")
+    for file in files:
+        with open(os.path.join(fixtures_dir, file), "rb") as f:
+            data = f.read()
+        reference, t_ref = _mask(data, reference_session)
+        candidate, t_cand = _mask(data, candidate_session)
+        iou, alpha_error = mask_metrics(reference, candidate)
+        ious.append(iou)
+        errors.append(alpha_error)
+        time_ref += t_ref
+        time_cand += t_cand
+        print(f"{file[:32]:<32} {iou:>7.4f} {alpha_error:>7.2f}")
+
+    summary = {
+        "iou_mean": float(np.mean(ious)),
+        "iou_min": float(np.min(ious)),
+        "alpha_error_mean": float(np.mean(errors)),
+        "speedup": time_ref / time_cand if time_cand else 0.0,
+    }
+    print(
+        f"\n📊 {model_name} {variant} vs fp32: IoU medio {summary['iou_mean']:.4f} "
+        f"(mín {summary['iou_min']:.4f}), error α medio {summary['alpha_error_mean']:.2f}, "
+        f"aceleración x{summary['speedup']:.2f}"
+    )
+    return summary
+
+
+def main():
+    """Punto de entrada de la herramienta."""
+    parser = argparse.ArgumentParser(description="Variantes INT8 de los modelos de IA")
+    parser.add_argument("--model", default=config.AI_MODEL, choices=models.SUPPORTED_MODELS)
+    parser.add_argument("--check", metavar="FIXTURES", help="Carpeta de imágenes a comparar")
+    parser.add_argument("--no-preprocess", action="store_true")
+    parser.add_argument("--force", action="store_true", help="Regenerar aunque exista")
+    args = parser.parse_args()
+
+    if args.force or "int8" not in models.available_variants(args.model):
+        quantize_model(args.model, preprocess=not args.no_preprocess)
+    else:
+        print(f"ℹ️ {args.model} INT8 ya registrado: {models.variant_path(args.model, 'int8')}")
+
+    if args.check:
+        check_accuracy(args.model, args.check)
+
+
+if __name__ == "__main__":
+    main()
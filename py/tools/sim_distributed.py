@@ -0,0 +1,121 @@
+"""
+Simulación del modo distribuido con procesos locales como nodos.
+
+Lanza `--nodes` procesos contra la misma carpeta, mata uno a mitad del lote
+(como si la máquina se cayera) y comprueba que:
+- todas las imágenes terminan,
+- ninguna se completa dos veces,
+- las que tenía el nodo caído se recuperan cuando caduca su lease.
+
+El trabajo de cada imagen es simulado (escribe salidas vacías tras una
+pausa), así que no hacen falta ni el modelo ni potrace.
+
+Uso:
+    python -m tools.sim_distributed --images 40 --nodes 4 --ttl 2
+"""
+
+import argparse
+import collections
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from src.distributed import DistributedWorker
+from src.pipeline import output_files, output_paths
+
+
+def _log(log_path, event, node_id, input_path):
+    # O_APPEND: cada línea se escribe entera aunque escriban varios procesos
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write(f"{event} {node_id} {os.path.basename(input_path)}\n")
+
+
+def _started(log_path, node_id):
+    try:
+        with open(log_path, "r", encoding="utf-8") as f:
+            return sum(line.startswith(f"start {node_id} ") for line in f)
+    except FileNotFoundError:
+        return 0
+
+
+def _node_main(node_id, input_paths, output_dir, log_path, work, ttl):
+    def process(input_path):
+        _log(log_path, "start", node_id, input_path)
+        time.sleep(work)
+        for files in output_files(output_paths(output_dir, input_path)).values():
+            for path in files:
+                with open(path, "wb"):
+                    pass
+        _log(log_path, "end", node_id, input_path)
+
+    worker = DistributedWorker(
+        output_dir, node_id=node_id, ttl=ttl, heartbeat=ttl / 4, poll=ttl / 4
+    )
+    worker.run(input_paths, process)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulación del modo distribuido")
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument("--nodes", type=int, default=4)
+    parser.add_argument("--work", type=float, default=0.2, help="Segundos por imagen")
+    parser.add_argument("--ttl", type=float, default=2.0, help="Caducidad del lease")
+    parser.add_argument("--no-kill", action="store_true", help="No matar ningún nodo")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="transparente-sim-")
+    try:
+        output_dir = os.path.join(root, "out")
+        os.makedirs(output_dir)
+        log_path = os.path.join(root, "events.log")
+        input_paths = [os.path.join(root, f"img{i:04d}.png") for i in range(args.images)]
+
+        ctx = multiprocessing.get_context("spawn")
+        nodes = [
+            ctx.Process(
+                target=_node_main,
+                args=(f"nodo{n}", input_paths, output_dir, log_path, args.work, args.ttl),
+            )
+            for n in range(args.nodes)
+        ]
+        start = time.perf_counter()
+        for node in nodes:
+            node.start()
+        if not args.no_kill:
+            # Matar el nodo 0 en cuanto empiece a procesar su segunda imagen
+            while _started(log_path, "nodo0") < 2 and nodes[0].is_alive():
+                time.sleep(0.01)
+            nodes[0].kill()
+            print(f"💥 nodo0 terminado a los {time.perf_counter() - start:.1f}s")
+        for node in nodes:
+            node.join()
+        seconds = time.perf_counter() - start
+
+        events = collections.defaultdict(list)
+        with open(log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                event, node_id, name = line.split()
+                events[name].append((event, node_id))
+
+        ends = {name: sum(e == "end" for e, _ in items) for name, items in events.items()}
+        missing = [os.path.basename(p) for p in input_paths if ends.get(os.path.basename(p), 0) == 0]
+        duplicated = [name for name, count in ends.items() if count > 1]
+        reclaimed = [
+            name for name, items in events.items() if sum(e == "start" for e, _ in items) > 1
+        ]
+        per_node = collections.Counter(
+            node_id for items in events.values() for e, node_id in items if e == "end"
+        )
+
+        print(f"⏱ {seconds:.1f}s, imágenes por nodo: {dict(sorted(per_node.items()))}")
+        print(f"♻️ Recuperadas de nodos caídos: {len(reclaimed)} {reclaimed}")
+        print(f"{'✅' if not missing else '❌'} Sin terminar: {len(missing)} {missing}")
+        print(f"{'✅' if not duplicated else '❌'} Completadas dos veces: {len(duplicated)} {duplicated}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()